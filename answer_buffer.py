@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from models import db, Quiz, QuizAnswer, UserStats, QuestionStats
+from quiz_actions import fold_late_answers
+
+ANSWER_COLUMNS = ('quiz_id', 'question_id', 'user_answer', 'is_correct', 'time_taken')
+DEAD_LETTERS_KEPT = 100  # dropped answers kept for /admin/answer_buffer
+
+
+class AnswerBuffer:
+    # Write-behind queue of QuizAnswer rows with their score deltas, flushed in bulk. The queue is
+    # per process: flush() only writes this worker's answers, and answers queued by other workers
+    # follow within `interval` seconds from their own flushers
+    def __init__(self, app, max_size=500, interval=1.0):
+        self.app = app
+        self.max_size = max_size
+        self.interval = interval
+        self._answers = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.dropped = 0
+        self.dead_letters = deque(maxlen=DEAD_LETTERS_KEPT)
+
+    def start(self):
+        # Background flusher so quiet periods still respect the time threshold
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='answer-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.interval:
+                with self.app.app_context():
+                    try:
+                        self.flush()
+                    except Exception:
+                        self.app.logger.exception('Answer buffer flush failed')
+
+    def add(self, quiz_id, user_id, question_id, user_answer, is_correct, time_taken, quiz_score):
+        # Queue an answer and flush on the calling thread once the batch is full or due
+        if self.queue(quiz_id, user_id, question_id, user_answer, is_correct, time_taken, quiz_score):
+            self.flush()
+
+    def queue(self, quiz_id, user_id, question_id, user_answer, is_correct, time_taken, quiz_score):
+        # Queue an answer without writing; returns True when the caller should flush, e.g. from a
+        # worker thread with an app context when the caller is an event loop
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._answers.append({
+                'quiz_id': quiz_id,
+                'user_id': user_id,
+                'question_id': question_id,
+                'user_answer': user_answer,
+                'is_correct': is_correct,
+                'time_taken': time_taken,
+                'quiz_score': quiz_score
+            })
+            full = len(self._answers) >= self.max_size
+            due = time.monotonic() - self._oldest >= self.interval
+        return full or due
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                answers, self._answers = self._answers, []
+                self._oldest = None
+
+            if not answers:
+                return 0
+
+            start = time.perf_counter()
+            written = len(answers)
+            try:
+                self._write(answers)
+                db.session.commit()
+            except (IntegrityError, DataError):
+                # A bad row (e.g. a deleted question) fails the whole batch; write the answers one at a
+                # time instead, so only the bad ones are dropped rather than failing every later flush
+                written = self._write_each(answers)
+            except BaseException:
+                # Back in the queue before anything else that can fail, the rollback included
+                self._requeue(answers)
+                db.session.rollback()
+                raise
+
+            elapsed = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+            self.rows_flushed += written
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+            return written
+
+    def _write(self, answers):
+        # Score deltas, user and question stats and the answer rows of a batch; the caller commits
+        scores = {}
+        stats = {}
+        question_deltas = {}
+        for answer in answers:
+            if answer['is_correct']:
+                scores[answer['quiz_id']] = scores.get(answer['quiz_id'], 0) + 1
+                delta, best = stats.get(answer['user_id'], (0, 0))
+                stats[answer['user_id']] = (delta + 1, max(best, answer['quiz_score']))
+            attempts, correct, total_time = question_deltas.get(answer['question_id'], (0, 0, 0))
+            question_deltas[answer['question_id']] = (
+                attempts + 1, correct + int(answer['is_correct']), total_time + (answer['time_taken'] or 0))
+
+        # Every quiz of the batch is written first, a zero delta included: like complete_quiz, which locks
+        # the quiz row before user stats, this orders the flush against a finish in another worker
+        # (a row without a quiz ID fails the insert below and is dead-lettered)
+        quiz_ids = sorted({answer['quiz_id'] for answer in answers if answer['quiz_id'] is not None})
+        if quiz_ids:
+            quiz_table = Quiz.__table__
+            db.session.execute(
+                quiz_table.update()
+                .where(quiz_table.c.id == db.bindparam('quiz_id_'))
+                .values(score=quiz_table.c.score + db.bindparam('delta')),
+                [{'quiz_id_': quiz_id, 'delta': scores.get(quiz_id, 0)} for quiz_id in quiz_ids]
+            )
+        UserStats.record_correct_answers(stats)
+        QuestionStats.record_answers(question_deltas)
+        db.session.execute(db.insert(QuizAnswer), [{name: answer[name] for name in ANSWER_COLUMNS}
+                                                   for answer in answers])
+        fold_late_answers(db.session, quiz_ids, scores)
+
+    def _write_each(self, answers):
+        # One transaction per answer: rows the database rejects are dead-lettered, the rest are written,
+        # and a failure of any other kind puts the unwritten answers back in the queue. Returns the rows written
+        written = 0
+        for i, answer in enumerate(answers):
+            try:
+                # Ends the failed batch or the previously rejected answer; a no-op after a commit
+                db.session.rollback()
+                self._write([answer])
+                db.session.commit()
+                written += 1
+            except (IntegrityError, DataError) as e:
+                self.dropped += 1
+                self.dead_letters.append(dict(answer, error=str(e.orig)))
+                self.app.logger.error('Dropped buffered answer %r: %s', answer, e.orig)
+            except BaseException:
+                self._requeue(answers[i:])
+                db.session.rollback()
+                raise
+        db.session.rollback()
+        return written
+
+    def _requeue(self, answers):
+        with self._lock:
+            self._answers = answers + self._answers
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def get_stats(self):
+        with self._lock:
+            depth = len(self._answers)
+        return {
+            'queue_depth': depth,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_flush_ms': round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0,
+            'dropped': self.dropped,
+            'dead_letters': list(self.dead_letters)[-10:]
+        }
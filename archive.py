@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from columnar import ColumnarFile
+from services import reference_cache
+
+CATALOG = 'catalog.json'
+CHECK_INTERVAL = 5  # Seconds between checks for a catalog written by another process
+
+# Same columns as the exports; quizzes files are sorted by (user_id, completed_at, id), answers by (quiz_id, id)
+QUIZ_COLUMNS = [('id', 'int'), ('user_id', 'int'), ('category_id', 'int'), ('difficulty', 'str'),
+                ('score', 'int'), ('total_questions', 'int'), ('time_taken', 'int'), ('completed_at', 'datetime')]
+ANSWER_COLUMNS = [('id', 'int'), ('quiz_id', 'int'), ('question_id', 'int'), ('user_answer', 'str'),
+                  ('is_correct', 'bool'), ('time_taken', 'int')]
+QUIZ_FIELDS = [name for name, _ in QUIZ_COLUMNS]
+ANSWER_FIELDS = [name for name, _ in ANSWER_COLUMNS]
+
+
+class ArchivedQuiz(namedtuple('ArchivedQuiz', QUIZ_FIELDS)):
+    # Read-only stand-in for a Quiz row moved to the archive
+    __slots__ = ()
+    archived = True
+
+    @property
+    def category(self):
+        return reference_cache.get_category(self.category_id)
+
+
+class ArchivedAnswer(namedtuple('ArchivedAnswer', ANSWER_FIELDS + ['question'])):
+    # Read-only stand-in for a QuizAnswer row, with its Question loaded from the database
+    __slots__ = ()
+    archived = True
+
+
+def quiz_key(quiz):
+    return quiz.completed_at, quiz.id
+
+
+class QuizArchive:
+    # Month files of quizzes and answers moved out of the live tables, listed by CATALOG in one directory
+    def __init__(self, directory=None, max_blocks=256):
+        self.directory = directory
+        self.max_blocks = max_blocks  # Decoded column blocks kept per open file
+        self.months = {}  # 'YYYY-MM' -> catalog entry
+        self._files = {}
+        self._signature = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    @property
+    def catalog_path(self):
+        return os.path.join(self.directory, CATALOG)
+
+    def read_catalog(self):
+        try:
+            with open(self.catalog_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'months': {}}
+
+    def refresh(self, force=False):
+        # Pick up a catalog rewritten by the retention job, at most every CHECK_INTERVAL seconds
+        if not self.directory or (not force and time.monotonic() - self._checked_at < CHECK_INTERVAL):
+            return
+        with self._lock:
+            try:
+                stat = os.stat(self.catalog_path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                signature = None
+            if signature != self._signature:
+                self.months = self.read_catalog()['months'] if signature else {}
+                # Superseded files are dropped, not closed: a reader in another thread may still hold one
+                current = {entry[kind] for entry in self.months.values() for kind in ('quizzes', 'answers')}
+                self._files = {name: f for name, f in self._files.items() if name in current}
+                self._signature = signature
+            self._checked_at = time.monotonic()
+
+    def open_file(self, filename):
+        with self._lock:
+            f = self._files.get(filename)
+            if f is None:
+                f = self._files[filename] = ColumnarFile(os.path.join(self.directory, filename), self.max_blocks)
+            return f
+
+    def _months(self, newest_first=False):
+        self.refresh()
+        return sorted(self.months.items(), reverse=newest_first)
+
+    def _user_quizzes_in(self, entry, user_id):
+        f = self.open_file(entry['quizzes'])
+        for group in f.candidate_groups('user_id', user_id):
+            user_ids = f.column(group, 'user_id')
+            start, stop = bisect_left(user_ids, user_id), bisect_right(user_ids, user_id)
+            for row in f.rows_of(group, QUIZ_FIELDS, start, stop):
+                yield ArchivedQuiz(*row)
+
+    def user_quizzes(self, user_id, after=None, before=None, limit=10):
+        # A user's archived quizzes keyed on (completed_at, id), like paginate_quizzes: newest first
+        # below `after`, or oldest first above `before`
+        ascending = before is not None
+        found = []
+        for month, entry in self._months(newest_first=not ascending):
+            if after is not None and month > after[0].strftime('%Y-%m'):
+                continue
+            if before is not None and month < before[0].strftime('%Y-%m'):
+                continue
+            for quiz in self._user_quizzes_in(entry, user_id):
+                key = quiz_key(quiz)
+                if (after is None or key < after) and (before is None or key > before):
+                    found.append(quiz)
+            # Months do not overlap, so the next one is entirely past these rows
+            if len(found) >= limit:
+                break
+        found.sort(key=quiz_key, reverse=not ascending)
+        return found[:limit]
+
+    def user_summary(self, user_id):
+        # {category_id: [quizzes, score sum, best score, time sum, lowest quiz ID]} across the archive
+        summary = {}
+        for _, entry in self._months():
+            for quiz in self._user_quizzes_in(entry, user_id):
+                totals = summary.setdefault(quiz.category_id, [0, 0, 0, 0, quiz.id])
+                totals[0] += 1
+                totals[1] += quiz.score or 0
+                totals[2] = max(totals[2], quiz.score or 0)
+                totals[3] += quiz.time_taken or 0
+                totals[4] = min(totals[4], quiz.id)
+        return summary
+
+    def get_quiz(self, quiz_id):
+        for _, entry in self._months():
+            if not entry['min_quiz_id'] <= quiz_id <= entry['max_quiz_id']:
+                continue
+            f = self.open_file(entry['quizzes'])
+            for group in f.candidate_groups('id', quiz_id):
+                try:
+                    index = f.column(group, 'id').index(quiz_id)
+                except ValueError:
+                    continue
+                return ArchivedQuiz(*f.rows_of(group, QUIZ_FIELDS, index, index + 1)[0])
+        return None
+
+    def get_answers(self, quiz_id, session=None):
+        # The quiz's answers in ID order, with their questions loaded in one query
+        from models import db, Question
+        rows = []
+        for _, entry in self._months():
+            if not entry['min_quiz_id'] <= quiz_id <= entry['max_quiz_id']:
+                continue
+            f = self.open_file(entry['answers'])
+            for group in f.candidate_groups('quiz_id', quiz_id):
+                quiz_ids = f.column(group, 'quiz_id')
+                rows.extend(f.rows_of(group, ANSWER_FIELDS, bisect_left(quiz_ids, quiz_id),
+                                      bisect_right(quiz_ids, quiz_id)))
+        if not rows:
+            return []
+        session = session or db.session
+        questions = {question.id: question for question in
+                     session.query(Question).filter(Question.id.in_({row[2] for row in rows}))}
+        return [ArchivedAnswer(*row, question=questions.get(row[2])) for row in rows]
+
+    def question_totals(self, question_ids=None):
+        # {question_id: (attempts, correct, time)} summed from the per-month totals in the answers files
+        totals = {}
+        wanted = set(question_ids) if question_ids is not None else None
+        for _, entry in self._months():
+            for key, (attempts, correct, total_time) in self.open_file(entry['answers']).meta['question_totals'].items():
+                question_id = int(key)
+                if wanted is None or question_id in wanted:
+                    previous = totals.get(question_id, (0, 0, 0))
+                    totals[question_id] = (previous[0] + attempts, previous[1] + correct, previous[2] + total_time)
+        return totals
+
+    def iter_rows(self, name, columns):
+        # Row groups of 'quizzes' or 'answers' as tuples of the named columns, oldest month first
+        for _, entry in self._months():
+            yield from self.open_file(entry[name]).iter_groups(columns)
+
+    def iter_columns(self, name, columns):
+        # Like iter_rows, but each row group as one sequence per column (int arrays where there are no NULLs)
+        for _, entry in self._months():
+            f = self.open_file(entry[name])
+            for group in range(len(f.groups)):
+                yield [f.column(group, column) for column in columns]
+
+    def iter_quizzes(self):
+        for rows in self.iter_rows('quizzes', QUIZ_FIELDS):
+            for row in rows:
+                yield ArchivedQuiz(*row)
+
+    def quiz_count(self):
+        return sum(entry['quizzes_count'] for _, entry in self._months())
+
+    def get_stats(self):
+        months = self._months()
+        return {
+            'directory': self.directory,
+            'months': {month: {key: entry[key] for key in ('quizzes_count', 'answers_count', 'bytes', 'archived_at')}
+                       for month, entry in months},
+            'quizzes': sum(entry['quizzes_count'] for _, entry in months),
+            'answers': sum(entry['answers_count'] for _, entry in months),
+            'bytes': sum(entry['bytes'] for _, entry in months),
+            'open_files': len(self._files)
+        }
+
@@ -0,0 +1,452 @@
+"""ASGI entry point: the quiz JSON API on asyncio, everything else on the Flask app.
+
+    uvicorn asgi:application --workers 4
+
+get_question, get_questions, submit_answer, finish_quiz and /categories are served by coroutines
+using an async DB driver (asyncpg for PostgreSQL, aiosqlite for SQLite) and its own connection
+pool, so a request waiting on the database does not hold a thread. They share the Flask session
+cookie, quiz state store, answer key and question payload caches, answer buffer, rate limiter and
+quiz writes with the WSGI views; all other routes are passed through to the Flask app.
+
+Live room event streams (/live/<room_id>/events) are also coroutines, one queue per connection.
+With the default local broker a room lives in the process that created it, so serve live rooms
+from a single worker.
+"""
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from werkzeug.http import dump_cookie
+
+from db_routing import REPLICA_BIND
+from factory import create_app
+from grading import grade
+from models import Question
+from quiz_actions import record_answer, complete_quiz
+from quiz_store import MemoryQuizStore, mark_answered
+from rate_limit import MemoryTokenBuckets, RateLimited
+from services import get_services
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(config):
+    # ASYNC_DATABASE_URL, or DATABASE_URL with its driver swapped for an asyncio one
+    if config['ASYNC_DATABASE_URL']:
+        return config['ASYNC_DATABASE_URL']
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError('No asyncio driver for {}; set ASYNC_DATABASE_URL'.format(backend))
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_engine_options(url, config):
+    options = {
+        'pool_size': config['ASYNC_DB_POOL_SIZE'],
+        'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+    if make_url(url).get_backend_name() == 'postgresql' and config['DB_STATEMENT_TIMEOUT']:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT'])}}
+    return options
+
+
+app = create_app()
+services = get_services(app)
+quiz_store, answer_keys, answer_buffer = services.quiz_store, services.answer_keys, services.answer_buffer
+question_payloads, live_rooms = services.question_payloads, services.live_rooms
+rate_limiter = services.rate_limiter
+question_selector, reference_cache = services.question_selector, services.reference_cache
+
+database_url = async_database_url(app.config)
+engine = create_async_engine(database_url, **async_engine_options(database_url, app.config))
+Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+_reference_lock = asyncio.Lock()
+_question_version_lock = asyncio.Lock()
+
+
+class Request:
+    def __init__(self, scope, receive, params):
+        self.scope = scope
+        self.receive = receive
+        self.params = params
+        self.headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']}
+        self.args = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.session = self._load_session()
+
+    def _load_session(self):
+        # Read the signed Flask session cookie the same way SecureCookieSessionInterface does
+        cookie = SimpleCookie(self.headers.get('cookie', ''))
+        morsel = cookie.get(app.config['SESSION_COOKIE_NAME'])
+        if morsel is None:
+            return {}
+        serializer = app.session_interface.get_signing_serializer(app)
+        try:
+            return serializer.loads(morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    def session_cookie(self, **changes):
+        # Set-Cookie value for the Flask session with changes applied
+        interface = app.session_interface
+        value = interface.get_signing_serializer(app).dumps(dict(self.session, **changes))
+        expires = None
+        if self.session.get('_permanent'):
+            expires = datetime.now(timezone.utc) + app.permanent_session_lifetime
+        return dump_cookie(
+            interface.get_cookie_name(app), value, expires=expires,
+            domain=interface.get_cookie_domain(app), path=interface.get_cookie_path(app),
+            secure=interface.get_cookie_secure(app), httponly=interface.get_cookie_httponly(app),
+            samesite=interface.get_cookie_samesite(app)
+        )
+
+    async def get_json(self):
+        body = b''
+        while True:
+            message = await self.receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return {}
+
+
+class Response:
+    def __init__(self, payload=None, status=200, headers=None):
+        self.body = b''
+        self.status = status
+        self.headers = []
+        if payload is not None:
+            # Pre-encoded JSON (cached question payloads) is sent as is
+            self.body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.headers.append((b'content-type', b'application/json'))
+        for name, value in (headers or {}).items():
+            self.headers.append((name.lower().encode(), str(value).encode()))
+
+    async def send(self, send):
+        await send({'type': 'http.response.start', 'status': self.status,
+                    'headers': self.headers + [(b'content-length', str(len(self.body)).encode())]})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+class EventStream:
+    # Server-sent events from a live room subscriber until the room ends or the client leaves
+    def __init__(self, request, room, subscriber):
+        self.request = request
+        self.room = room
+        self.subscriber = subscriber
+
+    async def _wait_for_disconnect(self):
+        while (await self.request.receive())['type'] != 'http.disconnect':
+            pass
+        self.subscriber.close()
+
+    async def send(self, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+        watcher = asyncio.ensure_future(self._wait_for_disconnect())
+        try:
+            async for frame in self.subscriber.frames(live_rooms.heartbeat):
+                await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            live_rooms.unsubscribe(self.room, self.subscriber)
+
+
+def login_required(f):
+    async def decorated_function(request):
+        if 'user_id' not in request.session:
+            return Response(status=302, headers={'Location': '/login'})
+        return await f(request)
+    return decorated_function
+
+
+def rate_limited(name):
+    # Same limits as the Flask views; the concurrency cap counts coroutines as well as threads
+    def decorator(f):
+        async def decorated_function(request):
+            if not rate_limiter:
+                return await f(request)
+            try:
+                with rate_limiter.admit():
+                    if isinstance(rate_limiter.buckets, MemoryTokenBuckets):
+                        rate_limiter.check(name, request.session['user_id'])
+                    else:
+                        await asyncio.to_thread(rate_limiter.check, name, request.session['user_id'])
+                    return await f(request)
+            except RateLimited as e:
+                return Response({'error': 'Too many requests, please retry'}, 429, {'Retry-After': e.retry_after})
+        return decorated_function
+    return decorator
+
+
+async def store_call(method, *args):
+    # The memory store never blocks; the SQLite store does file I/O
+    if isinstance(quiz_store, MemoryQuizStore):
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+async def get_quiz_state(request):
+    # Active quiz state for the current user, or an error response
+    quiz_id = request.session.get('quiz_id')
+    state = await store_call(quiz_store.get, quiz_id) if quiz_id is not None else None
+    if state is None:
+        return None, Response({'error': 'No active quiz'}, 400)
+    if state['user_id'] != request.session['user_id']:
+        return None, Response({'error': 'Unauthorized'}, 403)
+    return state, None
+
+
+@login_required
+@rate_limited('get_question')
+async def get_question(request):
+    state, error = await get_quiz_state(request)
+    if error:
+        return error
+
+    question_num = int(request.params['question_num'])
+    if question_num >= len(state['question_ids']):
+        return Response({'error': 'Invalid question'}, 400)
+
+    question_id = state['question_ids'][question_num]
+    await refresh_question_caches()
+    payload = question_payloads.peek(question_id)
+    if payload is None:
+        async with Session() as session:
+            question = await session.get(Question, question_id)
+        if not question:
+            return Response({'error': 'Question not found'}, 404)
+        payload = question_payloads.put(question)
+
+    await store_call(quiz_store.update, state['quiz_id'], lambda stored: dict(stored, current_question=question_num))
+    return Response(question_payloads.render(payload, question_num + 1, len(state['question_ids'])))
+
+
+async def refresh_question_caches():
+    # peek() never touches the database, so one coroutine per process checks the questions version first
+    if answer_keys.is_stale() or question_payloads.is_stale():
+        async with _question_version_lock:
+            if answer_keys.is_stale() or question_payloads.is_stale():
+                async with Session() as session:
+                    await session.run_sync(_refresh_question_caches)
+
+
+def _refresh_question_caches(session):
+    answer_keys.refresh(session=session)
+    question_payloads.refresh(session=session)
+
+
+@login_required
+@rate_limited('get_questions')
+async def get_questions(request):
+    state, error = await get_quiz_state(request)
+    if error:
+        return error
+
+    # Questions missing a cached payload or answer key are loaded with a single IN query,
+    # so submit_answer grades without one
+    await refresh_question_caches()
+    question_ids = state['question_ids']
+    payloads = {question_id: question_payloads.peek(question_id) for question_id in set(question_ids)}
+    missing = [question_id for question_id, payload in payloads.items()
+               if payload is None or answer_keys.peek(question_id) is None]
+    if missing:
+        async with Session() as session:
+            questions = (await session.scalars(select(Question).where(Question.id.in_(missing)))).all()
+        for question in questions:
+            payloads[question.id] = question_payloads.put(question)
+            answer_keys.put(question)
+
+    if any(payload is None for payload in payloads.values()):
+        return Response({'error': 'Question not found'}, 404)
+
+    return Response(question_payloads.render_quiz(
+        state['quiz_id'], [payloads[question_id] for question_id in question_ids], len(question_ids)))
+
+
+@login_required
+@rate_limited('submit_answer')
+async def submit_answer(request):
+    state, error = await get_quiz_state(request)
+    if error:
+        return error
+
+    data = await request.get_json()
+    question_id = data.get('question_id')
+    user_answer = data.get('answer', '').strip()
+    time_taken = data.get('time_taken', 60)
+
+    if question_id not in state['question_ids']:
+        return Response({'error': 'Invalid question'}, 400)
+
+    await refresh_question_caches()
+    async with Session() as session:
+        answer_key = answer_keys.peek(question_id)
+        if answer_key is None:
+            question = await session.get(Question, question_id)
+            if not question:
+                return Response({'error': 'Question not found'}, 404)
+            answer_key = answer_keys.put(question)
+
+        is_correct = grade(answer_key, user_answer)
+        # Claimed atomically before anything is written, as in the Flask view
+        state = await store_call(quiz_store.update, state['quiz_id'], mark_answered(question_id, is_correct))
+        if state is None:
+            return Response({'error': 'Question already answered'}, 400)
+        question_selector.observe(question_id, is_correct)
+
+        if answer_buffer:
+            # Write-behind: queue the answer and score delta for a bulk flush, which runs on a worker
+            # thread with an app context rather than blocking the event loop
+            if answer_buffer.queue(state['quiz_id'], state['user_id'], question_id, user_answer,
+                                   is_correct, time_taken, state['score']):
+                await asyncio.to_thread(_flush_queued_answers)
+        else:
+            await session.run_sync(record_answer, state, question_id, user_answer, is_correct, time_taken)
+            await session.commit()
+
+    return Response({
+        'correct': is_correct,
+        'correct_answer': answer_key.correct_answer,
+        'explanation': answer_key.explanation
+    })
+
+
+@login_required
+@rate_limited('finish_quiz')
+async def finish_quiz(request):
+    state, error = await get_quiz_state(request)
+    if error:
+        return error
+
+    # Persist this worker's buffered answers. Answers queued by other workers are written by their
+    # flushers within ANSWER_BUFFER_INTERVAL and then added to the finished quiz's rollups and seen set
+    if answer_buffer:
+        await asyncio.to_thread(_flush_answer_buffer)
+
+    data = await request.get_json()
+    total_time = data.get('total_time', 0)
+
+    async with Session() as session:
+        quiz = await session.run_sync(complete_quiz, state['quiz_id'], total_time)
+        if not quiz:
+            return Response({'error': 'Quiz not found'}, 404)
+        await session.commit()
+
+    # The results page reads from the replica unless the session shows a recent write
+    headers = {}
+    if REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+        headers['Set-Cookie'] = request.session_cookie(db_wrote_at=int(time.time()))
+
+    urls = app.url_map.bind('', script_name=request.scope.get('root_path') or '/')
+    return Response({'redirect': urls.build('quiz.results', {'quiz_id': quiz.id})}, headers=headers)
+
+
+def _flush_answer_buffer():
+    with app.app_context():
+        answer_buffer.flush()
+
+
+def _flush_queued_answers():
+    # The answer is already queued (and requeued if the flush fails), so a failure must not fail the request
+    try:
+        _flush_answer_buffer()
+    except Exception:
+        app.logger.exception('Answer buffer flush failed')
+
+
+@login_required
+async def get_categories(request):
+    sport_id = request.args.get('sport_id', [''])[0]
+    if not sport_id.isdigit() or not int(sport_id):
+        return Response([], 400)
+    sport_id = int(sport_id)
+
+    # One coroutine per process checks the reference version; the rest use the cached copy
+    if reference_cache.is_stale():
+        async with _reference_lock:
+            if reference_cache.is_stale():
+                async with Session() as session:
+                    await session.run_sync(lambda s: reference_cache.refresh(session=s))
+
+    # Let browsers revalidate cheaply until the reference data changes
+    etag = '"{}-{}"'.format(reference_cache.version, sport_id)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'private, max-age={}'.format(app.config['CATEGORIES_MAX_AGE'])
+    }
+    if etag in request.headers.get('if-none-match', ''):
+        return Response(status=304, headers=headers)
+
+    categories = reference_cache.get_categories_for_sport(sport_id)
+    return Response([{'id': c.id, 'name': c.name} for c in categories], headers=headers)
+
+
+@login_required
+async def live_events(request):
+    # Each connection is a coroutine and a queue, so a room can hold thousands of subscribers
+    room = live_rooms.get(request.params['room_id'])
+    if room is None:
+        return Response({'error': 'Room not found'}, 404)
+    return EventStream(request, room, live_rooms.subscribe(room, asyncio.get_running_loop()))
+
+
+ROUTES = [
+    ('GET', re.compile(r'^/get_question/(?P<question_num>\d+)$'), get_question),
+    ('GET', re.compile(r'^/get_questions$'), get_questions),
+    ('POST', re.compile(r'^/submit_answer$'), submit_answer),
+    ('POST', re.compile(r'^/finish_quiz$'), finish_quiz),
+    ('GET', re.compile(r'^/categories$'), get_categories),
+    ('GET', re.compile(r'^/live/(?P<room_id>[\w-]+)/events$'), live_events),
+]
+
+
+class QuizAPI:
+    # Dispatches the async routes and hands everything else to the Flask app
+    def __init__(self, flask_app):
+        self.wsgi = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http':
+            for method, pattern, view in ROUTES:
+                match = pattern.match(scope['path'])
+                if match and scope['method'] == method:
+                    response = await view(Request(scope, receive, match.groupdict()))
+                    return await response.send(send)
+
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = QuizAPI(app)
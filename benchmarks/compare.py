@@ -0,0 +1,42 @@
+"""Compare two saved benchmark result files endpoint by endpoint.
+
+    python -m benchmarks.compare benchmarks/results/load_test-abc1234-....json benchmarks/results/load_test-def5678-....json
+"""
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_mean')
+
+
+def _delta(old, new):
+    if not old:
+        return '   n/a'
+    return '{:+6.1f}%'.format((new - old) / old * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print('baseline  {} ({})'.format(baseline.get('commit'), baseline.get('timestamp')))
+    print('candidate {} ({})'.format(candidate.get('commit'), candidate.get('timestamp')))
+    for name in sorted(set(baseline.get('endpoints', {})) | set(candidate.get('endpoints', {}))):
+        old = baseline['endpoints'].get(name, {})
+        new = candidate['endpoints'].get(name, {})
+        print(name)
+        for metric in METRICS:
+            if metric in old or metric in new:
+                print('  {:<15} {:>10} -> {:>10} {}'.format(
+                    metric, old.get(metric, '-'), new.get(metric, '-'),
+                    _delta(old.get(metric), new.get(metric, 0))))
+
+
+if __name__ == '__main__':
+    main()
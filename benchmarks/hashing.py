@@ -0,0 +1,105 @@
+"""Password hashing benchmark: logins/sec per core for each hashing setting.
+
+    python -m benchmarks.hashing --methods pbkdf2:sha256:260000 pbkdf2:sha256:600000 scrypt:32768:8:1
+
+For each method, verifications of a stored hash run first on one thread (the cost of one login
+on one core), then concurrently through PasswordHasher's pool with --workers threads, which is
+what /login does under a storm. Results are saved as JSON under benchmarks/results/ with one
+entry per method, comparable with benchmarks.compare.
+"""
+import argparse
+import os
+import threading
+import time
+
+from benchmarks.report import save_results, summarize
+from passwords import HashingBusy, PasswordHasher
+
+BENCH_PASSWORD = 'bench123'
+REJECT_BACKOFF = 0.05  # seconds a rejected client waits, like a browser honouring Retry-After
+DEFAULT_METHODS = ('pbkdf2:sha256:100000', 'pbkdf2:sha256:260000', 'pbkdf2:sha256:600000', 'scrypt:32768:8:1')
+
+
+def single_thread(hasher, password_hash, seconds):
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline or not samples:
+        start = time.perf_counter()
+        hasher.verify(password_hash, BENCH_PASSWORD)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def pooled(hasher, password_hash, seconds, clients):
+    # Clients log in back to back through the pool and back off briefly when rejected
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                hasher.verify(password_hash, BENCH_PASSWORD)
+            except HashingBusy:
+                time.sleep(REJECT_BACKOFF)
+                continue
+            with lock:
+                samples.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def run(methods, seconds, workers, clients):
+    cores = os.cpu_count() or 1
+    endpoints = {}
+    for method in methods:
+        hasher = PasswordHasher(method, workers=0)
+        password_hash = hasher.hash(BENCH_PASSWORD)
+        single = summarize(single_thread(hasher, password_hash, seconds))
+
+        hasher.configure(method, workers=workers)
+        samples, elapsed = pooled(hasher, password_hash, seconds, clients)
+        summary = summarize(samples, elapsed)
+        summary.update({
+            'single_thread_ms': single['p50_ms'],
+            'logins_per_sec_per_core': round(1000 / single['mean_ms'], 1),
+            'logins_per_sec_per_worker': round(summary.get('throughput_rps', 0) / min(workers, cores), 1),
+            'rejected': hasher.rejected
+        })
+        endpoints[hasher.method] = summary
+    return {'cores': cores, 'workers': workers, 'clients': clients, 'seconds': seconds, 'endpoints': endpoints}
+
+
+def print_results(results):
+    print('{cores} cores, {workers} pool workers, {clients} concurrent clients'.format(**results))
+    print('{:<24} {:>10} {:>12} {:>10} {:>9} {:>9} {:>9}'.format(
+        'method', '1-thread', 'login/s/core', 'pool /s', 'p50 ms', 'p95 ms', 'rejected'))
+    for method, s in results['endpoints'].items():
+        print('{:<24} {:>8.2f}ms {:>12.1f} {:>10.1f} {:>9.2f} {:>9.2f} {:>9}'.format(
+            method, s['single_thread_ms'], s['logins_per_sec_per_core'], s.get('throughput_rps', 0),
+            s['p50_ms'], s['p95_ms'], s['rejected']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help='werkzeug hash methods to compare')
+    parser.add_argument('--seconds', type=float, default=3, help='Measurement time per phase and method')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing pool threads')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent logins against the pool')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    results = run(args.methods, args.seconds, args.workers, args.clients)
+    print_results(results)
+    print('Saved', save_results('hashing', results, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""Load test driving the full quiz lifecycle with concurrent virtual users.
+
+    python -m benchmarks.load_test --database-url sqlite:///bench.db --seed-data --vus 20 --iterations 5
+
+Each virtual user registers, logs in, then repeats start_quiz -> 10x get_question/submit_answer ->
+finish_quiz -> results. Per-endpoint latency percentiles, throughput and DB query counts are
+printed and saved as JSON under benchmarks/results/ for comparison across commits.
+
+--mode wsgi serves the Flask app over HTTP with werkzeug's threaded server; --mode asgi serves
+asgi.application with uvicorn, so the two paths can be compared with benchmarks.compare. Query
+counts cover the Flask views only.
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from benchmarks.report import configure_database, save_results, summarize
+
+BENCH_PASSWORD = 'bench123'
+LOGIN_RETRIES = 10
+QUIZ_RETRIES = 10
+RETRY_AFTER = 0.5  # seconds before retrying a 429 or 503
+SHED_STATUSES = (429, 503)
+
+
+class TestClientTransport:
+    # In-process requests through Flask's test client
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTransport:
+    # Real HTTP requests against a WSGI server, with a per-user cookie jar
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        try:
+            with self.opener.open(req) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.queries = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def timed(self, transport, name, method, path, payload=None, expect=200, retries=0):
+        # 429/503 mean the server shed load or rate limited; retried after a pause instead of counted as errors
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            status, body = transport.request(method, path, payload)
+            elapsed = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.latencies[name].append(elapsed)
+                if status in SHED_STATUSES and attempt < retries:
+                    self.rejected[name] += 1
+                elif status != expect:
+                    self.errors[name] += 1
+            if status not in SHED_STATUSES:
+                break
+            time.sleep(RETRY_AFTER)
+        return status, body
+
+
+def install_query_counter(app, recorder):
+    # Count SQL statements per request on the server side, keyed by endpoint
+    from flask import g, request
+    from query_budget import count_queries
+
+    @app.before_request
+    def _start_counting():
+        g.bench_counter = count_queries()
+        g.bench_counter.__enter__()
+
+    @app.teardown_request
+    def _stop_counting(exc):
+        counter = g.pop('bench_counter', None)
+        if counter is not None:
+            counter.__exit__(None, None, None)
+            with recorder.lock:
+                recorder.queries[(request.endpoint or '').rpartition('.')[2]].append(counter.count)
+
+
+def start_uvicorn():
+    import uvicorn
+    from asgi import application
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(application, host='127.0.0.1', port=port,
+                                           log_level='error', backlog=4096))
+    server.thread = threading.Thread(target=server.run, daemon=True)
+    server.thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def answer_for(question, rng):
+    if question.get('type') == 'mcq':
+        return rng.choice(question.get('options') or [''])
+    if question.get('type') == 'true_false':
+        return rng.choice(['True', 'False'])
+    return 'Answer'
+
+
+def virtual_user(transport, recorder, index, run_id, iterations, buckets, rng):
+    username = 'vu_{}_{}'.format(run_id, index)
+    recorder.timed(transport, 'register', 'POST', '/register', {
+        'username': username,
+        'email': '{}@example.com'.format(username),
+        'full_name': 'Virtual User {}'.format(index),
+        'password': BENCH_PASSWORD
+    }, retries=LOGIN_RETRIES)
+    status, _ = recorder.timed(transport, 'login', 'POST', '/login',
+                               {'username': username, 'password': BENCH_PASSWORD}, retries=LOGIN_RETRIES)
+    if status != 200:
+        return
+
+    for _ in range(iterations):
+        category_id, difficulty = rng.choice(buckets)
+        status, body = recorder.timed(transport, 'start_quiz', 'POST', '/start_quiz',
+                                      {'category_id': category_id, 'difficulty': difficulty}, retries=QUIZ_RETRIES)
+        if status != 200:
+            continue
+
+        for number in range(10):
+            status, question = recorder.timed(transport, 'get_question', 'GET',
+                                              '/get_question/{}'.format(number), retries=QUIZ_RETRIES)
+            if status != 200:
+                break
+            recorder.timed(transport, 'submit_answer', 'POST', '/submit_answer', {
+                'question_id': question['id'],
+                'answer': answer_for(question, rng),
+                'time_taken': rng.randint(3, 60)
+            }, retries=QUIZ_RETRIES)
+
+        status, body = recorder.timed(transport, 'finish_quiz', 'POST', '/finish_quiz',
+                                      {'total_time': rng.randint(60, 600)}, retries=QUIZ_RETRIES)
+        if status == 200:
+            recorder.timed(transport, 'results', 'GET', body['redirect'])
+
+
+def run(vus, iterations, mode, rng_seed=0):
+    from models import db, Question
+    if mode == 'asgi':
+        # Passed-through routes run on the app the ASGI entry point created
+        from asgi import app
+    else:
+        from factory import create_app
+        app = create_app()
+
+    with app.app_context():
+        buckets = [(row.category_id, row.difficulty) for row in db.session.query(
+            Question.category_id, Question.difficulty
+        ).group_by(Question.category_id, Question.difficulty).having(db.func.count(Question.id) >= 10).all()]
+        dialect = db.engine.dialect.name
+    if not buckets:
+        raise SystemExit('No category/difficulty bucket has 10 questions; seed the database first')
+
+    recorder = Recorder()
+    install_query_counter(app, recorder)
+
+    server = None
+    if mode == 'wsgi':
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = 'http://127.0.0.1:{}'.format(server.server_port)
+        make_transport = lambda: HTTPTransport(base_url)
+    elif mode == 'asgi':
+        server = start_uvicorn()
+        base_url = 'http://127.0.0.1:{}'.format(server.config.port)
+        make_transport = lambda: HTTPTransport(base_url)
+    else:
+        make_transport = lambda: TestClientTransport(app)
+
+    run_id = '{:x}'.format(int(time.time() * 1000))
+    threads = [
+        threading.Thread(target=virtual_user, args=(
+            make_transport(), recorder, i, run_id, iterations, buckets, random.Random(rng_seed + i)))
+        for i in range(vus)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if mode == 'asgi':
+        server.should_exit = True
+        server.thread.join()
+    elif server:
+        server.shutdown()
+
+    endpoints = {}
+    for name, samples in sorted(recorder.latencies.items()):
+        summary = summarize(samples, elapsed)
+        summary['errors'] = recorder.errors.get(name, 0)
+        summary['rejected'] = recorder.rejected.get(name, 0)
+        query_counts = recorder.queries.get(name, [])
+        if query_counts:
+            summary['queries_mean'] = round(sum(query_counts) / len(query_counts), 2)
+            summary['queries_max'] = max(query_counts)
+        endpoints[name] = summary
+
+    total_requests = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        'mode': mode,
+        'database': dialect,
+        'vus': vus,
+        'iterations': iterations,
+        'elapsed_s': round(elapsed, 3),
+        'requests': total_requests,
+        'throughput_rps': round(total_requests / elapsed, 1),
+        'errors': sum(recorder.errors.values()),
+        'rejected': sum(recorder.rejected.values()),
+        'endpoints': endpoints
+    }
+
+
+def print_results(results):
+    print('{mode} mode, {database}, {vus} VUs x {iterations} quizzes: {requests} requests in '
+          '{elapsed_s}s ({throughput_rps} req/s, {errors} errors, {rejected} rejected)'.format(**results))
+    print('{:<15} {:>7} {:>9} {:>9} {:>9} {:>9} {:>8} {:>7}'.format(
+        'endpoint', 'count', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries', 'errors'))
+    for name, s in results['endpoints'].items():
+        print('{:<15} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.1f} {:>8} {:>7}'.format(
+            name, s['count'], s['p50_ms'], s['p95_ms'], s['p99_ms'], s['throughput_rps'],
+            s.get('queries_mean', '-'), s['errors']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Database to use; defaults to DATABASE_URL')
+    parser.add_argument('--seed-data', action='store_true', help='Recreate and seed the database first')
+    parser.add_argument('--users', type=int, default=1000, help='Seeded users (with --seed-data)')
+    parser.add_argument('--questions', type=int, default=5000, help='Seeded questions (with --seed-data)')
+    parser.add_argument('--quizzes', type=int, default=20000, help='Seeded quizzes (with --seed-data)')
+    parser.add_argument('--vus', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=3, help='Quizzes per virtual user')
+    parser.add_argument('--mode', choices=['testclient', 'wsgi', 'asgi'], default='testclient')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    configure_database(args.database_url)
+    if args.seed_data:
+        from benchmarks.seed import seed
+        seed(args.users, args.questions, args.quizzes)
+
+    results = run(args.vus, args.iterations, args.mode)
+    print_results(results)
+    print('Saved', save_results('load_test', results, args.output))
+
+
+if __name__ == '__main__':
+    main()
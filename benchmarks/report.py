@@ -0,0 +1,64 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples_ms, elapsed=None):
+    # Latency summary for a list of millisecond samples
+    values = sorted(samples_ms)
+    summary = {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+    }
+    if elapsed:
+        summary['throughput_rps'] = round(len(values) / elapsed, 1)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(RESULTS_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(name, data, output=None):
+    # Write machine-readable results tagged with the commit they were measured on
+    commit = git_commit()
+    data = dict(data, benchmark=name, commit=commit,
+                timestamp=datetime.utcnow().isoformat() + 'Z',
+                python=platform.python_version(), platform=platform.platform())
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, '{}-{}-{}.json'.format(
+            name, commit, time.strftime('%Y%m%d-%H%M%S')))
+    with open(output, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    return output
+
+
+def configure_database(database_url):
+    # Must run before create_app: config.py reads the environment when it is first imported
+    if database_url:
+        os.environ['DATABASE_URL'] = database_url
+    if not os.environ.get('DATABASE_URL'):
+        raise SystemExit('Set DATABASE_URL or pass --database-url (the benchmark rewrites that database)')
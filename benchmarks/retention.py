@@ -0,0 +1,175 @@
+"""Retention benchmark: live table size and history/report latency before and after archiving.
+
+    python -m benchmarks.retention --database-url sqlite:///bench.db --seed-data --hot-months 1
+
+Measures the rows and on-disk bytes of the quiz and quiz_answer tables (with their indexes), then
+times quiz history pages (first page and paging to the end), the profile page, results pages for a
+fixed sample of quizzes and the admin reports and exports. It then runs the retention job (purge,
+archive every month older than --hot-months, VACUUM) and measures the same again, so the results
+show what the live tables shed and what reading archived months costs. The database is modified:
+use a benchmark copy. Results are saved as JSON under benchmarks/results/ with one entry per
+endpoint and phase, comparable with benchmarks.compare.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.report import configure_database, save_results, summarize
+
+TABLES = ('quiz', 'quiz_answer')
+
+
+def table_sizes(db):
+    # {table: {'rows': n, 'bytes': n}} including the table's indexes
+    sizes = {}
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        for table in TABLES:
+            rows = conn.exec_driver_sql('SELECT COUNT(*) FROM {}'.format(table)).scalar()
+            if dialect == 'postgresql':
+                size = conn.exec_driver_sql("SELECT pg_total_relation_size('{}')".format(table)).scalar()
+            else:
+                # dbstat is compiled into most SQLite builds; without it only the whole file is known
+                try:
+                    size = conn.exec_driver_sql(
+                        'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                        "(SELECT name FROM sqlite_master WHERE tbl_name = '{}')".format(table)).scalar()
+                except OperationalError:
+                    size = None
+            sizes[table] = {'rows': rows, 'bytes': size}
+        if dialect == 'sqlite':
+            page_size = conn.exec_driver_sql('PRAGMA page_size').scalar()
+            sizes['database_file'] = {'bytes': page_size * conn.exec_driver_sql('PRAGMA page_count').scalar()}
+    return sizes
+
+
+def timed(samples, client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    samples.append((time.perf_counter() - start) * 1000)
+    if response.status_code != 200:
+        raise SystemExit('{} returned {}'.format(url, response.status_code))
+    return response
+
+
+def measure(app, users, quiz_ids, rounds):
+    samples = {name: [] for name in ('history_first', 'history_page', 'profile', 'results',
+                                     'reports', 'export_quizzes')}
+    admin = app.test_client()
+    admin.post('/admin/login', data={'username': app.config['ADMIN_USERNAME'],
+                                     'password': app.config['ADMIN_PASSWORD_HASH']})
+    for _ in range(rounds):
+        for user_id in users:
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['user_id'] = user_id
+            data = timed(samples['history_first'], client, '/quiz_history?limit=20').get_json()
+            while data['next_cursor']:
+                data = timed(samples['history_page'], client,
+                             '/quiz_history?limit=20&after=' + data['next_cursor']).get_json()
+            timed(samples['profile'], client, '/profile')
+            for quiz_id in quiz_ids[user_id]:
+                timed(samples['results'], client, '/results/{}'.format(quiz_id))
+        timed(samples['reports'], admin, '/admin/reports')
+        start = time.perf_counter()
+        response = admin.get('/admin/export/quizzes?format=csv')
+        response.get_data()
+        samples['export_quizzes'].append((time.perf_counter() - start) * 1000)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def run(hot_months, sample_users, rounds, seed):
+    from factory import create_app
+    from models import db, Quiz
+    from retention import run_retention
+    from services import get_services
+
+    app = create_app(RATE_LIMIT_ENABLED=False, STATIC_ASSETS_ENABLED=False)
+    quiz_archive = get_services(app).quiz_archive
+    rng = random.Random(seed)
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(Quiz.user_id).distinct()]
+        users = rng.sample(user_ids, min(sample_users, len(user_ids)))
+        quiz_ids = {}
+        for user_id in users:
+            ids = [quiz_id for (quiz_id,) in db.session.query(Quiz.id).filter_by(user_id=user_id)]
+            quiz_ids[user_id] = rng.sample(ids, min(3, len(ids)))
+        before_sizes = table_sizes(db)
+
+    before = measure(app, users, quiz_ids, rounds)
+    with app.app_context():
+        started = time.perf_counter()
+        report = run_retention(quiz_archive, hot_months, app.config['RETENTION_ABANDONED_HOURS'],
+                               app.config['RETENTION_BATCH_SIZE'])
+        retention_seconds = time.perf_counter() - started
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql('VACUUM ANALYZE quiz, quiz_answer' if db.engine.dialect.name == 'postgresql'
+                                 else 'VACUUM')
+        after_sizes = table_sizes(db)
+        archive = quiz_archive.get_stats()
+    after = measure(app, users, quiz_ids, rounds)
+
+    endpoints = {}
+    for name in before:
+        endpoints[name + ':before'] = before[name]
+        endpoints[name + ':after'] = after[name]
+    return {
+        'hot_months': hot_months,
+        'users_sampled': len(users),
+        'rounds': rounds,
+        'retention_seconds': round(retention_seconds, 3),
+        'purged_quizzes': report['purged_quizzes'],
+        'archived_months': sorted(report['archived']),
+        'tables': {'before': before_sizes, 'after': after_sizes},
+        'archive': {key: archive[key] for key in ('quizzes', 'answers', 'bytes')},
+        'endpoints': endpoints
+    }
+
+
+def print_results(results):
+    print('Archived {} in {:.2f}s; purged {} abandoned quizzes'.format(
+        ', '.join(results['archived_months']) or 'nothing', results['retention_seconds'], results['purged_quizzes']))
+    print('{:<15} {:>12} {:>14} {:>12} {:>14}'.format('table', 'rows before', 'bytes before', 'rows after', 'bytes after'))
+    for name, before in results['tables']['before'].items():
+        after = results['tables']['after'][name]
+        print('{:<15} {:>12} {:>14} {:>12} {:>14}'.format(
+            name, before.get('rows', '-'), before['bytes'] or '-', after.get('rows', '-'), after['bytes'] or '-'))
+    archive = results['archive']
+    print('{:<15} {:>12} {:>14}'.format('archive', archive['quizzes'], archive['bytes']))
+    print('{:<22} {:>7} {:>9} {:>9} {:>9}'.format('endpoint', 'count', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for name, s in results['endpoints'].items():
+        print('{:<22} {:>7} {:>9.2f} {:>9.2f} {:>9.2f}'.format(name, s['count'], s['p50_ms'], s['p95_ms'], s['p99_ms']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Database to use; defaults to DATABASE_URL')
+    parser.add_argument('--seed-data', action='store_true', help='Recreate and seed the database first')
+    parser.add_argument('--users', type=int, default=1000, help='Seeded users (with --seed-data)')
+    parser.add_argument('--questions', type=int, default=5000, help='Seeded questions (with --seed-data)')
+    parser.add_argument('--quizzes', type=int, default=20000, help='Seeded quizzes (with --seed-data)')
+    parser.add_argument('--hot-months', type=int, default=1, help='Months kept live (the seed spans 90 days)')
+    parser.add_argument('--sample-users', type=int, default=20, help='Users whose pages are timed')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the sampled users')
+    parser.add_argument('--archive-dir', help='Archive directory (default: a new temporary directory)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the sample')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    configure_database(args.database_url)
+    os.environ['ARCHIVE_DIR'] = args.archive_dir or tempfile.mkdtemp(prefix='quiz-archive-')
+    if args.seed_data:
+        from benchmarks.seed import seed
+        seed(args.users, args.questions, args.quizzes)
+
+    results = run(args.hot_months, args.sample_users, args.rounds, args.seed)
+    print_results(results)
+    print('Saved', save_results('retention', results, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Synthetic data generator: init_db.py's seed scaled to N users, M questions and K quizzes.
+
+    python -m benchmarks.seed --database-url sqlite:///bench.db --users 1000 --questions 5000 --quizzes 20000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.report import configure_database
+
+BENCH_PASSWORD = 'bench123'
+DIFFICULTIES = ('easy', 'medium', 'hard')
+BATCH_SIZE = 5000
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def seed(users, questions, quizzes, rng_seed=0, log=print):
+    from factory import create_app
+    from init_db import init_database
+    from models import db, Category, Question, Quiz, QuizAnswer, User, UserStats, ReportRollup, QuestionStats, UserSeenQuestions
+    from question_import import import_questions
+
+    rng = random.Random(rng_seed)
+    app = create_app()
+    init_database(app)
+
+    with app.app_context():
+        started = time.perf_counter()
+        categories = Category.query.order_by(Category.id).all()
+
+        # Users share one password hash so seeding does not pay the hashing cost N times
+        template = User(username='template', email='template@example.com', full_name='Template')
+        template.set_password(BENCH_PASSWORD)
+        now = datetime.utcnow()
+        _insert(db, User, [{
+            'username': 'bench_user_{}'.format(i),
+            'email': 'bench_user_{}@example.com'.format(i),
+            'full_name': 'Bench User {}'.format(i),
+            'password_hash': template.password_hash,
+            'created_at': now
+        } for i in range(users)])
+        log('{} users'.format(users))
+
+        # Questions are spread round-robin over every (category, difficulty) bucket
+        buckets = [(category, difficulty) for category in categories for difficulty in DIFFICULTIES]
+        rows = []
+        for i in range(questions):
+            category, difficulty = buckets[i % len(buckets)]
+            question_type = ('mcq', 'true_false', 'fill_blank')[i % 3]
+            row = {
+                'text': 'Synthetic question {} about {}?'.format(i, category.name),
+                'question_type': question_type,
+                'difficulty': difficulty,
+                'category_id': category.id,
+                'explanation': 'Synthetic explanation {}'.format(i),
+            }
+            if question_type == 'mcq':
+                row['options'] = ['Option A', 'Option B', 'Option C', 'Option D']
+                row['correct_answer'] = rng.choice(row['options'])
+            elif question_type == 'true_false':
+                row['correct_answer'] = rng.choice(['True', 'False'])
+            else:
+                row['correct_answer'] = 'Answer {}'.format(i)
+            rows.append((i + 1, row))
+        report = import_questions(rows, chunk_size=BATCH_SIZE)
+        log('{} questions ({:.0f} rows/sec)'.format(report.imported, report.rows_per_sec))
+
+        # Historical quizzes with ten answers each
+        user_ids = [row.id for row in db.session.query(User.id).all()]
+        bucket_questions = {}
+        for row in db.session.query(Question.id, Question.category_id, Question.difficulty).all():
+            bucket_questions.setdefault((row.category_id, row.difficulty), []).append(row.id)
+        playable = [bucket for bucket, ids in bucket_questions.items() if len(ids) >= 10]
+
+        next_quiz_id = (db.session.query(db.func.max(Quiz.id)).scalar() or 0) + 1
+        quiz_rows = []
+        answer_rows = []
+        stats = {}
+        for i in range(quizzes if playable else 0):
+            quiz_id = next_quiz_id + i
+            user_id = rng.choice(user_ids)
+            category_id, difficulty = rng.choice(playable)
+            results = [rng.random() < 0.6 for _ in range(10)]
+            times = [rng.randint(3, 60) for _ in range(10)]
+            score = sum(results)
+            quiz_rows.append({
+                'id': quiz_id,
+                'user_id': user_id,
+                'category_id': category_id,
+                'difficulty': difficulty,
+                'score': score,
+                'total_questions': 10,
+                'time_taken': sum(times),
+                'completed_at': now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+            })
+            for question_id, is_correct, time_taken in zip(
+                    rng.sample(bucket_questions[(category_id, difficulty)], 10), results, times):
+                answer_rows.append({
+                    'quiz_id': quiz_id,
+                    'question_id': question_id,
+                    'user_answer': 'Option A',
+                    'is_correct': is_correct,
+                    'time_taken': time_taken
+                })
+
+            user_stats = stats.setdefault(user_id, [0, 0, 0, 0, {}])
+            user_stats[0] += 1
+            user_stats[1] += score
+            user_stats[2] = max(user_stats[2], score)
+            user_stats[3] += sum(times)
+            user_stats[4][str(category_id)] = user_stats[4].get(str(category_id), 0) + 1
+
+            if len(answer_rows) >= BATCH_SIZE * 10:
+                _insert(db, Quiz, quiz_rows)
+                _insert(db, QuizAnswer, answer_rows)
+                quiz_rows, answer_rows = [], []
+        _insert(db, Quiz, quiz_rows)
+        _insert(db, QuizAnswer, answer_rows)
+        log('{} quizzes, {} answers'.format(quizzes, quizzes * 10))
+
+        # Materialized aggregates are computed alongside the history instead of rebuilt per user
+        _insert(db, UserStats, [{
+            'user_id': user_id,
+            'total_quizzes': count,
+            'total_score': total,
+            'best_score': best,
+            'total_time': total_time,
+            'category_counts': json.dumps(counts)
+        } for user_id, (count, total, best, total_time, counts) in stats.items()])
+        ReportRollup.rebuild()
+        QuestionStats.rebuild()
+        UserSeenQuestions.rebuild()
+        db.session.commit()
+
+        log('Seeded in {:.1f}s'.format(time.perf_counter() - started))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Database to (re)create; defaults to DATABASE_URL')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--quizzes', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    configure_database(args.database_url)
+    seed(args.users, args.questions, args.quizzes, args.seed)
+
+
+if __name__ == '__main__':
+    main()
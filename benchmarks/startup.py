@@ -0,0 +1,110 @@
+"""Cold-start benchmark: import, create_app and first-request time in fresh interpreters.
+
+    python -m benchmarks.startup --database-url sqlite:///bench.db --runs 10
+
+Each run starts a new `python -X importtime` process that imports the app factory, builds the
+app and serves GET /login through the test client, which is what a pre-forked worker or a
+serverless cold start pays before its first response. Per-phase percentiles are saved as JSON
+under benchmarks/results/ (comparable with benchmarks.compare), along with the modules that
+contribute most import time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks.report import configure_database, save_results, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ('import', 'create_app', 'first_request', 'total')
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+from factory import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get('/login').status_code
+served = time.perf_counter()
+print(json.dumps({'status': status, 'import': imported - start, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - start}))
+'''
+
+
+def parse_importtime(stderr):
+    # {module: (self_us, cumulative_us)} from -X importtime output
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def probe():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def run(runs, top):
+    samples = defaultdict(list)
+    self_times = defaultdict(list)
+    for _ in range(runs):
+        timings, modules = probe()
+        if timings['status'] != 200:
+            raise SystemExit('GET /login returned {}'.format(timings['status']))
+        for phase in PHASES:
+            samples[phase].append(timings[phase] * 1000)
+        for name, (self_us, _) in modules.items():
+            self_times[name].append(self_us / 1000)
+
+    # Median self time per module, so one slow run does not dominate the ranking
+    medians = {name: sorted(values)[len(values) // 2] for name, values in self_times.items()}
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+    local = {name: ms for name, ms in medians.items()
+             if os.path.exists(os.path.join(ROOT, name.split('.')[0] + '.py'))
+             or os.path.isdir(os.path.join(ROOT, name.split('.')[0]))}
+    return {
+        'runs': runs,
+        'modules_imported': len(medians),
+        'endpoints': {phase: summarize(samples[phase]) for phase in PHASES},
+        'slowest_imports_ms': [[name, round(ms, 3)] for name, ms in slowest],
+        'app_imports_ms': round(sum(local.values()), 3)
+    }
+
+
+def print_results(results):
+    print('{runs} cold starts, {modules_imported} modules imported, '
+          '{app_imports_ms} ms self time in app modules'.format(**results))
+    print('{:<15} {:>9} {:>9} {:>9} {:>9}'.format('phase', 'p50 ms', 'p95 ms', 'max ms', 'mean ms'))
+    for phase, s in results['endpoints'].items():
+        print('{:<15} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+            phase, s['p50_ms'], s['p95_ms'], s['max_ms'], s['mean_ms']))
+    print('\nslowest imports (median self time):')
+    for name, ms in results['slowest_imports_ms']:
+        print('{:>9.2f} ms  {}'.format(ms, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Database to configure; defaults to DATABASE_URL')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreter runs')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to report')
+    parser.add_argument('--output', help='Results JSON path (default: benchmarks/results/...)')
+    args = parser.parse_args()
+
+    configure_database(args.database_url)
+    results = run(args.runs, args.top)
+    print_results(results)
+    print('Saved', save_results('startup', results, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, conflict_insert, CacheVersion, Question
+
+# Bumped whenever stored question content or answer keys change, so every worker drops its cached copies
+QUESTIONS_VERSION = 'questions'
+
+
+def bump_version(session, name):
+    # Atomic increment in the caller's transaction; concurrent first bumps cannot collide on the insert
+    table = CacheVersion.__table__
+    session.execute(
+        conflict_insert(session, table).values(name=name, version=1)
+        .on_conflict_do_update(index_elements=['name'], set_={'version': table.c.version + 1})
+    )
+
+
+class VersionWatch:
+    # Per-process view of one shared version counter, read at most every check_interval seconds
+    def __init__(self, name, check_interval=5):
+        self.name = name
+        self.check_interval = check_interval
+        self.version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self.version is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def changed(self, session=None):
+        # True when the shared version moved since the last check; the first check only records it
+        if not self.is_stale():
+            return False
+
+        session = session or db.session
+        with self._lock:
+            if not self.is_stale():
+                return False
+            version = session.query(CacheVersion.version).filter_by(name=self.name).scalar() or 0
+            changed = self.version is not None and version != self.version
+            self.version = version
+            self._checked_at = time.monotonic()
+        return changed
+
+
+@event.listens_for(Session, 'before_flush')
+def bump_questions_version(session, flush_context, instances):
+    # Edited or deleted questions may be cached by any worker; new ones cannot be yet
+    if any(isinstance(obj, Question) for obj in list(session.dirty) + list(session.deleted)):
+        bump_version(session, QUESTIONS_VERSION)
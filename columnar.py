@@ -0,0 +1,201 @@
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+
+# File layout: row groups of zlib-compressed column blocks, then a JSON footer, its length and MAGIC.
+# Like Parquet, a reader loads the footer and then only the blocks of the columns and row groups it needs.
+MAGIC = b'QZC1'
+TYPES = ('int', 'bool', 'str', 'datetime')  # datetime: naive UTC, stored as integer microseconds
+ROW_GROUP_SIZE = 65536
+COMPRESS_LEVEL = 6
+EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+
+def _ints_to_bytes(values):
+    ints = values if isinstance(values, array) else array('q', values)
+    if sys.byteorder == 'big':
+        ints.byteswap()
+    return ints.tobytes()
+
+
+def _ints_from_bytes(data):
+    ints = array('q')
+    ints.frombytes(data)
+    if sys.byteorder == 'big':
+        ints.byteswap()
+    return ints
+
+
+def _delta(ints):
+    # Sorted and clustered columns (IDs, timestamps) become runs of small numbers that compress well
+    previous = 0
+    out = array('q', bytes(8 * len(ints)))
+    for i, value in enumerate(ints):
+        out[i] = value - previous
+        previous = value
+    return out
+
+
+def _undelta(deltas):
+    total = 0
+    for i, value in enumerate(deltas):
+        total += value
+        deltas[i] = total
+    return deltas
+
+
+def to_micros(value):
+    return ((value.toordinal() - EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second) \
+        * 1000000 + value.microsecond
+
+
+def from_micros(micros):
+    from datetime import datetime, timedelta
+    return datetime(1970, 1, 1) + timedelta(microseconds=micros)
+
+
+class ColumnarWriter:
+    # Streams rows into row groups; the file only appears at its path once close() succeeds
+    def __init__(self, path, schema, index=(), row_group_size=ROW_GROUP_SIZE):
+        self.path = path
+        self.schema = list(schema)  # [(name, type)]
+        self.index = list(index)  # Columns whose min/max per row group let readers skip groups
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._tmp = '%s.%d.tmp' % (path, os.getpid())
+        self._file = open(self._tmp, 'wb')
+        self._groups = []
+        self._buffer = [[] for _ in self.schema]
+
+    def append(self, row):
+        for column, value in zip(self._buffer, row):
+            column.append(value)
+        if len(self._buffer[0]) >= self.row_group_size:
+            self._flush()
+
+    def _block(self, data):
+        offset = self._file.tell()
+        self._file.write(zlib.compress(data, COMPRESS_LEVEL))
+        return [offset, self._file.tell() - offset]
+
+    def _flush(self):
+        count = len(self._buffer[0])
+        if not count:
+            return
+        group = {'rows': count, 'columns': {}}
+        for (name, kind), values in zip(self.schema, self._buffer):
+            blocks = {}
+            if any(value is None for value in values):
+                blocks['nulls'] = self._block(bytes(value is None for value in values))
+            if kind == 'str':
+                encoded = [(value or '').encode('utf-8') for value in values]
+                blocks['lengths'] = self._block(_ints_to_bytes(len(value) for value in encoded))
+                blocks['values'] = self._block(b''.join(encoded))
+            elif kind == 'bool':
+                blocks['values'] = self._block(bytes(bool(value) for value in values))
+            else:
+                if kind == 'datetime':
+                    values = [to_micros(value) if value is not None else 0 for value in values]
+                blocks['values'] = self._block(_ints_to_bytes(_delta([value or 0 for value in values])))
+            group['columns'][name] = blocks
+        names = [name for name, _ in self.schema]
+        group['ranges'] = {}
+        for name in self.index:
+            values = self._buffer[names.index(name)]
+            group['ranges'][name] = [min(values), max(values)]
+        self._groups.append(group)
+        self.rows += count
+        self._buffer = [[] for _ in self.schema]
+
+    def close(self, meta=None):
+        self._flush()
+        footer = json.dumps({'schema': self.schema, 'index': self.index, 'rows': self.rows,
+                             'groups': self._groups, 'meta': meta or {}}).encode()
+        self._file.write(footer)
+        self._file.write(struct.pack('<I', len(footer)) + MAGIC)
+        self._file.close()
+        os.replace(self._tmp, self.path)
+        return os.path.getsize(self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp)
+
+
+class ColumnarFile:
+    # Reads column blocks on demand, keeping the most recently decoded ones
+    def __init__(self, path, max_blocks=64):
+        self.path = path
+        self.max_blocks = max_blocks
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        self._blocks = OrderedDict()
+        self._file.seek(-8, os.SEEK_END)
+        length, magic = struct.unpack('<I4s', self._file.read(8))
+        if magic != MAGIC:
+            raise ValueError('%s is not a columnar archive' % path)
+        self._file.seek(-8 - length, os.SEEK_END)
+        footer = json.loads(self._file.read(length))
+        self.schema = dict((name, kind) for name, kind in footer['schema'])
+        self.index = footer['index']
+        self.rows = footer['rows']
+        self.groups = footer['groups']
+        self.meta = footer['meta']
+
+    def _read(self, block):
+        with self._lock:
+            self._file.seek(block[0])
+            return zlib.decompress(self._file.read(block[1]))
+
+    def column(self, group, name):
+        # Values of one column in one row group: an int array when there are no NULLs, else a list
+        key = (group, name)
+        with self._lock:
+            if key in self._blocks:
+                self._blocks.move_to_end(key)
+                return self._blocks[key]
+
+        blocks = self.groups[group]['columns'][name]
+        kind = self.schema[name]
+        if kind == 'str':
+            data = self._read(blocks['values'])
+            values, start = [], 0
+            for length in _ints_from_bytes(self._read(blocks['lengths'])):
+                values.append(data[start:start + length].decode('utf-8'))
+                start += length
+        elif kind == 'bool':
+            values = [bool(value) for value in self._read(blocks['values'])]
+        else:
+            values = _undelta(_ints_from_bytes(self._read(blocks['values'])))
+            if kind == 'datetime':
+                values = [from_micros(value) for value in values]
+        if 'nulls' in blocks:
+            values = [None if null else value for value, null in zip(values, self._read(blocks['nulls']))]
+
+        with self._lock:
+            self._blocks[key] = values
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return values
+
+    def candidate_groups(self, name, value):
+        # Row groups whose range of the indexed column contains value
+        return [i for i, group in enumerate(self.groups)
+                if group['ranges'][name][0] <= value <= group['ranges'][name][1]]
+
+    def rows_of(self, group, names, start=0, stop=None):
+        columns = [self.column(group, name) for name in names]
+        return list(zip(*[column[start:stop] for column in columns]))
+
+    def iter_groups(self, names):
+        # Every row, one row group (a list of tuples) at a time, in file order
+        for group in range(len(self.groups)):
+            yield self.rows_of(group, names)
+
+    def close(self):
+        self._file.close()
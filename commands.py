@@ -0,0 +1,171 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from grading import regrade_answers
+from models import db, User, UserStats, ReportRollup, QuestionStats, UserSeenQuestions
+from services import question_selector
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats():
+    """Recompute materialized user statistics from quiz history."""
+    for (user_id,) in db.session.query(User.id).all():
+        UserStats.rebuild(user_id)
+    db.session.commit()
+    click.echo('User statistics rebuilt')
+
+@click.command('regrade')
+@with_appcontext
+@click.option('--question-id', 'question_ids', multiple=True, type=int,
+              help='Only re-grade answers to this question (repeatable).')
+def regrade(question_ids):
+    """Re-grade stored quiz answers against the current answer keys."""
+    result = regrade_answers(list(question_ids) or None)
+    click.echo('Checked {checked} answers, changed {changed} in {quizzes} quizzes '
+          '({users} users)'.format(**result))
+
+@click.command('rebuild-reports')
+@with_appcontext
+def rebuild_reports():
+    """Recompute the admin report rollups from finished quizzes."""
+    rollups = ReportRollup.rebuild()
+    db.session.commit()
+    click.echo('Rebuilt {} report rollups'.format(rollups))
+
+@click.command('rebuild-question-stats')
+@with_appcontext
+def rebuild_question_stats():
+    """Recompute per-question answer stats and per-user seen questions from QuizAnswer."""
+    QuestionStats.rebuild()
+    users = UserSeenQuestions.rebuild()
+    db.session.commit()
+    question_selector.invalidate()
+    click.echo('Rebuilt stats for {} questions and seen questions for {} users'.format(
+        QuestionStats.query.count(), users))
+
+@click.command('import-questions')
+@with_appcontext
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+              help='File format (defaults to the file extension).')
+@click.option('--chunk-size', default=None, type=int, help='Rows inserted per transaction.')
+def import_questions_command(path, fmt, chunk_size):
+    """Stream questions from a CSV or JSONL file into the database."""
+    from question_import import import_file
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    
+    def progress(report):
+        click.echo('{} rows, {} imported, {} failed ({:.0f} rows/sec)'.format(
+            report.rows, report.imported, len(report.errors), report.rows_per_sec))
+    
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        report = import_file(f, fmt, chunk_size, progress)
+    
+    for row, message in report.errors:
+        click.echo('Row {}: {}'.format(row, message))
+    click.echo('Imported {} of {} rows in {:.2f}s ({:.0f} rows/sec)'.format(
+        report.imported, report.rows, report.elapsed, report.rows_per_sec))
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db():
+    """Add missing tables, columns and indexes to an existing database."""
+    from migrations import upgrade_database
+    applied = upgrade_database()
+    for step in applied:
+        click.echo(step)
+    click.echo('Database is up to date' if not applied else 'Applied {} changes'.format(len(applied)))
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """EXPLAIN the hot query shapes and fail if any falls back to a table scan."""
+    from query_plans import check_query_plans
+    failed = 0
+    for name, ok, details in check_query_plans():
+        click.echo('{} {}'.format('ok  ' if ok else 'SCAN', name))
+        if not ok:
+            failed += 1
+            for detail in details:
+                click.echo('     {}'.format(detail))
+    if failed:
+        raise SystemExit(1)
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Minify, fingerprint and precompress the CSS and JS under static/ into static/build/."""
+    from static_assets import build_assets, brotli
+    manifest, _ = build_assets(current_app.static_folder)
+    for filename, entry in manifest.items():
+        sizes = entry['sizes']
+        click.echo('{} -> {}: {} bytes, {} minified, {} gzip, {} brotli'.format(
+            filename, entry['path'], sizes['original'], sizes['identity'],
+            sizes.get('gzip', '-'), sizes.get('br', '-')))
+    if brotli is None:
+        click.echo('Brotli is not installed; only gzip variants were built')
+
+@click.command('retention')
+@with_appcontext
+@click.option('--hot-months', default=None, type=int, help='Months kept in the live tables (default RETENTION_HOT_MONTHS).')
+@click.option('--vacuum', is_flag=True, help='Reclaim the freed space afterwards (VACUUM; locks SQLite while it runs).')
+def retention_command(hot_months, vacuum):
+    """Purge abandoned quizzes and move old months of quizzes into the columnar archive."""
+    from retention import run_retention
+    from services import quiz_archive
+    config = current_app.config
+    report = run_retention(quiz_archive, hot_months or config['RETENTION_HOT_MONTHS'],
+                           config['RETENTION_ABANDONED_HOURS'], config['RETENTION_BATCH_SIZE'])
+    click.echo('Purged {} abandoned quizzes and rebuilt stats for {} users'.format(
+        report['purged_quizzes'], report['rebuilt_users']))
+    for month, entry in report['archived'].items():
+        click.echo('Archived {}: {} quizzes, {} answers in {} bytes'.format(
+            month, entry['quizzes_count'], entry['answers_count'], entry['bytes']))
+    if not report['archived']:
+        click.echo('No months before {} left to archive'.format(report['cutoff'][:7]))
+    if vacuum:
+        # VACUUM cannot run inside a transaction
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            if db.engine.dialect.name == 'postgresql':
+                conn.exec_driver_sql('VACUUM ANALYZE quiz, quiz_answer')
+            else:
+                conn.exec_driver_sql('VACUUM')
+        click.echo('Vacuumed the database')
+
+@click.command('item-analysis')
+@with_appcontext
+@click.option('--min-attempts', default=None, type=int, help='Answers needed to calibrate a question (default ITEM_ANALYSIS_MIN_ATTEMPTS).')
+@click.option('--apply', 'apply_moves', is_flag=True, help='Re-bucket mislabelled questions to their calibrated difficulty.')
+def item_analysis_command(min_attempts, apply_moves):
+    """Compute question p-values, discrimination and response times, and optionally re-bucket difficulties."""
+    from item_analysis import analyze, plan_rebucket, apply_rebucket
+    analysis = analyze(db.engine)
+    items = analysis.items(min_attempts or current_app.config['ITEM_ANALYSIS_MIN_ATTEMPTS'])
+    summary = analysis.summary(items)
+    click.echo('Analysed {} answers to {} questions from {} quizzes (statistics in {:.2f}s); {} calibrated'.format(
+        summary['answers'], summary['questions'], summary['quizzes'], summary['seconds'], summary['calibrated']))
+    for flag, count in sorted(summary['flags'].items()):
+        click.echo('  {}: {}'.format(flag, count))
+    click.echo('labelled -> calibrated: ' + ', '.join(
+        '{}->{} {}'.format(label, suggested, count)
+        for label, row in summary['calibration'].items() for suggested, count in row.items() if count))
+    moves = plan_rebucket(items)
+    for question_id, source, target in moves:
+        click.echo('Question {}: {} -> {}'.format(question_id, source, target))
+    if not moves:
+        click.echo('No questions to re-bucket')
+    elif apply_moves:
+        apply_rebucket(moves)
+        db.session.commit()
+        click.echo('Re-bucketed {} questions; running workers use the new buckets within {:g} seconds'.format(
+            len(moves), current_app.config['QUESTION_CACHE_CHECK_INTERVAL']))
+    else:
+        click.echo('Run with --apply to re-bucket {} questions'.format(len(moves)))
+
+
+# Migrations, query plan checks, the importer, the asset build, retention and item analysis load only when their command runs
+COMMANDS = [rebuild_stats, regrade, rebuild_reports, rebuild_question_stats,
+            import_questions_command, upgrade_db, check_query_plans_command, build_assets_command,
+            retention_command, item_analysis_command]
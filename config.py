@@ -1,9 +1,6 @@
 import os
-from dotenv import load_dotenv
 from datetime import timedelta
 
-load_dotenv()
-
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'cricket-quiz-secret-key-2024'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
@@ -12,4 +9,62 @@ class Config:
     ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME') or 'admin'
     ADMIN_PASSWORD_HASH = os.environ.get('ADMIN_PASSWORD_HASH') or \
         'pbkdf2:sha256:260000$randomsalt$hashedadminpassword'  # Replace with hashed password
-    PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)  # Sessions expire after 30 minutes
\ No newline at end of file
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'  # werkzeug method; stored hashes are upgraded on login
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS']) if os.environ.get('PASSWORD_HASH_WORKERS') else None  # Defaults to the CPU count, 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 0))  # Hashes queued or running before logins get 503; 0 means 4 per worker
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # Seconds a request waits for its hash
+    PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)  # Sessions expire after 30 minutes
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')  # Optional read replica for read-only views
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 0))  # Milliseconds (PostgreSQL), 0 disables
+    DB_REPLICA_RETRY_INTERVAL = float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', 30))  # Seconds on the primary after a replica failure
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))  # Reads stay on the primary this long after a write
+    ADAPTIVE_SELECTION = os.environ.get('ADAPTIVE_SELECTION', 'true').lower() in ('1', 'true', 'yes')  # Pick unseen questions matched to the user's skill
+    QUESTION_POOL_TTL = int(os.environ.get('QUESTION_POOL_TTL', 300))  # Seconds before a cached question bucket is reloaded
+    QUESTION_PAYLOAD_CACHE_SIZE = int(os.environ.get('QUESTION_PAYLOAD_CACHE_SIZE', 50000))  # Encoded question payloads kept per process
+    QUESTION_PAYLOAD_WARM_BUCKETS = int(os.environ.get('QUESTION_PAYLOAD_WARM_BUCKETS', 10))  # Most-answered buckets preloaded at startup, 0 disables
+    QUIZ_STORE_BACKEND = os.environ.get('QUIZ_STORE_BACKEND') or 'sqlite'  # sqlite (shared by workers on one host) or memory (single process only)
+    QUIZ_STORE_PATH = os.environ.get('QUIZ_STORE_PATH') or 'quiz_state.db'
+    QUIZ_STORE_MAX_ENTRIES = int(os.environ.get('QUIZ_STORE_MAX_ENTRIES', 10000))
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Per-user limits and load shedding on quiz endpoints
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'  # memory (per process) or sqlite (shared by workers on one host)
+    RATE_LIMIT_PATH = os.environ.get('RATE_LIMIT_PATH') or 'rate_limits.db'
+    RATE_LIMIT_START_QUIZ = os.environ.get('RATE_LIMIT_START_QUIZ', '10/60')  # Burst/seconds to refill it, per user; empty disables
+    RATE_LIMIT_SUBMIT_ANSWER = os.environ.get('RATE_LIMIT_SUBMIT_ANSWER', '60/30')
+    RATE_LIMIT_FINISH_QUIZ = os.environ.get('RATE_LIMIT_FINISH_QUIZ', '10/60')
+    RATE_LIMIT_MAX_CONCURRENT = int(os.environ['RATE_LIMIT_MAX_CONCURRENT']) if os.environ.get('RATE_LIMIT_MAX_CONCURRENT') else None  # Quiz requests in flight per process; defaults to DB pool size + overflow, 0 disables
+    STATIC_ASSETS_ENABLED = os.environ.get('STATIC_ASSETS_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Minified, fingerprinted, precompressed CSS/JS
+    ANSWER_BUFFER_ENABLED = os.environ.get('ANSWER_BUFFER_ENABLED', '').lower() in ('1', 'true', 'yes')  # Write-behind answer storage; the queue is per worker process
+    ANSWER_BUFFER_SIZE = int(os.environ.get('ANSWER_BUFFER_SIZE', 500))  # Flush after this many queued answers
+    ANSWER_BUFFER_INTERVAL = float(os.environ.get('ANSWER_BUFFER_INTERVAL', 1.0))  # Flush after this many seconds
+    QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE', '').lower() in ('1', 'true', 'yes')  # Fail views that exceed their query budget
+    REFERENCE_CACHE_CHECK_INTERVAL = float(os.environ.get('REFERENCE_CACHE_CHECK_INTERVAL', 5))  # Seconds between sport/category version checks
+    QUESTION_CACHE_CHECK_INTERVAL = float(os.environ.get('QUESTION_CACHE_CHECK_INTERVAL', 5))  # Seconds between question version checks
+    CATEGORIES_MAX_AGE = int(os.environ.get('CATEGORIES_MAX_AGE', 300))  # Browser cache lifetime for /categories
+    RETENTION_HOT_MONTHS = int(os.environ.get('RETENTION_HOT_MONTHS', 6))  # Months of quizzes kept in the live tables, the current one included
+    RETENTION_ABANDONED_HOURS = int(os.environ.get('RETENTION_ABANDONED_HOURS', 24))  # Unfinished quizzes older than this are purged
+    RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 5000))  # Quizzes deleted per transaction by the retention job
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or 'archive'  # Compressed columnar files of archived months
+    ARCHIVE_CACHE_BLOCKS = int(os.environ.get('ARCHIVE_CACHE_BLOCKS', 256))  # Decoded column blocks kept per archive file
+    ITEM_ANALYSIS_MIN_ATTEMPTS = int(os.environ.get('ITEM_ANALYSIS_MIN_ATTEMPTS', 30))  # Answers a question needs before it is calibrated or flagged
+    ITEM_ANALYSIS_CACHE_SECONDS = int(os.environ.get('ITEM_ANALYSIS_CACHE_SECONDS', 600))  # Seconds the admin analytics page reuses its last analysis
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))  # Questions inserted per transaction by bulk imports
+    LIVE_BROKER = os.environ.get('LIVE_BROKER') or 'local'  # Fan-out of live room events; local keeps rooms in this process
+    LIVE_QUESTION_SECONDS = int(os.environ.get('LIVE_QUESTION_SECONDS', 20))  # Default time to answer in live rooms
+    LIVE_REVEAL_SECONDS = int(os.environ.get('LIVE_REVEAL_SECONDS', 5))  # Pause showing the answer and leaderboard
+    LIVE_SUBSCRIBER_QUEUE = int(os.environ.get('LIVE_SUBSCRIBER_QUEUE', 64))  # Events a slow SSE client may lag before it is dropped
+    LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', 15))  # Keep-alive comment interval on idle streams
+    LIVE_ROOM_TTL = int(os.environ.get('LIVE_ROOM_TTL', 600))  # Seconds a finished room stays listed
+    LIVE_ANSWER_BATCH = int(os.environ.get('LIVE_ANSWER_BATCH', 5000))  # Live answers buffered before an early flush
+    ASYNC_DATABASE_URL = os.environ.get('ASYNC_DATABASE_URL')  # Defaults to DATABASE_URL with an asyncio driver
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))  # Connections kept by the ASGI API's pool
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 20))
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '').lower() in ('1', 'true', 'yes')  # Per-endpoint request metrics
+    INSTRUMENTATION_PROFILE_RATE = float(os.environ.get('INSTRUMENTATION_PROFILE_RATE', 0))  # Fraction of requests run under cProfile
+    INSTRUMENTATION_PROFILE_DIR = os.environ.get('INSTRUMENTATION_PROFILE_DIR') or 'profiles'
+    INSTRUMENTATION_PROFILE_KEEP = int(os.environ.get('INSTRUMENTATION_PROFILE_KEEP', 20))  # Slowest profiles kept on disk
@@ -0,0 +1,193 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+REPLICA_BIND = 'replica'
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long checkouts wait for a connection
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def wait_stats(self):
+        with self._stats_lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_ms_avg': round(self.wait_time / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'wait_ms_max': round(self.max_wait * 1000, 3)
+            }
+
+
+class ReplicaHealth:
+    # Replica reads are skipped for retry_interval seconds after a connection failure
+    def __init__(self, retry_interval=30):
+        self.retry_interval = retry_interval
+        self.down_until = 0
+        self.failures = 0
+
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self):
+        self.failures += 1
+        self.down_until = time.monotonic() + self.retry_interval
+
+
+replica_health = ReplicaHealth()
+
+
+def engine_options(url, config):
+    # Pool and connection options for one engine, from the DB_* settings
+    url = make_url(url)
+    backend = url.get_backend_name()
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+
+    # In-memory SQLite lives in a single connection and keeps its own pool
+    if not (backend == 'sqlite' and url.database in (None, '', ':memory:')):
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT']
+        })
+
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT']:
+        options['connect_args'] = {'options': '-c statement_timeout={}'.format(config['DB_STATEMENT_TIMEOUT'])}
+    return options
+
+
+def configure_engines(app):
+    # Fill SQLALCHEMY_ENGINE_OPTIONS and the replica bind; call before db.init_app
+    config = app.config
+    options = engine_options(config['SQLALCHEMY_DATABASE_URI'], config)
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    replica_health.retry_interval = config['DB_REPLICA_RETRY_INTERVAL']
+    if config['DATABASE_REPLICA_URL']:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = dict(engine_options(config['DATABASE_REPLICA_URL'], config),
+                                   url=config['DATABASE_REPLICA_URL'])
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def _replica_connection_error(context):
+    if context.is_disconnect or context.connection is None:
+        replica_health.mark_down()
+
+
+def _wrote_recently():
+    # Read-your-writes: users who just committed keep reading from the primary for a while
+    wrote_at = flask_session.get('db_wrote_at')
+    return wrote_at is not None and time.time() - wrote_at < current_app.config['DB_REPLICA_STICKY_SECONDS']
+
+
+class RoutingSession(Session):
+    # Sends SELECTs issued inside @read_replica views to the replica engine
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('db_read_replica')
+                and (clause is None or getattr(clause, 'is_select', False))):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _note_write(session, flush_context, instances):
+    session.info['db_wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    if session.info.pop('db_wrote', False) and has_request_context() \
+            and REPLICA_BIND in session._db.engines:
+        flask_session['db_wrote_at'] = int(time.time())
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('db_wrote', None)
+
+
+def read_replica(f):
+    # Run a read-only view against the replica, falling back to the primary
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        db = current_app.extensions['sqlalchemy']
+        replica = db.engines.get(REPLICA_BIND)
+        if replica is None or not replica_health.available() or _wrote_recently():
+            return f(*args, **kwargs)
+
+        if not event.contains(replica, 'handle_error', _replica_connection_error):
+            event.listen(replica, 'handle_error', _replica_connection_error)
+
+        g.db_read_replica = True
+        try:
+            return f(*args, **kwargs)
+        except exc.OperationalError:
+            current_app.logger.warning('Replica read failed; retrying %s on the primary', f.__name__,
+                                       exc_info=True)
+            if replica_health.available():
+                replica_health.mark_down()
+            db.session.rollback()
+            g.db_read_replica = False
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_replica = False
+    return decorated_function
+
+
+def read_engine(db):
+    # Engine for bulk reads outside a request's session: the replica when it is usable
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is not None and replica_health.available():
+        return replica
+    return db.engine
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow()
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats.update(pool.wait_stats())
+    return stats
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import chain
+
+from models import db, Quiz, QuizAnswer
+from services import quiz_archive
+
+CHUNK_ROWS = 1000  # rows fetched per round trip and written per yielded chunk
+
+EXPORTS = {
+    'quizzes': (Quiz, ['id', 'user_id', 'category_id', 'difficulty', 'score',
+                       'total_questions', 'time_taken', 'completed_at']),
+    'answers': (QuizAnswer, ['id', 'quiz_id', 'question_id', 'user_answer', 'is_correct', 'time_taken']),
+}
+
+
+def _rows(engine, model, columns):
+    # Server-side cursor on its own connection, so memory stays flat however many rows there are
+    table = model.__table__
+    statement = db.select(*[table.c[name] for name in columns]).order_by(table.c.id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=CHUNK_ROWS).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def _drain(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_export(engine, name, fmt):
+    # Encoded chunks of one export ('quizzes' or 'answers') as 'csv' or 'jsonl';
+    # archived months come first, then the live table by ID
+    model, columns = EXPORTS[name]
+    partitions = chain(quiz_archive.iter_rows(name, columns), _rows(engine, model, columns))
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield _drain(buffer)
+        for rows in partitions:
+            writer.writerows(rows)
+            yield _drain(buffer)
+    else:
+        for rows in partitions:
+            yield ''.join(json.dumps(dict(zip(columns, map(_json_value, row)))) + '\n' for row in rows)
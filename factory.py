@@ -0,0 +1,91 @@
+from importlib import import_module
+
+from flask import Flask
+
+# Blueprint modules, each exposing `bp`; imported when an app is created rather than at import time
+BLUEPRINTS = ('views.auth', 'views.quiz', 'views.live', 'views.admin')
+
+
+def create_app(config_object=None, blueprints=BLUEPRINTS, **overrides):
+    # Build a configured app; pass a subset of BLUEPRINTS to boot only what a worker serves
+    if config_object is None:
+        # .env must be loaded before Config reads the environment
+        from dotenv import load_dotenv
+        load_dotenv()
+        from config import Config
+        config_object = Config
+
+    from models import db
+    from archive import QuizArchive
+    from db_routing import configure_engines
+    from grading import AnswerKeyCache
+    from passwords import PasswordHasher
+    from question_payloads import QuestionPayloadCache
+    from question_pool import QuestionPool
+    from question_selection import QuestionSelector
+    from quiz_store import create_quiz_store
+    from reference_cache import ReferenceCache
+    from services import QuizServices
+
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.config.update(overrides)
+
+    configure_engines(app)
+    db.init_app(app)
+
+    services = app.extensions['quiz'] = QuizServices(
+        create_quiz_store(app.config), AnswerKeyCache(check_interval=app.config['QUESTION_CACHE_CHECK_INTERVAL']),
+        QuestionPayloadCache(app.config['QUESTION_PAYLOAD_CACHE_SIZE'], app.config['QUESTION_CACHE_CHECK_INTERVAL'])
+    )
+    services.question_pool = QuestionPool(app.config['QUESTION_POOL_TTL'], app.config['QUESTION_CACHE_CHECK_INTERVAL'])
+    services.question_selector = QuestionSelector(services.question_pool, app.config['QUESTION_POOL_TTL'])
+    services.reference_cache = ReferenceCache(app.config['REFERENCE_CACHE_CHECK_INTERVAL'])
+    services.quiz_archive = QuizArchive(app.config['ARCHIVE_DIR'], app.config['ARCHIVE_CACHE_BLOCKS'])
+    services.password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_SALT_LENGTH'],
+                                              app.config['PASSWORD_HASH_WORKERS'],
+                                              app.config['PASSWORD_HASH_MAX_PENDING'],
+                                              app.config['PASSWORD_HASH_TIMEOUT'])
+    if app.config['QUESTION_PAYLOAD_WARM_BUCKETS']:
+        _warm_question_payloads(app, services.question_payloads)
+    if app.config['ANSWER_BUFFER_ENABLED']:
+        from answer_buffer import AnswerBuffer
+        services.answer_buffer = AnswerBuffer(app, app.config['ANSWER_BUFFER_SIZE'],
+                                              app.config['ANSWER_BUFFER_INTERVAL'])
+        services.answer_buffer.start()
+    if app.config['INSTRUMENTATION_ENABLED']:
+        from instrumentation import Instrumentation
+        services.instrumentation = Instrumentation(app)
+    if app.config['RATE_LIMIT_ENABLED']:
+        from rate_limit import create_rate_limiter
+        services.rate_limiter = create_rate_limiter(app.config)
+
+    from live_broker import create_broker
+    from live_rooms import LiveRooms
+    services.live_rooms = LiveRooms(app, create_broker(app.config), services.answer_keys, services.question_payloads,
+                                    services.question_selector)
+
+    if app.config['STATIC_ASSETS_ENABLED']:
+        from static_assets import StaticAssets
+        services.static_assets = StaticAssets(app)
+
+    for name in blueprints:
+        app.register_blueprint(import_module(name).bp)
+
+    from commands import COMMANDS
+    for command in COMMANDS:
+        app.cli.add_command(command)
+    return app
+
+
+def _warm_question_payloads(app, cache):
+    from sqlalchemy.exc import SQLAlchemyError
+    from models import db
+    with app.app_context():
+        try:
+            cache.warm(app.config['QUESTION_PAYLOAD_WARM_BUCKETS'])
+        except SQLAlchemyError:
+            # A database without tables yet (init_db) or one that is down must not stop the app booting
+            app.logger.warning('Could not warm the question payload cache', exc_info=True)
+        finally:
+            db.session.remove()
@@ -0,0 +1,209 @@
+import re
+import threading
+import unicodedata
+
+from cache_versions import QUESTIONS_VERSION, VersionWatch, bump_version
+from models import db, Question, Quiz, QuizAnswer, UserStats, QuestionStats, ReportRollup
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_answer(text):
+    # Casefold and collapse punctuation/whitespace runs into single spaces
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return _NON_WORD.sub(' ', text).strip()
+
+
+class AnswerKey:
+    # Grading data for one question, normalized once when compiled
+    __slots__ = ('question_id', 'type', 'correct_answer', 'explanation', 'accepted')
+
+    def __init__(self, question):
+        self.question_id = question.id
+        self.type = question.question_type
+        self.correct_answer = question.correct_answer.strip()
+        self.explanation = question.explanation
+
+        if self.type == 'mcq':
+            self.accepted = frozenset([self.correct_answer])
+        elif self.type == 'true_false':
+            self.accepted = frozenset([self.correct_answer.casefold()])
+        else:
+            answers = [self.correct_answer] + question.get_accepted_answers()
+            self.accepted = frozenset(normalize_answer(a) for a in answers if normalize_answer(a))
+
+
+def _grade_mcq(key, user_answer):
+    return user_answer.strip() in key.accepted
+
+
+def _grade_true_false(key, user_answer):
+    return user_answer.strip().casefold() in key.accepted
+
+
+def _grade_fill_blank(key, user_answer):
+    return normalize_answer(user_answer) in key.accepted
+
+
+GRADERS = {
+    'mcq': _grade_mcq,
+    'true_false': _grade_true_false,
+    'fill_blank': _grade_fill_blank,
+}
+
+
+def grade(key, user_answer):
+    grader = GRADERS.get(key.type)
+    if grader is None:
+        return False
+    return grader(key, user_answer or '')
+
+
+def grade_many(keys, answers):
+    # Grade (question_id, user_answer) pairs against a {question_id: AnswerKey} map
+    results = []
+    for question_id, user_answer in answers:
+        key = keys.get(question_id)
+        results.append(grade(key, user_answer) if key else False)
+    return results
+
+
+class AnswerKeyCache:
+    # Compiled answer keys cached per question ID, dropped when the shared questions version changes
+    def __init__(self, max_entries=50000, check_interval=5):
+        self.max_entries = max_entries
+        self.watch = VersionWatch(QUESTIONS_VERSION, check_interval)
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self.watch.is_stale()
+
+    def refresh(self, session=None):
+        # Clears every key once another process edited or regraded questions
+        if self.watch.changed(session):
+            self.invalidate()
+
+    def put(self, question):
+        key = AnswerKey(question)
+        with self._lock:
+            if len(self._keys) >= self.max_entries:
+                self._keys.clear()
+            self._keys[question.id] = key
+        return key
+
+    def peek(self, question_id):
+        # Cached key only, without loading the question; callers refresh() first
+        return self._keys.get(question_id)
+
+    def get(self, question_id):
+        self.refresh()
+        key = self._keys.get(question_id)
+        if key is not None:
+            return key
+
+        question = db.session.get(Question, question_id)
+        if question is None:
+            return None
+        return self.put(question)
+
+    def get_many(self, question_ids):
+        self.refresh()
+        keys = {}
+        missing = []
+        for question_id in set(question_ids):
+            key = self._keys.get(question_id)
+            if key is None:
+                missing.append(question_id)
+            else:
+                keys[question_id] = key
+
+        # Load all misses with a single IN query
+        if missing:
+            for question in Question.query.filter(Question.id.in_(missing)).all():
+                keys[question.id] = self.put(question)
+        return keys
+
+    def invalidate(self, question_id=None):
+        with self._lock:
+            if question_id is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(question_id, None)
+
+
+def regrade_answers(question_ids=None, chunk_size=1000):
+    # Re-score stored QuizAnswer rows in bulk, e.g. after an answer key fix; archived months are left as graded
+    query = Question.query
+    if question_ids:
+        query = query.filter(Question.id.in_(question_ids))
+    keys = {question.id: AnswerKey(question) for question in query.all()}
+    # Keys may have been fixed with plain SQL; every worker reloads them from the rows regraded here
+    bump_version(db.session, QUESTIONS_VERSION)
+    db.session.commit()
+
+    answer_table = QuizAnswer.__table__
+    quiz_table = Quiz.__table__
+    checked = 0
+    changed = 0
+    last_id = 0
+    affected_quizzes = set()
+
+    while True:
+        answer_query = db.session.query(
+            QuizAnswer.id, QuizAnswer.quiz_id, QuizAnswer.question_id,
+            QuizAnswer.user_answer, QuizAnswer.is_correct
+        ).filter(QuizAnswer.id > last_id)
+        if question_ids:
+            answer_query = answer_query.filter(QuizAnswer.question_id.in_(list(keys)))
+        rows = answer_query.order_by(QuizAnswer.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        results = grade_many(keys, [(row.question_id, row.user_answer) for row in rows])
+        updates = []
+        score_deltas = {}
+        for row, is_correct in zip(rows, results):
+            if is_correct != bool(row.is_correct):
+                updates.append({'answer_id': row.id, 'correct': is_correct})
+                score_deltas[row.quiz_id] = score_deltas.get(row.quiz_id, 0) + (1 if is_correct else -1)
+
+        if updates:
+            db.session.execute(
+                answer_table.update()
+                .where(answer_table.c.id == db.bindparam('answer_id'))
+                .values(is_correct=db.bindparam('correct')),
+                updates
+            )
+            score_updates = [{'quiz_id_': quiz_id, 'delta': delta}
+                             for quiz_id, delta in score_deltas.items() if delta]
+            if score_updates:
+                db.session.execute(
+                    quiz_table.update()
+                    .where(quiz_table.c.id == db.bindparam('quiz_id_'))
+                    .values(score=quiz_table.c.score + db.bindparam('delta')),
+                    score_updates
+                )
+            db.session.commit()
+            affected_quizzes.update(score_deltas)
+
+        checked += len(rows)
+        changed += len(updates)
+        last_id = rows[-1].id
+
+    # Scores changed, so the materialized stats of affected users and the report rollups are stale
+    affected_users = set()
+    quiz_ids = list(affected_quizzes)
+    for start in range(0, len(quiz_ids), chunk_size):
+        rows = db.session.query(Quiz.user_id).filter(Quiz.id.in_(quiz_ids[start:start + chunk_size])).all()
+        affected_users.update(row.user_id for row in rows)
+    for user_id in affected_users:
+        UserStats.rebuild(user_id)
+    if affected_quizzes:
+        ReportRollup.rebuild()
+    if changed:
+        QuestionStats.rebuild(list(keys) if question_ids else None)
+    db.session.commit()
+
+    return {'checked': checked, 'changed': changed,
+            'quizzes': len(affected_quizzes), 'users': len(affected_users)}
@@ -1,7 +1,9 @@
-from app import app
-from models import db, Sport, Category, Question, User
+from factory import create_app
+from models import db, Sport, Category, User
+from question_import import import_questions
 
-def init_database():
+def init_database(app=None):
+    app = app or create_app()
     with app.app_context():
         # Drop and create all tables
         db.drop_all()
@@ -39,12 +41,12 @@ def init_database():
             {'name': 'Rules', 'description': 'Cricket rules and regulations', 'sport_name': 'Cricket'},
         ]
         
+        sport_ids = dict(db.session.query(Sport.name, Sport.id).all())
         for cat_data in categories_data:
-            sport = Sport.query.filter_by(name=cat_data['sport_name']).first()
             category = Category(
                 name=cat_data['name'],
                 description=cat_data['description'],
-                sport_id=sport.id
+                sport_id=sport_ids[cat_data['sport_name']]
             )
             db.session.add(category)
         
@@ -138,23 +140,10 @@ def init_database():
             }
         ]
         
-        for q_data in sample_questions:
-            category = Category.query.filter_by(name=q_data['category']).first()
-            question = Question(
-                text=q_data['text'],
-                question_type=q_data['question_type'],
-                difficulty=q_data['difficulty'],
-                correct_answer=q_data['correct_answer'],
-                explanation=q_data['explanation'],
-                category_id=category.id
-            )
-            
-            if 'options' in q_data:
-                question.set_options(q_data['options'])
-            
-            db.session.add(question)
+        report = import_questions(enumerate(sample_questions, start=1))
+        for row, message in report.errors:
+            print("Sample question {}: {}".format(row, message))
         
-        db.session.commit()
         print("Database initialized successfully!")
         print("Demo user created - Username: 'demo', Password: 'demo123'")
 
@@ -0,0 +1,209 @@
+import cProfile
+import heapq
+import os
+import threading
+import time
+
+from flask import g, request, request_finished, template_rendered, before_render_template
+
+from query_budget import count_queries
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+
+class EndpointMetrics:
+    __slots__ = ('requests', 'buckets', 'wall_time', 'query_count', 'query_time',
+                 'render_time', 'cookie_bytes', 'max_cookie_bytes')
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.wall_time = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.cookie_bytes = 0
+        self.max_cookie_bytes = 0
+
+    def observe(self, wall_time, query_count, query_time, render_time, cookie_bytes):
+        self.requests += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if wall_time <= bound:
+                self.buckets[i] += 1
+                break
+        self.wall_time += wall_time
+        self.query_count += query_count
+        self.query_time += query_time
+        self.render_time += render_time
+        self.cookie_bytes += cookie_bytes
+        self.max_cookie_bytes = max(self.max_cookie_bytes, cookie_bytes)
+
+    def to_dict(self):
+        n = self.requests or 1
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            cumulative += count
+            histogram['+Inf' if bound == float('inf') else str(bound)] = cumulative
+        return {
+            'requests': self.requests,
+            'wall_time_ms_avg': round(self.wall_time / n * 1000, 3),
+            'queries_avg': round(self.query_count / n, 2),
+            'query_time_ms_avg': round(self.query_time / n * 1000, 3),
+            'render_time_ms_avg': round(self.render_time / n * 1000, 3),
+            'session_cookie_bytes_avg': round(self.cookie_bytes / n, 1),
+            'session_cookie_bytes_max': self.max_cookie_bytes,
+            'latency_histogram': histogram
+        }
+
+
+class SlowRequestProfiler:
+    # Profiles a sample of requests and keeps pstats dumps of the slowest N
+    def __init__(self, directory, sample_rate, keep):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self._slowest = []  # min-heap of (wall time, path)
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._counter = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        # cProfile cannot profile overlapping requests, so only one runs at a time
+        with self._lock:
+            self._counter += 1
+            if self._counter * self.sample_rate < 1:
+                return None
+            self._counter = 0
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile, endpoint, wall_time):
+        profile.disable()
+        self._busy.release()
+
+        with self._lock:
+            if len(self._slowest) >= self.keep and wall_time <= self._slowest[0][0]:
+                return
+            path = os.path.join(self.directory, '{}-{:.0f}ms-{}.pstats'.format(
+                endpoint, wall_time * 1000, int(time.time() * 1000)))
+            profile.dump_stats(path)
+            heapq.heappush(self._slowest, (wall_time, path))
+            if len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+    def slowest(self):
+        with self._lock:
+            return [{'wall_time_ms': round(t * 1000, 3), 'path': p}
+                    for t, p in sorted(self._slowest, reverse=True)]
+
+
+class Instrumentation:
+    # Opt-in per-endpoint timing, query, template and session cookie metrics
+    def __init__(self, app):
+        self.metrics = {}
+        self.profiler = None
+        self._lock = threading.Lock()
+        self._cookie_name = app.config['SESSION_COOKIE_NAME']
+
+        if app.config['INSTRUMENTATION_PROFILE_RATE'] > 0:
+            self.profiler = SlowRequestProfiler(
+                app.config['INSTRUMENTATION_PROFILE_DIR'],
+                app.config['INSTRUMENTATION_PROFILE_RATE'],
+                app.config['INSTRUMENTATION_PROFILE_KEEP']
+            )
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        request_finished.connect(self._request_finished, app)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+    def _before_request(self):
+        g.instrumentation_start = time.perf_counter()
+        g.instrumentation_render = 0.0
+        g.instrumentation_cookie = len(request.cookies.get(self._cookie_name, ''))
+        g.instrumentation_queries = count_queries(keep_statements=False)
+        g.instrumentation_queries.__enter__()
+        g.instrumentation_profile = self.profiler.start() if self.profiler else None
+
+    def _before_render(self, sender, template, context, **extra):
+        g.instrumentation_render_start = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        start = g.pop('instrumentation_render_start', None)
+        if start is not None:
+            g.instrumentation_render += time.perf_counter() - start
+
+    def _request_finished(self, sender, response, **extra):
+        # Sent after the session is saved, so Set-Cookie holds the cookie the client will send back
+        for header in response.headers.getlist('Set-Cookie'):
+            if header.startswith(self._cookie_name + '='):
+                g.instrumentation_cookie = len(header.split(';', 1)[0]) - len(self._cookie_name) - 1
+
+    def _teardown_request(self, exc):
+        start = g.pop('instrumentation_start', None)
+        if start is None:
+            return
+        wall_time = time.perf_counter() - start
+        queries = g.pop('instrumentation_queries')
+        queries.__exit__(None, None, None)
+        endpoint = request.endpoint or 'unmatched'
+
+        profile = g.pop('instrumentation_profile', None)
+        if profile is not None:
+            self.profiler.stop(profile, endpoint, wall_time)
+
+        with self._lock:
+            metrics = self.metrics.get(endpoint)
+            if metrics is None:
+                metrics = self.metrics[endpoint] = EndpointMetrics()
+            metrics.observe(wall_time, queries.count, queries.time,
+                            g.get('instrumentation_render', 0.0), g.get('instrumentation_cookie', 0))
+
+    def snapshot(self):
+        with self._lock:
+            data = {'endpoints': {name: m.to_dict() for name, m in sorted(self.metrics.items())}}
+        if self.profiler:
+            data['slowest_profiles'] = self.profiler.slowest()
+        return data
+
+    def prometheus(self):
+        # Prometheus text exposition format
+        lines = [
+            '# HELP quiz_request_duration_seconds Request wall time by endpoint.',
+            '# TYPE quiz_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self.metrics.items())
+            for name, m in items:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('quiz_request_duration_seconds_bucket{{endpoint="{}",le="{}"}} {}'.format(
+                        name, le, cumulative))
+                lines.append('quiz_request_duration_seconds_sum{{endpoint="{}"}} {}'.format(name, m.wall_time))
+                lines.append('quiz_request_duration_seconds_count{{endpoint="{}"}} {}'.format(name, m.requests))
+
+            for metric, attr, kind, help_text in (
+                ('quiz_db_queries_total', 'query_count', 'counter', 'SQL statements executed by endpoint.'),
+                ('quiz_db_query_seconds_total', 'query_time', 'counter', 'Time spent in SQL by endpoint.'),
+                ('quiz_template_render_seconds_total', 'render_time', 'counter', 'Template render time by endpoint.'),
+                ('quiz_session_cookie_bytes_total', 'cookie_bytes', 'counter', 'Session cookie bytes by endpoint.'),
+                ('quiz_session_cookie_bytes_max', 'max_cookie_bytes', 'gauge', 'Largest session cookie by endpoint.'),
+            ):
+                lines.append('# HELP {} {}'.format(metric, help_text))
+                lines.append('# TYPE {} {}'.format(metric, kind))
+                for name, m in items:
+                    lines.append('{}{{endpoint="{}"}} {}'.format(metric, name, getattr(m, attr)))
+        return '\n'.join(lines) + '\n'
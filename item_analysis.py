@@ -0,0 +1,255 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from models import db, Question, QuizAnswer
+from services import quiz_archive
+
+CHUNK_ROWS = 50000  # answers fetched per round trip
+ANSWER_COLUMNS = ('quiz_id', 'question_id', 'is_correct', 'time_taken')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+EASY_P = 0.70  # calibrated as easy at or above this correct rate
+HARD_P = 0.40  # calibrated as hard below this correct rate
+TOO_EASY_P = 0.95
+TOO_HARD_P = 0.10
+LOW_DISCRIMINATION = 0.10  # point-biserial below this barely separates strong from weak players
+OUTLIER_Z = 3.5  # robust z-score of log response time beyond which an answer is an outlier
+OUTLIER_SHARE = 0.10  # share of outlying response times that flags a question
+MIN_BUCKET = 10  # questions one quiz draws; re-bucketing never leaves a category/difficulty smaller
+
+
+def _to_arrays(columns):
+    quiz_ids, question_ids, correct, times = columns
+    # NULL is_correct counts as wrong; NULL time_taken becomes NaN and is left out of the timings
+    return (np.asarray(quiz_ids, dtype=np.int64), np.asarray(question_ids, dtype=np.int64),
+            np.array([bool(value) for value in correct], dtype=bool) if None in correct
+            else np.asarray(correct, dtype=bool),
+            np.array(times, dtype=np.float64))
+
+
+def load_answers(engine, chunk_size=CHUNK_ROWS):
+    # Every answer, archived months first, as four contiguous arrays: quiz IDs, question IDs, correct, seconds
+    chunks = [_to_arrays(columns) for columns in quiz_archive.iter_columns('answers', ANSWER_COLUMNS)]
+    table = QuizAnswer.__table__
+    statement = db.select(*[table.c[name] for name in ANSWER_COLUMNS])
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+        for partition in result.partitions():
+            chunks.append(_to_arrays(list(zip(*partition))))
+    if not chunks:
+        return (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, bool), np.empty(0, np.float64))
+    return tuple(np.concatenate(column) for column in zip(*chunks))
+
+
+def _sort_within(groups, values, n_groups):
+    # Values ordered by group, then by value, with the size of each group; NaN values are dropped.
+    # A quicksort on values then a stable sort on groups is much faster than np.lexsort on both, and
+    # NumPy radix-sorts the groups when they fit in 16 bits
+    keep = ~np.isnan(values)
+    groups, values = groups[keep], values[keep]
+    order = np.argsort(values)
+    narrow = groups.astype(np.uint16 if n_groups <= 1 << 16 else np.int32)
+    order = order[np.argsort(narrow[order], kind='stable')]
+    return values[order], np.bincount(groups, minlength=n_groups)
+
+
+def _group_quantiles(values, counts, quantiles):
+    # Linear-interpolated quantiles of each group of values sorted by _sort_within; empty groups are NaN
+    starts = np.cumsum(counts) - counts
+    result = np.full((len(quantiles), len(counts)), np.nan)
+    present = counts > 0
+    for i, quantile in enumerate(quantiles):
+        position = quantile * (counts[present] - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, counts[present] - 1)
+        base = starts[present]
+        result[i, present] = values[base + low] + (values[base + high] - values[base + low]) * (position - low)
+    return result
+
+
+def calibrated_difficulty(p_value):
+    if p_value >= EASY_P:
+        return 'easy'
+    return 'medium' if p_value >= HARD_P else 'hard'
+
+
+class ItemAnalysis:
+    # Classical item statistics for every answered question, as arrays aligned with question_ids
+    def __init__(self, quiz_ids, question_ids, correct, times):
+        started = time.perf_counter()
+        self.answers = len(question_ids)
+        self.question_ids, item = np.unique(question_ids, return_inverse=True)
+        quiz_keys, quiz = np.unique(quiz_ids, return_inverse=True)
+        self.quizzes = len(quiz_keys)
+        n_items = len(self.question_ids)
+        score = correct.astype(np.float64)
+
+        self.attempts = np.bincount(item, minlength=n_items)
+        self.correct = np.bincount(item, weights=score, minlength=n_items)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.p_values = self.correct / self.attempts
+
+            # Point-biserial against the rest of the quiz: the share of the player's other answers that
+            # were right, so an item is not correlated with itself. Quizzes draw different questions,
+            # so a proportion rather than a raw total
+            quiz_answers = np.bincount(quiz, minlength=self.quizzes)
+            quiz_correct = np.bincount(quiz, weights=score, minlength=self.quizzes)
+            others = quiz_answers[quiz] - 1
+            usable = others > 0
+            rest = (quiz_correct[quiz] - score)[usable] / others[usable]
+            x, g = score[usable], item[usable]
+            n = np.bincount(g, minlength=n_items)
+            mean_x = np.bincount(g, weights=x, minlength=n_items) / n
+            mean_y = np.bincount(g, weights=rest, minlength=n_items) / n
+            cov = np.bincount(g, weights=x * rest, minlength=n_items) / n - mean_x * mean_y
+            var_y = np.bincount(g, weights=rest * rest, minlength=n_items) / n - mean_y ** 2
+            # Items everyone gets right (or wrong), or whose players all score alike, have no correlation
+            self.discrimination = np.where((mean_x * (1 - mean_x) > 0) & (var_y > 1e-12),
+                                           cov / np.sqrt(mean_x * (1 - mean_x) * np.maximum(var_y, 1e-12)),
+                                           np.nan)
+
+            timed = ~np.isnan(times)
+            self.time_mean = np.bincount(item[timed], weights=times[timed], minlength=n_items) \
+                / np.bincount(item[timed], minlength=n_items)
+        sorted_times, counts = _sort_within(item, times, n_items)
+        self.time_p10, self.time_median, self.time_p90 = _group_quantiles(sorted_times, counts, (0.1, 0.5, 0.9))
+
+        # Response-time outliers: robust z-score (median absolute deviation) of log time within each question.
+        # log1p keeps the order, so the sorted times give the log medians without sorting again
+        log_times = np.log1p(np.maximum(times, 0))
+        log_median = _group_quantiles(np.log1p(np.maximum(sorted_times, 0)), counts, (0.5,))[0]
+        deviation = log_times - log_median[item]
+        mad = _group_quantiles(*_sort_within(item, np.abs(deviation), n_items), (0.5,))[0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(mad[item] > 0, 0.6745 * deviation / mad[item], 0)
+        self.fast_outliers = np.bincount(item, weights=timed & (z < -OUTLIER_Z), minlength=n_items).astype(np.int64)
+        self.slow_outliers = np.bincount(item, weights=timed & (z > OUTLIER_Z), minlength=n_items).astype(np.int64)
+        self.computed_at = datetime.utcnow()
+        self.elapsed = time.perf_counter() - started
+
+    def items(self, min_attempts):
+        # One dict per answered question with its flags; calibration needs min_attempts answers
+        questions = {row.id: row for row in db.session.query(Question.id, Question.difficulty, Question.category_id)}
+        items = []
+        for i, question_id in enumerate(self.question_ids.tolist()):
+            question = questions.get(question_id)
+            if question is None:
+                continue
+            attempts = int(self.attempts[i])
+            p_value = float(self.p_values[i])
+            discrimination = None if np.isnan(self.discrimination[i]) else round(float(self.discrimination[i]), 3)
+            outliers = int(self.fast_outliers[i] + self.slow_outliers[i])
+            suggested = calibrated_difficulty(p_value) if attempts >= min_attempts else None
+            flags = []
+            if attempts >= min_attempts:
+                if p_value >= TOO_EASY_P:
+                    flags.append('too_easy')
+                elif p_value <= TOO_HARD_P:
+                    flags.append('too_hard')
+                if discrimination is not None and discrimination < 0:
+                    flags.append('negative_discrimination')
+                elif discrimination is not None and discrimination < LOW_DISCRIMINATION:
+                    flags.append('low_discrimination')
+                if outliers >= OUTLIER_SHARE * attempts:
+                    flags.append('time_outliers')
+                if suggested != question.difficulty:
+                    flags.append('mislabelled')
+            items.append({
+                'question_id': question_id,
+                'category_id': question.category_id,
+                'difficulty': question.difficulty,
+                'suggested_difficulty': suggested,
+                'attempts': attempts,
+                'p_value': round(p_value, 3),
+                'discrimination': discrimination,
+                'time_mean': None if np.isnan(self.time_mean[i]) else round(float(self.time_mean[i]), 1),
+                'time_p10': None if np.isnan(self.time_p10[i]) else round(float(self.time_p10[i]), 1),
+                'time_median': None if np.isnan(self.time_median[i]) else round(float(self.time_median[i]), 1),
+                'time_p90': None if np.isnan(self.time_p90[i]) else round(float(self.time_p90[i]), 1),
+                'fast_outliers': int(self.fast_outliers[i]),
+                'slow_outliers': int(self.slow_outliers[i]),
+                'flags': flags
+            })
+        return items
+
+    def summary(self, items):
+        calibrated = [item for item in items if item['suggested_difficulty']]
+        flags = {}
+        for item in items:
+            for flag in item['flags']:
+                flags[flag] = flags.get(flag, 0) + 1
+        # Labelled difficulty against calibrated difficulty, for questions with enough answers
+        matrix = {label: {suggested: 0 for suggested in DIFFICULTIES} for label in DIFFICULTIES}
+        for item in calibrated:
+            if item['difficulty'] in matrix:
+                matrix[item['difficulty']][item['suggested_difficulty']] += 1
+        return {
+            'answers': self.answers,
+            'quizzes': self.quizzes,
+            'questions': len(items),
+            'calibrated': len(calibrated),
+            'flags': flags,
+            'calibration': matrix,
+            'computed_at': self.computed_at.isoformat(),
+            'seconds': round(self.elapsed, 3)
+        }
+
+
+def analyze(engine, chunk_size=CHUNK_ROWS):
+    return ItemAnalysis(*load_answers(engine, chunk_size))
+
+
+def plan_rebucket(items, min_bucket=MIN_BUCKET):
+    # (question_id, from, to) moves to each question's calibrated difficulty, best-evidenced first,
+    # skipping any that would leave its category/difficulty with fewer questions than a quiz needs
+    sizes = {(category_id, difficulty): count for category_id, difficulty, count in db.session.query(
+        Question.category_id, Question.difficulty, db.func.count(Question.id)
+    ).group_by(Question.category_id, Question.difficulty)}
+    moves = []
+    candidates = [item for item in items
+                  if item['suggested_difficulty'] and item['suggested_difficulty'] != item['difficulty']]
+    for item in sorted(candidates, key=lambda item: -item['attempts']):
+        source = (item['category_id'], item['difficulty'])
+        if sizes.get(source, 0) - 1 < min_bucket:
+            continue
+        target = (item['category_id'], item['suggested_difficulty'])
+        sizes[source] -= 1
+        sizes[target] = sizes.get(target, 0) + 1
+        moves.append((item['question_id'], item['difficulty'], item['suggested_difficulty']))
+    return moves
+
+
+def apply_rebucket(moves, chunk_size=1000):
+    # Write the new difficulties and drop the cached buckets; callers commit. The bulk UPDATE bypasses the
+    # ORM listener, so the shared questions version is bumped here for the other processes' question pools
+    from cache_versions import QUESTIONS_VERSION, bump_version
+    from services import question_pool, question_selector
+    by_target = {}
+    for question_id, _, target in moves:
+        by_target.setdefault(target, []).append(question_id)
+    for target, question_ids in by_target.items():
+        for start in range(0, len(question_ids), chunk_size):
+            Question.query.filter(Question.id.in_(question_ids[start:start + chunk_size]))\
+                          .update({Question.difficulty: target}, synchronize_session=False)
+    bump_version(db.session, QUESTIONS_VERSION)
+    question_pool.invalidate()
+    question_selector.invalidate()
+
+
+class AnalysisCache:
+    # The last analysis for the admin page; one request recomputes while the others wait for it
+    def __init__(self):
+        self.analysis = None
+        self._lock = threading.Lock()
+
+    def get(self, engine, max_age, refresh=False):
+        with self._lock:
+            age = (datetime.utcnow() - self.analysis.computed_at).total_seconds() if self.analysis else None
+            if refresh or age is None or age >= max_age:
+                self.analysis = analyze(engine)
+            return self.analysis
+
+
+analysis_cache = AnalysisCache()
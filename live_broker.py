@@ -0,0 +1,171 @@
+import asyncio
+import json
+import queue
+import threading
+
+HEARTBEAT = b': keepalive\n\n'
+
+
+def encode_event(event, data):
+    # One server-sent event frame; data may be a JSON-serializable value or pre-encoded JSON bytes
+    if not isinstance(data, bytes):
+        data = json.dumps(data, separators=(',', ':')).encode()
+    return b'event: ' + event.encode() + b'\ndata: ' + data + b'\n\n'
+
+
+class ThreadSubscriber:
+    # Outbound frames of one SSE connection served by a worker thread
+    def __init__(self, max_pending):
+        self._queue = queue.Queue(max_pending)
+        self.closed = False
+
+    def deliver(self, frame):
+        # False once the connection has fallen too far behind; the broker then drops it
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+    def close(self):
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def frames(self, heartbeat):
+        while True:
+            try:
+                frame = self._queue.get(timeout=heartbeat)
+            except queue.Empty:
+                if self.closed:
+                    return
+                yield HEARTBEAT
+                continue
+            if frame is None:
+                return
+            yield frame
+
+
+class AsyncSubscriber:
+    # Outbound frames of one SSE connection served by an asyncio event loop
+    def __init__(self, max_pending, loop):
+        self._queue = asyncio.Queue(max_pending)
+        self.loop = loop
+        self.closed = False
+
+    def deliver(self, frame):
+        # Runs on the subscriber's loop
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.closed = True
+            return False
+
+    def close(self):
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def frames(self, heartbeat):
+        while True:
+            try:
+                frame = await asyncio.wait_for(self._queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if self.closed:
+                    return
+                yield HEARTBEAT
+                continue
+            if frame is None:
+                return
+            yield frame
+
+
+class LocalBroker:
+    # In-process fan-out of room events; every subscriber of a room must be connected to this process
+    def __init__(self):
+        self._rooms = {}  # room_id -> set of subscribers
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, room_id, subscriber):
+        with self._lock:
+            self._rooms.setdefault(room_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, room_id, subscriber):
+        with self._lock:
+            subscribers = self._rooms.get(room_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._rooms[room_id]
+
+    def subscriber_count(self, room_id):
+        return len(self._rooms.get(room_id, ()))
+
+    def publish(self, room_id, frame):
+        # The same frame bytes go to every subscriber; event loops get one wake-up per broadcast
+        with self._lock:
+            subscribers = list(self._rooms.get(room_id, ()))
+        by_loop = {}
+        for subscriber in subscribers:
+            loop = getattr(subscriber, 'loop', None)
+            if loop is None:
+                self._deliver(room_id, [subscriber], frame)
+            else:
+                by_loop.setdefault(loop, []).append(subscriber)
+        for loop, group in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, room_id, group, frame)
+            except RuntimeError:
+                # The loop has shut down; its connections are gone
+                for subscriber in group:
+                    self.unsubscribe(room_id, subscriber)
+        self.published += 1
+
+    def _deliver(self, room_id, subscribers, frame):
+        for subscriber in subscribers:
+            if subscriber.deliver(frame):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(room_id, subscriber)
+
+    def close_room(self, room_id):
+        # End every stream of a room
+        with self._lock:
+            subscribers = self._rooms.pop(room_id, set())
+        for subscriber in subscribers:
+            loop = getattr(subscriber, 'loop', None)
+            if loop is None:
+                subscriber.close()
+            else:
+                try:
+                    loop.call_soon_threadsafe(subscriber.close)
+                except RuntimeError:
+                    pass
+
+    def get_stats(self):
+        return {
+            'rooms': len(self._rooms),
+            'subscribers': sum(len(subscribers) for subscribers in list(self._rooms.values())),
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped
+        }
+
+
+def create_broker(config):
+    backend = config['LIVE_BROKER']
+
+    if backend == 'local':
+        return LocalBroker()
+    raise ValueError('Unknown LIVE_BROKER: %s' % backend)
@@ -0,0 +1,250 @@
+import heapq
+import secrets
+import threading
+import time
+
+from answer_buffer import AnswerBuffer
+from grading import grade
+from live_broker import AsyncSubscriber, ThreadSubscriber, encode_event
+from models import db
+from quiz_actions import complete_quizzes
+
+LEADERBOARD_SIZE = 10
+
+
+class LiveRoom:
+    # A scheduled quiz: every player gets the same questions on a shared clock
+    def __init__(self, room_id, category_id, difficulty, question_ids, starts_at, question_seconds, reveal_seconds):
+        self.room_id = room_id
+        self.category_id = category_id
+        self.difficulty = difficulty
+        self.question_ids = question_ids
+        self.starts_at = starts_at
+        self.question_seconds = question_seconds
+        self.reveal_seconds = reveal_seconds
+        self.players = {}  # user_id -> {'quiz_id', 'username', 'score'}
+        self.joining = {}  # user_id -> Event set once their first join has finished
+        self.answered = set()  # user IDs that answered the open question
+        self.current = -1
+        self.phase = 'waiting'  # waiting, question, reveal, finished
+        self.deadline = starts_at
+        self.question_started = None
+        self.finished_at = None
+        self.last_frame = None  # latest question/reveal/finished frame, replayed to new subscribers
+        self.lock = threading.Lock()
+
+    def leaderboard(self):
+        top = heapq.nlargest(LEADERBOARD_SIZE, self.players.values(), key=lambda player: player['score'])
+        return [{'username': player['username'], 'score': player['score']} for player in top]
+
+    def to_dict(self):
+        return {
+            'room_id': self.room_id,
+            'category_id': self.category_id,
+            'difficulty': self.difficulty,
+            'questions': len(self.question_ids),
+            'starts_at': self.starts_at,
+            'phase': self.phase,
+            'question': self.current + 1,
+            'players': len(self.players)
+        }
+
+
+class LiveRooms:
+    # Runs live rooms on a clock thread; answers are graded in memory and stored in batches
+    def __init__(self, app, broker, answer_keys, question_payloads, question_selector):
+        config = app.config
+        self.app = app
+        self.broker = broker
+        self.answer_keys = answer_keys
+        self.question_payloads = question_payloads
+        self.question_selector = question_selector
+        self.question_seconds = config['LIVE_QUESTION_SECONDS']
+        self.reveal_seconds = config['LIVE_REVEAL_SECONDS']
+        self.max_pending = config['LIVE_SUBSCRIBER_QUEUE']
+        self.heartbeat = config['LIVE_HEARTBEAT_SECONDS']
+        self.room_ttl = config['LIVE_ROOM_TTL']
+        # Flushed when each question closes rather than on a timer
+        self.answers = AnswerBuffer(app, config['LIVE_ANSWER_BATCH'], float('inf'))
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        # Clock thread starts with the first room, so pre-fork servers do not fork it
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-rooms', daemon=True)
+                self._thread.start()
+
+    def create(self, category_id, difficulty, question_ids, starts_in, question_seconds=None, reveal_seconds=None):
+        room = LiveRoom(secrets.token_urlsafe(6), category_id, difficulty, question_ids, time.time() + starts_in,
+                        question_seconds or self.question_seconds, reveal_seconds or self.reveal_seconds)
+        with self._lock:
+            self._rooms[room.room_id] = room
+        self.start()
+        return room
+
+    def get(self, room_id):
+        return self._rooms.get(room_id)
+
+    def list(self):
+        return sorted(self._rooms.values(), key=lambda room: room.starts_at)
+
+    def join(self, room, user_id, username, create_quiz):
+        # The player's entry. Only the first of concurrent joins by a user calls create_quiz() for the
+        # new quiz ID, without holding the room lock; the others wait for it, and retry if it failed
+        while True:
+            with room.lock:
+                player = room.players.get(user_id)
+                if player is not None:
+                    return player
+                pending = room.joining.get(user_id)
+                if pending is None:
+                    pending = room.joining[user_id] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            quiz_id = create_quiz()
+            with room.lock:
+                player = room.players[user_id] = {'quiz_id': quiz_id, 'username': username, 'score': 0}
+            return player
+        finally:
+            with room.lock:
+                del room.joining[user_id]
+            pending.set()
+
+    def answer(self, room, user_id, question_id, user_answer):
+        # None once accepted, otherwise the reason the answer was refused
+        with room.lock:
+            player = room.players.get(user_id)
+            if player is None:
+                return 'Not in this room'
+            if room.phase != 'question' or room.question_ids[room.current] != question_id:
+                return 'Question is closed'
+            if user_id in room.answered:
+                return 'Question already answered'
+            room.answered.add(user_id)
+            time_taken = int(time.time() - room.question_started)
+
+        # A question deleted since the room was created can no longer be answered correctly
+        answer_key = self.answer_keys.get(question_id)
+        is_correct = grade(answer_key, user_answer) if answer_key else False
+        self.question_selector.observe(question_id, is_correct)
+        with room.lock:
+            if is_correct:
+                player['score'] += 1
+            score = player['score']
+        self.answers.add(player['quiz_id'], user_id, question_id, user_answer, is_correct, time_taken, score)
+        return None
+
+    def subscribe(self, room, loop=None):
+        # New SSE subscriber, primed with the room's state and its latest broadcast
+        if loop is None:
+            subscriber = ThreadSubscriber(self.max_pending)
+        else:
+            subscriber = AsyncSubscriber(self.max_pending, loop)
+        subscriber.deliver(encode_event('room', dict(room.to_dict(), now=time.time())))
+        frame = room.last_frame
+        if frame is not None:
+            subscriber.deliver(frame)
+        if room.phase == 'finished':
+            subscriber.close()
+            return subscriber
+        return self.broker.subscribe(room.room_id, subscriber)
+
+    def unsubscribe(self, room, subscriber):
+        self.broker.unsubscribe(room.room_id, subscriber)
+
+    def _run(self):
+        while True:
+            time.sleep(0.1)
+            now = time.time()
+            for room in list(self._rooms.values()):
+                try:
+                    with self.app.app_context():
+                        self._advance(room, now)
+                except Exception:
+                    self.app.logger.exception('Live room %s failed to advance', room.room_id)
+
+    def _advance(self, room, now):
+        if room.phase == 'finished':
+            if now - room.finished_at >= self.room_ttl:
+                with self._lock:
+                    self._rooms.pop(room.room_id, None)
+            return
+        if now < room.deadline:
+            return
+
+        if room.phase == 'question':
+            self._reveal(room, now)
+        elif room.current + 1 < len(room.question_ids):
+            self._open_question(room, now)
+        else:
+            self._finish(room, now)
+
+    def _publish(self, room, event, data):
+        # Encoded once; every subscriber gets the same bytes
+        frame = encode_event(event, data)
+        room.last_frame = frame
+        self.broker.publish(room.room_id, frame)
+
+    def _open_question(self, room, now):
+        if room.current < 0:
+            # Compile every answer key up front so answers are graded without a query
+            self.answer_keys.get_many(room.question_ids)
+
+        number = room.current + 2
+        payload = self.question_payloads.get(room.question_ids[number - 1])
+        body = self.question_payloads.render(payload, number, len(room.question_ids))
+        with room.lock:
+            room.current += 1
+            room.answered = set()
+            room.phase = 'question'
+            room.question_started = now
+            room.deadline = now + room.question_seconds
+        self._publish(room, 'question', b'{"ends_at":%.3f,"question":%s}' % (room.deadline, body))
+
+    def _reveal(self, room, now):
+        with room.lock:
+            room.phase = 'reveal'
+            room.deadline = now + room.reveal_seconds
+            answered = len(room.answered)
+        self.answers.flush()
+        db.session.remove()
+
+        question_id = room.question_ids[room.current]
+        answer_key = self.answer_keys.get(question_id)
+        self._publish(room, 'reveal', {
+            'question_id': question_id,
+            'correct_answer': answer_key.correct_answer if answer_key else None,
+            'explanation': answer_key.explanation if answer_key else None,
+            'answered': answered,
+            'players': len(room.players),
+            'leaderboard': room.leaderboard(),
+            'next_at': room.deadline
+        })
+
+    def _finish(self, room, now):
+        with room.lock:
+            room.phase = 'finished'
+            room.finished_at = now
+            quiz_ids = [player['quiz_id'] for player in room.players.values()]
+        self.answers.flush()
+        if quiz_ids:
+            complete_quizzes(db.session, quiz_ids, int(now - room.starts_at))
+            db.session.commit()
+        db.session.remove()
+
+        self._publish(room, 'finished', {'players': len(room.players), 'leaderboard': room.leaderboard()})
+        self.broker.close_room(room.room_id)
+
+    def get_stats(self):
+        rooms = list(self._rooms.values())
+        return {
+            'rooms': [room.to_dict() for room in rooms],
+            'players': sum(len(room.players) for room in rooms),
+            'broker': self.broker.get_stats(),
+            'answer_batches': self.answers.get_stats()
+        }
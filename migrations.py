@@ -0,0 +1,68 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from models import db
+
+# Columns added to existing tables after their first release: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ('question', 'accepted_answers', 'TEXT'),
+]
+
+# Tables declared with sqlite_autoincrement after their first release; rebuilt on SQLite so IDs are never reused
+AUTOINCREMENT_TABLES = ['quiz', 'quiz_answer']
+
+
+def sqlite_reuses_ids(conn, table_name):
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                       {'name': table_name}).scalar()
+    return sql is not None and 'AUTOINCREMENT' not in sql.upper()
+
+
+def _rebuild_with_autoincrement(conn, table):
+    # SQLite cannot ALTER a primary key, so copy into a new table and swap it in; indexes are recreated afterwards
+    existing = {row[1] for row in conn.execute(text('PRAGMA table_info({})'.format(table.name)))}
+    columns = ', '.join(column.name for column in table.columns if column.name in existing)
+    ddl = str(CreateTable(table).compile(conn)).replace(
+        'CREATE TABLE {} '.format(table.name), 'CREATE TABLE {}_new '.format(table.name), 1)
+    conn.execute(text(ddl))
+    conn.execute(text('INSERT INTO {0}_new ({1}) SELECT {1} FROM {0}'.format(table.name, columns)))
+    conn.execute(text('DROP TABLE {}'.format(table.name)))
+    conn.execute(text('ALTER TABLE {0}_new RENAME TO {0}'.format(table.name)))
+
+
+def upgrade_database():
+    # Bring an existing database up to the current models without dropping data
+    engine = db.engine
+    applied = []
+
+    # New tables are created together with their indexes
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(bind=engine)
+            applied.append('create table {}'.format(table.name))
+
+    if engine.dialect.name == 'sqlite':
+        for table_name in AUTOINCREMENT_TABLES:
+            with engine.begin() as conn:
+                if sqlite_reuses_ids(conn, table_name):
+                    _rebuild_with_autoincrement(conn, db.metadata.tables[table_name])
+                    applied.append('rebuild table {} with AUTOINCREMENT'.format(table_name))
+
+    inspector = inspect(engine)
+    for table_name, column, ddl_type in ADDED_COLUMNS:
+        columns = {c['name'] for c in inspector.get_columns(table_name)}
+        if column not in columns:
+            with engine.begin() as conn:
+                conn.execute(text('ALTER TABLE {} ADD COLUMN {} {}'.format(table_name, column, ddl_type)))
+            applied.append('add column {}.{}'.format(table_name, column))
+
+    for table in db.metadata.sorted_tables:
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                applied.append('create index {}'.format(index.name))
+
+    return applied
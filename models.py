@@ -1,8 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import object_session
 from datetime import datetime
+from array import array
+from bisect import bisect_left
 import json
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+from services import password_hasher, quiz_archive
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def conflict_insert(session, model):
+    # INSERT supporting on_conflict_do_update/do_nothing; SQLite and PostgreSQL share the syntax
+    dialect = postgresql if session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,44 +26,25 @@ class User(db.Model):
     last_login = db.Column(db.DateTime)
     
     quizzes = db.relationship('Quiz', backref='user', lazy=True)
+    stats = db.relationship('UserStats', uselist=False, lazy=True)
     
     def set_password(self, password):
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        from werkzeug.security import check_password_hash
-        return check_password_hash(self.password_hash, password)
+        # Hashes made with older PASSWORD_HASH_METHOD settings are replaced on success; callers commit
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+            password_hasher.rehashed += 1
+        return True
     
     def get_stats(self):
-        total_quizzes = len(self.quizzes)
-        if total_quizzes == 0:
-            return {
-                'total_quizzes': 0,
-                'average_score': 0,
-                'best_score': 0,
-                'total_time': 0,
-                'favorite_category': 'None'
-            }
-        
-        total_score = sum(quiz.score for quiz in self.quizzes)
-        total_time = sum(quiz.time_taken or 0 for quiz in self.quizzes)
-        best_score = max(quiz.score for quiz in self.quizzes) if self.quizzes else 0
-        
-        category_count = {}
-        for quiz in self.quizzes:
-            cat_name = quiz.category.name
-            category_count[cat_name] = category_count.get(cat_name, 0) + 1
-        
-        favorite_category = max(category_count.items(), key=lambda x: x[1])[0] if category_count else 'None'
-        
-        return {
-            'total_quizzes': total_quizzes,
-            'average_score': round(total_score / total_quizzes, 1) if total_quizzes > 0 else 0,
-            'best_score': best_score,
-            'total_time': total_time,
-            'favorite_category': favorite_category
-        }
+        # Read-only: users without a stats row yet get theirs computed, and the row is backfilled on their next write
+        if self.stats is None:
+            return UserStats(user_id=self.id, **UserStats.compute(self.id)).to_dict()
+        return self.stats.to_dict()
 
 class Sport(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,10 +70,15 @@ class Question(db.Model):
     difficulty = db.Column(db.String(20), nullable=False)  # easy, medium, hard
     options = db.Column(db.Text)  # JSON string for MCQ options
     correct_answer = db.Column(db.String(500), nullable=False)
+    accepted_answers = db.Column(db.Text)  # JSON string of accepted alternative answers for fill_blank
     explanation = db.Column(db.Text)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_question_category_difficulty', 'category_id', 'difficulty'),
+    )
+    
     def get_options(self):
         if self.options:
             return json.loads(self.options)
@@ -88,6 +86,14 @@ class Question(db.Model):
     
     def set_options(self, options_list):
         self.options = json.dumps(options_list)
+    
+    def get_accepted_answers(self):
+        if self.accepted_answers:
+            return json.loads(self.accepted_answers)
+        return []
+    
+    def set_accepted_answers(self, answers_list):
+        self.accepted_answers = json.dumps(answers_list)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -101,6 +107,13 @@ class Quiz(db.Model):
     
     category = db.relationship('Category', backref='quizzes')
     answers = db.relationship('QuizAnswer', backref='quiz', lazy=True)
+    
+    __table_args__ = (
+        db.Index('ix_quiz_user_completed', 'user_id', 'completed_at'),
+        db.Index('ix_quiz_category', 'category_id'),
+        # IDs must never be reused once archived rows leave the table; SQLite otherwise takes max(id) + 1
+        {'sqlite_autoincrement': True},
+    )
 
 class QuizAnswer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -110,4 +123,382 @@ class QuizAnswer(db.Model):
     is_correct = db.Column(db.Boolean, default=False)
     time_taken = db.Column(db.Integer)  # in seconds
     
-    question = db.relationship('Question', backref='quiz_answers')
\ No newline at end of file
+    question = db.relationship('Question', backref='quiz_answers')
+    
+    __table_args__ = (
+        db.Index('ix_quiz_answer_quiz', 'quiz_id'),
+        {'sqlite_autoincrement': True},
+    )
+
+class UserStats(db.Model):
+    # Materialized per-user aggregates, kept up to date as quizzes progress
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_quizzes = db.Column(db.Integer, default=0, nullable=False)
+    total_score = db.Column(db.Integer, default=0, nullable=False)
+    best_score = db.Column(db.Integer, default=0, nullable=False)
+    total_time = db.Column(db.Integer, default=0, nullable=False)
+    category_counts = db.Column(db.Text)  # JSON string of {category_id: quiz_count}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_category_counts(self):
+        if self.category_counts:
+            return json.loads(self.category_counts)
+        return {}
+    
+    def set_category_counts(self, counts):
+        self.category_counts = json.dumps(counts)
+    
+    # Counters are updated with SQL expressions so concurrent requests cannot lose each other's increments
+    def record_quiz_started(self, category_id):
+        # The atomic UPDATE locks the row (on SQLite, the database) before the category counts are read
+        session = object_session(self)
+        session.query(UserStats).filter_by(user_id=self.user_id).update(
+            {UserStats.total_quizzes: UserStats.total_quizzes + 1}, synchronize_session=False)
+        session.refresh(self, ['total_quizzes', 'category_counts'])
+        counts = self.get_category_counts()
+        key = str(category_id)
+        counts[key] = counts.get(key, 0) + 1
+        self.set_category_counts(counts)
+    
+    def record_correct_answer(self, quiz_score):
+        self.total_score = UserStats.total_score + 1
+        self.best_score = db.case((UserStats.best_score < quiz_score, quiz_score), else_=UserStats.best_score)
+    
+    def record_quiz_finished(self, previous_time, total_time):
+        self.total_time = UserStats.total_time - (previous_time or 0) + (total_time or 0)
+    
+    @classmethod
+    def record_correct_answers(cls, deltas, session=None):
+        # Add {user_id: (correct answers, best quiz score)} with one atomic UPDATE per user
+        session = session or db.session
+        if not deltas:
+            return
+        for user_id in deltas:
+            cls.for_user(user_id, session)
+        table = cls.__table__
+        session.execute(
+            table.update()
+            .where(table.c.user_id == db.bindparam('user_id_'))
+            .values(total_score=table.c.total_score + db.bindparam('delta'),
+                    best_score=db.case((table.c.best_score < db.bindparam('best'), db.bindparam('best')),
+                                       else_=table.c.best_score),
+                    updated_at=datetime.utcnow()),
+            [{'user_id_': user_id, 'delta': delta, 'best': best} for user_id, (delta, best) in deltas.items()]
+        )
+    
+    def to_dict(self):
+        if not self.total_quizzes:
+            return {
+                'total_quizzes': 0,
+                'average_score': 0,
+                'best_score': 0,
+                'total_time': 0,
+                'favorite_category': 'None'
+            }
+        
+        counts = self.get_category_counts()
+        favorite_category = 'None'
+        if counts:
+            category = db.session.get(Category, int(max(counts.items(), key=lambda x: x[1])[0]))
+            if category:
+                favorite_category = category.name
+        
+        return {
+            'total_quizzes': self.total_quizzes,
+            'average_score': round(self.total_score / self.total_quizzes, 1),
+            'best_score': self.best_score,
+            'total_time': self.total_time,
+            'favorite_category': favorite_category
+        }
+    
+    @classmethod
+    def for_user(cls, user_id, session=None):
+        # The user's stats row, backfilled from their history the first time; if two requests
+        # backfill at once, the first insert stands and the other reads it
+        session = session or db.session
+        return session.get(cls, user_id) or cls.rebuild(user_id, session, replace=False)
+    
+    @classmethod
+    def compute(cls, user_id, session=None):
+        # Column values of the aggregate over the user's full Quiz history, archived months included
+        session = session or db.session
+        rows = session.query(
+            Quiz.category_id,
+            db.func.count(Quiz.id),
+            db.func.coalesce(db.func.sum(Quiz.score), 0),
+            db.func.coalesce(db.func.max(Quiz.score), 0),
+            db.func.coalesce(db.func.sum(Quiz.time_taken), 0),
+            db.func.min(Quiz.id)
+        ).filter(Quiz.user_id == user_id).group_by(Quiz.category_id).all()
+        
+        # [quizzes, score sum, best score, time sum, first quiz ID] per category
+        totals = quiz_archive.user_summary(user_id)
+        for category_id, *row in rows:
+            if category_id in totals:
+                archived = totals[category_id]
+                row = [archived[0] + row[0], archived[1] + row[1], max(archived[2], row[2]),
+                       archived[3] + row[3], min(archived[4], row[4])]
+            totals[category_id] = row
+        
+        # Categories in order of first play, so ties for the favorite go to the earliest
+        ordered = sorted(totals.items(), key=lambda item: item[1][4])
+        return {
+            'total_quizzes': sum(row[0] for _, row in ordered),
+            'total_score': sum(row[1] for _, row in ordered),
+            'best_score': max([row[2] for _, row in ordered], default=0),
+            'total_time': sum(row[3] for _, row in ordered),
+            'category_counts': json.dumps({str(category_id): row[0] for category_id, row in ordered})
+        }
+    
+    @classmethod
+    def rebuild(cls, user_id, session=None, replace=True):
+        # Write the recomputed aggregate with an upsert, so a concurrent first write cannot insert it twice;
+        # replace=False keeps a row that already exists
+        session = session or db.session
+        values = dict(cls.compute(user_id, session), updated_at=datetime.utcnow())
+        insert = conflict_insert(session, cls).values(user_id=user_id, **values)
+        session.execute(insert.on_conflict_do_update(index_elements=['user_id'], set_=values) if replace
+                        else insert.on_conflict_do_nothing(index_elements=['user_id']))
+        return session.get(cls, user_id, populate_existing=True)
+
+class ReportRollup(db.Model):
+    # Pre-aggregated finished-quiz totals per category, sport, user and day
+    dimension = db.Column(db.String(20), primary_key=True)  # category, sport, user, day
+    key = db.Column(db.String(40), primary_key=True)  # ID of the category/sport/user, or ISO date
+    quiz_count = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.Integer, default=0, nullable=False)
+    best_score = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_report_rollup_leaderboard', 'dimension', 'score_sum'),
+    )
+    
+    @property
+    def average_score(self):
+        return self.score_sum / self.quiz_count if self.quiz_count else 0
+    
+    @staticmethod
+    def keys_for(quiz, sport_id):
+        return [
+            ('category', str(quiz.category_id)),
+            ('sport', str(sport_id)),
+            ('user', str(quiz.user_id)),
+            ('day', quiz.completed_at.date().isoformat()),
+        ]
+    
+    @classmethod
+    def record_quiz(cls, quiz, sport_id, session=None):
+        # Fold a finished quiz into every rollup it belongs to
+        score = quiz.score or 0
+        cls._add_totals({rollup_key: (1, score, score) for rollup_key in cls.keys_for(quiz, sport_id)},
+                        session or db.session)
+    
+    @classmethod
+    def record_quizzes(cls, quizzes, session=None):
+        # Fold many finished quizzes (with their category loaded) into the rollups as one batch
+        totals = {}
+        for quiz in quizzes:
+            score = quiz.score or 0
+            for rollup_key in cls.keys_for(quiz, quiz.category.sport_id):
+                count, total, best = totals.get(rollup_key, (0, 0, 0))
+                totals[rollup_key] = (count + 1, total + score, max(best, score))
+        if totals:
+            cls._add_totals(totals, session or db.session)
+    
+    @classmethod
+    def record_score_changes(cls, changes, session=None):
+        # Add (quiz, sport_id, score delta) of already counted quizzes, e.g. answers stored after the finish
+        totals = {}
+        for quiz, sport_id, delta in changes:
+            for rollup_key in cls.keys_for(quiz, sport_id):
+                count, total, best = totals.get(rollup_key, (0, 0, 0))
+                totals[rollup_key] = (count, total + delta, max(best, quiz.score or 0))
+        if totals:
+            cls._add_totals(totals, session or db.session)
+    
+    @classmethod
+    def _add_totals(cls, totals, session):
+        # Upsert {(dimension, key): (count, total, best)}: concurrent finishes creating the same new row
+        # add to it instead of failing on the primary key; sorted so PostgreSQL locks rows in one order
+        table = cls.__table__
+        insert = conflict_insert(session, table)
+        excluded = insert.excluded
+        session.execute(
+            insert.on_conflict_do_update(index_elements=['dimension', 'key'], set_={
+                'quiz_count': table.c.quiz_count + excluded['quiz_count'],
+                'score_sum': table.c.score_sum + excluded['score_sum'],
+                'best_score': db.case((table.c.best_score < excluded['best_score'], excluded['best_score']),
+                                      else_=table.c.best_score),
+                'updated_at': datetime.utcnow()
+            }),
+            [{'dimension': dimension, 'key': key, 'quiz_count': count, 'score_sum': total, 'best_score': best}
+             for (dimension, key), (count, total, best) in sorted(totals.items())]
+        )
+    
+    @classmethod
+    def rebuild(cls):
+        # Recompute all rollups from finished quizzes (time_taken is set on finish), archived ones included
+        cls.query.delete()
+        totals = {}
+        
+        def add(quiz, sport_id):
+            score = quiz.score or 0
+            for rollup_key in cls.keys_for(quiz, sport_id):
+                count, total, best = totals.get(rollup_key, (0, 0, 0))
+                totals[rollup_key] = (count + 1, total + score, max(best, score))
+        
+        rows = db.session.query(
+            Quiz.category_id, Quiz.user_id, Quiz.score, Quiz.completed_at, Category.sport_id
+        ).join(Category).filter(Quiz.time_taken.isnot(None)).yield_per(1000)
+        for row in rows:
+            add(row, row.sport_id)
+        sports = dict(db.session.query(Category.id, Category.sport_id).all())
+        for quiz in quiz_archive.iter_quizzes():
+            if quiz.time_taken is not None and quiz.category_id in sports:
+                add(quiz, sports[quiz.category_id])
+        
+        if totals:
+            db.session.execute(db.insert(cls), [
+                {'dimension': dimension, 'key': key, 'quiz_count': count,
+                 'score_sum': total, 'best_score': best}
+                for (dimension, key), (count, total, best) in totals.items()
+            ])
+        return len(totals)
+
+class QuestionStats(db.Model):
+    # Running answer statistics per question, updated as answers are stored
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    correct = db.Column(db.Integer, default=0, nullable=False)
+    total_time = db.Column(db.Integer, default=0, nullable=False)  # in seconds
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def correct_rate(self):
+        return self.correct / self.attempts if self.attempts else None
+    
+    @property
+    def mean_time(self):
+        return self.total_time / self.attempts if self.attempts else None
+    
+    @classmethod
+    def record_answers(cls, deltas, session=None):
+        # Add {question_id: (attempts, correct, time)} deltas with one upsert, so concurrent first answers
+        # to a question add to its row instead of failing on the primary key; sorted to lock in one order
+        session = session or db.session
+        if not deltas:
+            return
+        table = cls.__table__
+        insert = conflict_insert(session, table)
+        excluded = insert.excluded
+        session.execute(
+            insert.on_conflict_do_update(index_elements=['question_id'], set_={
+                'attempts': table.c.attempts + excluded['attempts'],
+                'correct': table.c.correct + excluded['correct'],
+                'total_time': table.c.total_time + excluded['total_time'],
+                'updated_at': datetime.utcnow()
+            }),
+            [{'question_id': question_id, 'attempts': attempts, 'correct': correct, 'total_time': total_time}
+             for question_id, (attempts, correct, total_time) in sorted(deltas.items())]
+        )
+    
+    @classmethod
+    def rebuild(cls, question_ids=None):
+        # Recompute stats from QuizAnswer with one grouped INSERT ... SELECT, then add the archived totals
+        delete = cls.query
+        answers = db.session.query(
+            QuizAnswer.question_id,
+            db.func.count(QuizAnswer.id),
+            db.func.coalesce(db.func.sum(db.case((QuizAnswer.is_correct, 1), else_=0)), 0),
+            db.func.coalesce(db.func.sum(QuizAnswer.time_taken), 0),
+            db.func.now()
+        ).group_by(QuizAnswer.question_id)
+        if question_ids is not None:
+            delete = delete.filter(cls.question_id.in_(question_ids))
+            answers = answers.filter(QuizAnswer.question_id.in_(question_ids))
+        delete.delete(synchronize_session=False)
+        db.session.execute(db.insert(cls).from_select(
+            ['question_id', 'attempts', 'correct', 'total_time', 'updated_at'], answers.subquery().select()
+        ))
+        cls.record_answers(quiz_archive.question_totals(question_ids))
+
+class UserSeenQuestions(db.Model):
+    # IDs of the questions each user has answered in finished quizzes, as a sorted packed int64 array.
+    # complete_quiz adds each quiz's answers and rebuild() recomputes the same set from QuizAnswer
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    question_ids = db.Column(db.LargeBinary, nullable=False, default=b'')
+    
+    def get_ids(self):
+        ids = array('q')
+        ids.frombytes(self.question_ids or b'')
+        return ids
+    
+    def add_ids(self, question_ids):
+        ids = self.get_ids()
+        for question_id in question_ids:
+            index = bisect_left(ids, question_id)
+            if index == len(ids) or ids[index] != question_id:
+                ids.insert(index, question_id)
+        self.question_ids = ids.tobytes()
+    
+    @classmethod
+    def for_user(cls, user_id, session=None):
+        session = session or db.session
+        seen = session.get(cls, user_id)
+        if seen is None:
+            seen = cls(user_id=user_id, question_ids=b'')
+            session.add(seen)
+        return seen
+    
+    @classmethod
+    def ids_for(cls, user_id, session=None):
+        # Read-only: an empty array for users without a row yet
+        seen = (session or db.session).get(cls, user_id)
+        return seen.get_ids() if seen else array('q')
+    
+    @classmethod
+    def record_quizzes(cls, quiz_ids, session=None):
+        # Add the questions answered in newly finished quizzes to their users' sets
+        session = session or db.session
+        if not quiz_ids:
+            return
+        answered = {}
+        rows = session.query(Quiz.user_id, QuizAnswer.question_id).join(QuizAnswer)\
+                      .filter(Quiz.id.in_(list(quiz_ids))).distinct()
+        for user_id, question_id in rows:
+            answered.setdefault(user_id, []).append(question_id)
+        for user_id, question_ids in answered.items():
+            cls.for_user(user_id, session).add_ids(sorted(question_ids))
+    
+    @classmethod
+    def rebuild(cls, chunk_size=1000):
+        # Recompute every seen set from the answers of finished quizzes, streaming one user at a time.
+        # Only live answers count: questions seen in archived months may be served again
+        cls.query.delete()
+        rows = db.session.query(Quiz.user_id, QuizAnswer.question_id).join(QuizAnswer)\
+                         .filter(Quiz.time_taken.isnot(None)).distinct().order_by(Quiz.user_id, QuizAnswer.question_id).yield_per(10000)
+        batch = []
+        current_user = None
+        ids = array('q')
+        users = 0
+        for user_id, question_id in rows:
+            if user_id != current_user:
+                if current_user is not None:
+                    batch.append({'user_id': current_user, 'question_ids': ids.tobytes()})
+                current_user, ids = user_id, array('q')
+                users += 1
+            ids.append(question_id)
+            if len(batch) >= chunk_size:
+                db.session.execute(db.insert(cls), batch)
+                batch = []
+        if current_user is not None:
+            batch.append({'user_id': current_user, 'question_ids': ids.tobytes()})
+        if batch:
+            db.session.execute(db.insert(cls), batch)
+        return users
+
+class CacheVersion(db.Model):
+    # Version counters used by per-worker caches to detect stale data
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
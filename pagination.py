@@ -0,0 +1,72 @@
+import base64
+import binascii
+from datetime import datetime
+
+from models import db, Quiz
+
+
+def encode_cursor(completed_at, quiz_id):
+    raw = '{}|{}'.format(completed_at.isoformat(), quiz_id)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # (completed_at, id) from a cursor; raises ValueError if it is malformed
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        completed_at, quiz_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(completed_at), int(quiz_id)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+class KeysetPage:
+    # One page of quizzes, newest first, with cursors to its neighbours
+    def __init__(self, items, has_prev, has_next):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    @property
+    def prev_cursor(self):
+        if self.has_prev and self.items:
+            return encode_cursor(self.items[0].completed_at, self.items[0].id)
+        return None
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.items:
+            return encode_cursor(self.items[-1].completed_at, self.items[-1].id)
+        return None
+
+
+def _merge(live, archived, descending):
+    # Live rows shadow archived copies of the same quiz (the archive job deletes them just after)
+    ids = {quiz.id for quiz in live}
+    rows = live + [quiz for quiz in archived if quiz.id not in ids]
+    return sorted(rows, key=lambda quiz: (quiz.completed_at, quiz.id), reverse=descending)
+
+
+def paginate_quizzes(query, after=None, before=None, per_page=10, archived=None):
+    # Keyset pagination on (completed_at, id) descending; no COUNT and no OFFSET. archived(after=,
+    # before=, limit=) supplies older quizzes moved out of the table, read only when the table runs out
+    key = db.tuple_(Quiz.completed_at, Quiz.id)
+    if before:
+        cursor = decode_cursor(before)
+        # Archived months are older than live rows, so they come first going forwards
+        rows = archived(before=cursor, limit=per_page + 1) if archived else []
+        if len(rows) <= per_page:
+            live = query.filter(key > cursor)\
+                        .order_by(Quiz.completed_at.asc(), Quiz.id.asc())\
+                        .limit(per_page + 1).all()
+            rows = _merge(live, rows, descending=False)
+        has_prev = len(rows) > per_page
+        return KeysetPage(list(reversed(rows[:per_page])), has_prev, True)
+
+    cursor = decode_cursor(after) if after else None
+    if cursor:
+        query = query.filter(key < cursor)
+    rows = query.order_by(Quiz.completed_at.desc(), Quiz.id.desc()).limit(per_page + 1).all()
+    if archived and len(rows) <= per_page:
+        rows = _merge(rows, archived(after=cursor, limit=per_page + 1), descending=True)
+    return KeysetPage(rows[:per_page], bool(after), len(rows) > per_page)
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    # Raised instead of queueing when the hashing pool is saturated
+    pass
+
+
+def normalize_method(method):
+    # Method string with every cost parameter spelled out, as werkzeug writes it into hashes
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return 'pbkdf2:{}:{}'.format(hash_name, iterations)
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    return method
+
+
+class PasswordHasher:
+    # Hashes and verifies passwords on a bounded thread pool (hashlib releases the GIL while hashing)
+    def __init__(self, method='pbkdf2:sha256', salt_length=16, workers=None, max_pending=None, timeout=10):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(method, salt_length, workers, max_pending, timeout)
+
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+
+    def configure(self, method, salt_length=16, workers=None, max_pending=None, timeout=10):
+        # workers=0 hashes inline on the calling thread
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _pool(self):
+        # Threads start on first use, so pre-fork servers do not fork a running pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.total_ms += (time.perf_counter() - start) * 1000
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return self._timed(fn, *args)
+
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy('Too many password checks in progress')
+        try:
+            future = self._pool().submit(self._timed, fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            self.rejected += 1
+            raise HashingBusy('Password check timed out') from None
+
+    def hash(self, password):
+        self.hashed += 1
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        self.verified += 1
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+    def get_stats(self):
+        done = self.hashed + self.verified - self.rejected
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'hashed': self.hashed,
+            'verified': self.verified,
+            'rehashed': self.rehashed,
+            'rejected': self.rejected,
+            'hash_ms_avg': round(self.total_ms / done, 3) if done > 0 else 0
+        }
+
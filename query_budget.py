@@ -0,0 +1,101 @@
+import threading
+import time
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+
+from models import db
+
+_local = threading.local()
+_engines = set()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    # Counts SQL statements executed on the current thread while active
+    def __init__(self, keep_statements=True):
+        self.count = 0
+        self.time = 0.0  # seconds spent executing statements
+        self.keep_statements = keep_statements
+        self.statements = []
+
+    def __enter__(self):
+        for engine in db.engines.values():
+            _listen(engine)
+        stack = getattr(_local, 'counters', None)
+        if stack is None:
+            stack = _local.counters = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _local.counters.remove(self)
+        return False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counters = getattr(_local, 'counters', None)
+    if not counters:
+        return
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+    for counter in counters:
+        counter.count += 1
+        if counter.keep_statements:
+            counter.statements.append(statement)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for counter in getattr(_local, 'counters', ()):
+        counter.time += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        starts = context.connection.info.get('query_start')
+        if starts:
+            starts.pop()
+
+
+def _listen(engine):
+    if engine not in _engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+        _engines.add(engine)
+
+
+def count_queries(keep_statements=True):
+    return QueryCounter(keep_statements)
+
+
+def query_budget(max_queries):
+    # Fail a view that issues more than max_queries SQL statements when enforced
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config['QUERY_BUDGET_ENFORCE']:
+                return f(*args, **kwargs)
+
+            with count_queries() as counter:
+                response = f(*args, **kwargs)
+
+            if counter.count > max_queries:
+                raise QueryBudgetExceeded(
+                    '%s issued %d queries (budget %d):\n%s' % (
+                        f.__name__, counter.count, max_queries, '\n'.join(counter.statements)
+                    )
+                )
+            return response
+        # Kept on the view (functools.wraps copies it outward) so tests can assert the same number
+        decorated_function.max_queries = max_queries
+        return decorated_function
+    return decorator
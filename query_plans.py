@@ -0,0 +1,85 @@
+import json
+
+from sqlalchemy import text
+
+from models import db, Category, Question, Quiz, QuizAnswer
+
+
+def hot_queries():
+    # (name, query, tables that must be reached through an index)
+    return [
+        ('start_quiz question pool',
+         db.session.query(Question.id).filter_by(category_id=1, difficulty='easy').order_by(Question.id),
+         ['question']),
+        ('index/profile quiz history',
+         Quiz.query.filter_by(user_id=1).order_by(Quiz.completed_at.desc()).limit(10),
+         ['quiz']),
+        ('results answers',
+         QuizAnswer.query.filter_by(quiz_id=1).order_by(QuizAnswer.id),
+         ['quiz_answer']),
+        ('profile category stats',
+         db.session.query(
+             Category.name,
+             db.func.count(Quiz.id),
+             db.func.avg(Quiz.score),
+             db.func.max(Quiz.score)
+         ).join(Quiz).filter(Quiz.user_id == 1).group_by(Category.id, Category.name),
+         ['quiz']),
+        ('report quizzes per category',
+         db.session.query(Quiz.category_id, db.func.count(Quiz.id)).filter(Quiz.category_id == 1)
+                   .group_by(Quiz.category_id),
+         ['quiz']),
+    ]
+
+
+def _compile(query):
+    return str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _sqlite_scans(sql, tables):
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+    details = [row[-1] for row in rows]
+    scans = []
+    for detail in details:
+        words = detail.split()
+        # "SCAN quiz" is a full table scan; "SCAN quiz USING COVERING INDEX ..." is not
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in tables and 'INDEX' not in detail:
+            scans.append(detail)
+    return scans, details
+
+
+def _postgresql_scans(sql, tables):
+    # Small seeded tables make sequential scans cheapest, so ask for the index path explicitly
+    db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = db.session.execute(text('EXPLAIN (FORMAT JSON) ' + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in tables:
+            scans.append('Seq Scan on {}'.format(node['Relation Name']))
+        nodes.extend(node.get('Plans', []))
+    return scans, [json.dumps(plan)]
+
+
+def check_query_plans():
+    # Return [(name, ok, plan details)] for every hot query shape
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        explain = _sqlite_scans
+    elif dialect == 'postgresql':
+        explain = _postgresql_scans
+    else:
+        raise RuntimeError('Query plan checks support sqlite and postgresql, not {}'.format(dialect))
+
+    results = []
+    try:
+        for name, query, tables in hot_queries():
+            scans, details = explain(_compile(query), tables)
+            results.append((name, not scans, scans or details))
+    finally:
+        db.session.rollback()
+    return results
@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import time
+
+from cache_versions import QUESTIONS_VERSION, bump_version
+from models import db, Category, Question
+
+QUESTION_TYPES = ('mcq', 'true_false', 'fill_blank')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+MAX_ANSWER_LENGTH = 500
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []  # (row number, message)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self, max_errors=100):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+            'errors': [{'row': row, 'error': message} for row, message in self.errors[:max_errors]]
+        }
+
+
+def iter_rows(stream, fmt):
+    # Yield (row number, dict) pairs from a CSV or JSONL text stream without reading it whole
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {'_error': 'Invalid JSON: {}'.format(e)}
+            if not isinstance(row, dict):
+                row = {'_error': 'Expected a JSON object'}
+            yield number, row
+    else:
+        raise ValueError('Unsupported import format: {}'.format(fmt))
+
+
+def _text(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def _parse_list(value):
+    # Lists come as JSON arrays, or as "|"-separated strings in CSV files
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    value = str(value).strip()
+    if value.startswith('['):
+        return [str(item).strip() for item in json.loads(value) if str(item).strip()]
+    return [item.strip() for item in value.split('|') if item.strip()]
+
+
+def validate_row(row, category_ids, valid_category_ids):
+    # Return (values for a Question insert, None) or (None, error message)
+    if '_error' in row:
+        return None, row['_error']
+
+    text = _text(row, 'text')
+    question_type = _text(row, 'question_type', 'type')
+    difficulty = _text(row, 'difficulty').lower()
+    correct_answer = _text(row, 'correct_answer')
+
+    if not text:
+        return None, 'Missing question text'
+    if question_type not in QUESTION_TYPES:
+        return None, 'Invalid question type: {!r}'.format(question_type)
+    if difficulty not in DIFFICULTIES:
+        return None, 'Invalid difficulty: {!r}'.format(difficulty)
+    if not correct_answer:
+        return None, 'Missing correct answer'
+    if len(correct_answer) > MAX_ANSWER_LENGTH:
+        return None, 'Correct answer longer than {} characters'.format(MAX_ANSWER_LENGTH)
+
+    category_id = row.get('category_id')
+    if category_id not in (None, ''):
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None, 'Invalid category_id: {!r}'.format(category_id)
+        if category_id not in valid_category_ids:
+            return None, 'Unknown category_id: {}'.format(category_id)
+    else:
+        category_name = _text(row, 'category')
+        category_id = category_ids.get(category_name)
+        if category_id is None:
+            return None, 'Unknown category: {!r}'.format(category_name)
+
+    try:
+        options = _parse_list(row.get('options'))
+        accepted_answers = _parse_list(row.get('accepted_answers'))
+    except ValueError:
+        return None, 'Invalid options or accepted_answers list'
+
+    if question_type == 'mcq':
+        if len(options) < 2:
+            return None, 'MCQ needs at least 2 options'
+        if correct_answer not in options:
+            return None, 'MCQ options do not contain the correct answer'
+    elif question_type == 'true_false':
+        if correct_answer.lower() not in ('true', 'false'):
+            return None, "True/False answer must be 'True' or 'False'"
+        correct_answer = correct_answer.capitalize()
+
+    return {
+        'text': text,
+        'question_type': question_type,
+        'difficulty': difficulty,
+        'options': json.dumps(options) if question_type == 'mcq' else None,
+        'correct_answer': correct_answer,
+        'accepted_answers': json.dumps(accepted_answers) if question_type == 'fill_blank' and accepted_answers else None,
+        'explanation': _text(row, 'explanation'),
+        'category_id': category_id
+    }, None
+
+
+def _insert_chunk(chunk, report):
+    # One transaction per chunk; fall back to per-row inserts to isolate bad rows
+    try:
+        db.session.execute(db.insert(Question), [values for _, values in chunk])
+        db.session.commit()
+        report.imported += len(chunk)
+        return
+    except Exception:
+        db.session.rollback()
+
+    for number, values in chunk:
+        try:
+            db.session.execute(db.insert(Question), [values])
+            db.session.commit()
+            report.imported += 1
+        except Exception as e:
+            db.session.rollback()
+            report.errors.append((number, 'Database error: {}'.format(e.__class__.__name__)))
+
+
+def import_questions(rows, chunk_size=1000, progress=None):
+    # rows: iterable of (row number, dict); returns an ImportReport
+    report = ImportReport()
+    category_ids = dict(db.session.query(Category.name, Category.id).all())
+    valid_category_ids = set(category_ids.values())
+    chunk = []
+
+    for number, row in rows:
+        report.rows += 1
+        values, error = validate_row(row, category_ids, valid_category_ids)
+        if error:
+            report.errors.append((number, error))
+            continue
+
+        chunk.append((number, values))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk, report)
+            chunk = []
+            report.elapsed = time.perf_counter() - report.started
+            if progress:
+                progress(report)
+
+    if chunk:
+        _insert_chunk(chunk, report)
+    if report.imported:
+        # Bulk inserts bypass the ORM listener; the bump reaches every worker's question pool
+        bump_version(db.session, QUESTIONS_VERSION)
+        db.session.commit()
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def import_file(stream, fmt, chunk_size=1000, progress=None):
+    # Accept binary streams (e.g. uploads) as well as text streams
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return import_questions(iter_rows(stream, fmt), chunk_size, progress)
@@ -0,0 +1,149 @@
+import json
+import threading
+from collections import OrderedDict
+
+from cache_versions import QUESTIONS_VERSION, VersionWatch
+from models import db, Question, QuestionStats
+
+
+class QuestionPayload:
+    # Answer-free question JSON with only number/total left to fill in
+    __slots__ = ('question_id', 'tail')
+
+    def __init__(self, question):
+        body = {
+            'id': question.id,
+            'text': question.text,
+            'type': question.question_type
+        }
+        if question.question_type == 'mcq':
+            body['options'] = question.get_options()
+        self.question_id = question.id
+        # '{"number":N,"total":T,' is prepended at render time
+        self.tail = json.dumps(body, sort_keys=True, separators=(',', ':')).encode()[1:]
+
+    def render(self, number, total):
+        return b'{"number":%d,"total":%d,' % (number, total) + self.tail
+
+
+class QuestionPayloadCache:
+    # Bounded LRU of encoded question payloads keyed by question ID, cleared when the shared questions
+    # version changes (an edit or delete in any process)
+    def __init__(self, max_entries=50000, check_interval=5):
+        self.max_entries = max_entries
+        self.watch = VersionWatch(QUESTIONS_VERSION, check_interval)
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    def is_stale(self):
+        return self.watch.is_stale()
+
+    def refresh(self, session=None):
+        if self.watch.changed(session):
+            self.invalidate()
+
+    def put(self, question):
+        payload = QuestionPayload(question)
+        with self._lock:
+            self._payloads[question.id] = payload
+            self._payloads.move_to_end(question.id)
+            while len(self._payloads) > self.max_entries:
+                self._payloads.popitem(last=False)
+                self.evictions += 1
+        return payload
+
+    def peek(self, question_id):
+        # Cached payload only, without loading the question; callers refresh() first
+        with self._lock:
+            payload = self._payloads.get(question_id)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._payloads.move_to_end(question_id)
+            self.hits += 1
+            return payload
+
+    def get(self, question_id):
+        self.refresh()
+        payload = self.peek(question_id)
+        if payload is not None:
+            return payload
+
+        question = db.session.get(Question, question_id)
+        if question is None:
+            return None
+        return self.put(question)
+
+    def get_many(self, question_ids, on_load=None):
+        # Payloads by ID; misses are loaded with one IN query and passed to on_load(question)
+        self.refresh()
+        payloads = {}
+        missing = []
+        for question_id in set(question_ids):
+            payload = self.peek(question_id)
+            if payload is None:
+                missing.append(question_id)
+            else:
+                payloads[question_id] = payload
+
+        if missing:
+            for question in Question.query.filter(Question.id.in_(missing)).all():
+                payloads[question.id] = self.put(question)
+                if on_load is not None:
+                    on_load(question)
+        return payloads
+
+    def render(self, payload, number, total):
+        data = payload.render(number, total)
+        self.bytes_served += len(data)
+        return data
+
+    def render_quiz(self, quiz_id, payloads, total):
+        # get_questions body for payloads in quiz order
+        data = b'{"questions":[%s],"quiz_id":%d}' % (
+            b','.join(payload.render(number, total) for number, payload in enumerate(payloads, 1)), quiz_id)
+        self.bytes_served += len(data)
+        return data
+
+    def warm(self, buckets=10):
+        # Preload the (category, difficulty) buckets with the most answers; returns questions loaded.
+        # The version is read first so an edit made while warming is still noticed
+        self.refresh()
+        hottest = db.session.query(Question.category_id, Question.difficulty)\
+                            .join(QuestionStats, QuestionStats.question_id == Question.id)\
+                            .group_by(Question.category_id, Question.difficulty)\
+                            .order_by(db.func.sum(QuestionStats.attempts).desc())\
+                            .limit(buckets).all()
+        loaded = 0
+        for category_id, difficulty in hottest:
+            room = self.max_entries - len(self._payloads)
+            if room <= 0:
+                break
+            for question in Question.query.filter_by(category_id=category_id, difficulty=difficulty)\
+                                          .limit(room).all():
+                self.put(question)
+                loaded += 1
+        return loaded
+
+    def invalidate(self, question_id=None):
+        with self._lock:
+            if question_id is None:
+                self._payloads.clear()
+            else:
+                self._payloads.pop(question_id, None)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._payloads),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'bytes_served': self.bytes_served
+        }
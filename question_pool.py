@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from array import array
+
+from cache_versions import QUESTIONS_VERSION, VersionWatch
+from models import db, Question
+
+
+class QuestionPool:
+    # Process-local index of question IDs keyed by (category_id, difficulty), reloaded after `ttl` seconds
+    # or as soon as the shared questions version changes (e.g. a re-bucketing in another process)
+    def __init__(self, ttl=300, check_interval=5):
+        self.ttl = ttl
+        self.watch = VersionWatch(QUESTIONS_VERSION, check_interval)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def _key(self, category_id, difficulty):
+        return (int(category_id), difficulty)
+
+    def _load(self, key):
+        rows = db.session.query(Question.id).filter_by(
+            category_id=key[0],
+            difficulty=key[1]
+        ).order_by(Question.id).all()
+        return array('l', (row.id for row in rows))
+
+    def get_ids(self, category_id, difficulty):
+        if self.watch.changed():
+            self.invalidate()
+        key = self._key(category_id, difficulty)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        ids = self._load(key)
+
+        with self._lock:
+            self._buckets[key] = (ids, now)
+            self.rebuilds += 1
+        return ids
+
+    def sample(self, category_id, difficulty, k=10):
+        ids = self.get_ids(category_id, difficulty)
+        if len(ids) < k:
+            return None
+        return random.sample(ids, k)
+
+    def add(self, question):
+        # Append a newly saved question to its bucket if it is already loaded
+        key = self._key(question.category_id, question.difficulty)
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry:
+                ids = array('l', entry[0])
+                ids.append(question.id)
+                self._buckets[key] = (ids, entry[1])
+
+    def invalidate(self, category_id=None, difficulty=None):
+        with self._lock:
+            if category_id is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(self._key(category_id, difficulty), None)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'buckets': len(self._buckets),
+                'question_ids': sum(len(entry[0]) for entry in self._buckets.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds
+            }
+
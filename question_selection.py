@@ -0,0 +1,113 @@
+import heapq
+import math
+import random
+import threading
+import time
+from bisect import bisect_left
+
+from models import db, Question, QuestionStats
+
+# Expected correct rate of a question with no answers yet, by its labelled difficulty
+PRIOR_RATES = {'easy': 0.75, 'medium': 0.55, 'hard': 0.35}
+PRIOR_WEIGHT = 5  # answers the prior counts as
+SKILL_PRIOR_RATE = 0.55
+SKILL_PRIOR_WEIGHT = 10
+BANDWIDTH = 0.15  # how sharply weights fall off as a question's rate moves away from the user's
+MIN_WEIGHT = 0.05  # every unseen question keeps some chance of being picked
+CANDIDATES = 200  # unseen questions drawn from a bucket before weighting
+
+
+def estimate_skill(correct_answers, questions_served):
+    # Smoothed share of served questions the user answered correctly
+    return (correct_answers + SKILL_PRIOR_RATE * SKILL_PRIOR_WEIGHT) / (questions_served + SKILL_PRIOR_WEIGHT)
+
+
+def _contains(sorted_ids, question_id):
+    index = bisect_left(sorted_ids, question_id)
+    return index < len(sorted_ids) and sorted_ids[index] == question_id
+
+
+class QuestionSelector:
+    # Picks unseen questions whose observed correct rate is close to the user's skill
+    def __init__(self, question_pool, ttl=300):
+        self.question_pool = question_pool
+        self.ttl = ttl
+        self._counts = {}  # question_id -> [attempts, correct]
+        self._loaded = {}  # (category_id, difficulty) -> load time
+        self._lock = threading.Lock()
+        self.selections = 0
+        self.select_time = 0.0
+
+    def _load(self, key):
+        rows = db.session.query(QuestionStats.question_id, QuestionStats.attempts, QuestionStats.correct)\
+                         .join(Question, Question.id == QuestionStats.question_id)\
+                         .filter(Question.category_id == key[0], Question.difficulty == key[1]).all()
+        with self._lock:
+            for question_id, attempts, correct in rows:
+                self._counts[question_id] = [attempts, correct]
+            self._loaded[key] = time.monotonic()
+
+    def _ensure_loaded(self, key):
+        loaded_at = self._loaded.get(key)
+        if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+            self._load(key)
+
+    def observe(self, question_id, is_correct):
+        # Keep the in-process view current between reloads
+        with self._lock:
+            counts = self._counts.get(question_id)
+            if counts is None:
+                counts = self._counts[question_id] = [0, 0]
+            counts[0] += 1
+            counts[1] += bool(is_correct)
+
+    def expected_rate(self, question_id, difficulty):
+        prior = PRIOR_RATES.get(difficulty, SKILL_PRIOR_RATE)
+        attempts, correct = self._counts.get(question_id, (0, 0))
+        return (correct + prior * PRIOR_WEIGHT) / (attempts + PRIOR_WEIGHT)
+
+    def select(self, category_id, difficulty, seen_ids, skill, k=10):
+        # k question IDs from the bucket, unseen first, or None if the bucket is too small
+        key = (int(category_id), difficulty)
+        bucket = self.question_pool.get_ids(*key)
+        if len(bucket) < k:
+            return None
+        self._ensure_loaded(key)
+
+        start = time.perf_counter()
+        sample = random.sample(bucket, min(len(bucket), CANDIDATES))
+        unseen = [question_id for question_id in sample if not _contains(seen_ids, question_id)]
+        if len(unseen) < k and len(sample) < len(bucket):
+            unseen = [question_id for question_id in bucket if not _contains(seen_ids, question_id)]
+
+        # Weighted sampling without replacement: the k largest u ** (1 / w) keys
+        weighted = []
+        for question_id in unseen:
+            distance = (self.expected_rate(question_id, difficulty) - skill) / BANDWIDTH
+            weight = MIN_WEIGHT + math.exp(-0.5 * distance * distance)
+            weighted.append((random.random() ** (1.0 / weight), question_id))
+        selected = [question_id for _, question_id in heapq.nlargest(k, weighted)]
+
+        # Users who have seen most of the bucket get repeats to fill the quiz
+        if len(selected) < k:
+            chosen = set(selected)
+            repeats = [question_id for question_id in bucket if question_id not in chosen]
+            selected.extend(random.sample(repeats, k - len(selected)))
+
+        self.selections += 1
+        self.select_time += time.perf_counter() - start
+        return selected
+
+    def invalidate(self):
+        with self._lock:
+            self._counts.clear()
+            self._loaded.clear()
+
+    def get_stats(self):
+        return {
+            'questions_with_stats': len(self._counts),
+            'buckets_loaded': len(self._loaded),
+            'selections': self.selections,
+            'select_ms_avg': round(self.select_time / self.selections * 1000, 4) if self.selections else 0
+        }
+
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload
+
+from models import Category, Quiz, QuizAnswer, UserStats, ReportRollup, QuestionStats, UserSeenQuestions
+
+
+# Quiz writes shared by the Flask views and the asyncio API (through AsyncSession.run_sync).
+# Callers commit.
+
+def record_answer(session, state, question_id, user_answer, is_correct, time_taken):
+    # Store a graded answer; state['score'] already includes it
+    if is_correct:
+        UserStats.for_user(state['user_id'], session).record_correct_answer(state['score'])
+        session.query(Quiz).filter_by(id=state['quiz_id']).update({Quiz.score: Quiz.score + 1})
+    QuestionStats.record_answers({question_id: (1, int(is_correct), time_taken or 0)}, session)
+
+    session.add(QuizAnswer(
+        quiz_id=state['quiz_id'],
+        question_id=question_id,
+        user_answer=user_answer,
+        is_correct=is_correct,
+        time_taken=time_taken
+    ))
+
+
+def _lock_quizzes(session, quiz_ids, now):
+    # Write the quiz rows before reading their scores. The row locks (SQLite's write lock) order a finish
+    # against answer flushes from any worker: a flush either lands first and is in the score, or waits
+    # and then finds the quiz finished and folds its answers in itself (fold_late_answers)
+    return session.query(Quiz).filter(Quiz.id.in_(sorted(quiz_ids)))\
+                  .update({Quiz.completed_at: now}, synchronize_session=False)
+
+
+def complete_quiz(session, quiz_id, total_time):
+    # Record the finish time of a quiz, or return None if it does not exist
+    now = datetime.utcnow()
+    if not _lock_quizzes(session, [quiz_id], now):
+        return None
+    quiz = session.get(Quiz, quiz_id, populate_existing=True)
+
+    first_finish = quiz.time_taken is None
+    UserStats.for_user(quiz.user_id, session).record_quiz_finished(quiz.time_taken, total_time)
+    quiz.time_taken = total_time
+    quiz.completed_at = now
+
+    # Fold the quiz into the report rollups and its answers into the seen set once
+    if first_finish:
+        ReportRollup.record_quiz(quiz, quiz.category.sport_id, session)
+        UserSeenQuestions.record_quizzes([quiz.id], session)
+    return quiz
+
+
+def complete_quizzes(session, quiz_ids, total_time):
+    # complete_quiz for many quizzes at once, e.g. every player of a live room
+    now = datetime.utcnow()
+    _lock_quizzes(session, quiz_ids, now)
+    quizzes = session.query(Quiz).options(joinedload(Quiz.category)).filter(Quiz.id.in_(quiz_ids))\
+                     .populate_existing().all()
+    user_ids = {quiz.user_id for quiz in quizzes}
+    # Load the players' stats into the identity map so for_user does not query per player
+    session.query(UserStats).filter(UserStats.user_id.in_(user_ids)).all()
+
+    first_finish = []
+    for quiz in quizzes:
+        if quiz.time_taken is None:
+            first_finish.append(quiz)
+        UserStats.for_user(quiz.user_id, session).record_quiz_finished(quiz.time_taken, total_time)
+        quiz.time_taken = total_time
+        quiz.completed_at = now
+
+    ReportRollup.record_quizzes(first_finish, session)
+    UserSeenQuestions.record_quizzes([quiz.id for quiz in first_finish], session)
+    return quizzes
+
+
+def fold_late_answers(session, quiz_ids, score_deltas):
+    # Answers stored after their quiz was finished (queued in another worker's answer buffer) are added
+    # to its report rollups and seen set here; call after the quiz rows of the batch were written
+    finished = session.query(
+        Quiz.id, Quiz.user_id, Quiz.category_id, Quiz.score, Quiz.completed_at, Category.sport_id
+    ).join(Category).filter(Quiz.id.in_(list(quiz_ids)), Quiz.time_taken.isnot(None)).all()
+    if not finished:
+        return
+    ReportRollup.record_score_changes([(quiz, quiz.sport_id, score_deltas[quiz.id])
+                                       for quiz in finished if score_deltas.get(quiz.id)], session)
+    UserSeenQuestions.record_quizzes([quiz.id for quiz in finished], session)
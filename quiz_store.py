@@ -0,0 +1,176 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class QuizStateStore:
+    # Server-side state of active quizzes, keyed by quiz ID
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def get(self, quiz_id):
+        raise NotImplementedError
+
+    def set(self, quiz_id, state):
+        raise NotImplementedError
+
+    def update(self, quiz_id, apply):
+        # Atomically pass the stored state to apply and store what it returns; apply returns None to
+        # leave the state unchanged. Returns apply's result, or None if the quiz is not stored
+        raise NotImplementedError
+
+    def delete(self, quiz_id):
+        raise NotImplementedError
+
+
+class MemoryQuizStore(QuizStateStore):
+    # In-process LRU store; entries expire after ttl seconds without access. Each worker process
+    # has its own, so use it only with a single worker. Callers get and store deep copies
+    def __init__(self, ttl, max_entries=10000):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Least recently used entries are at the front and expire first
+        while self._entries:
+            quiz_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[quiz_id]
+
+    def get(self, quiz_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[quiz_id]
+                return None
+            self._entries[quiz_id] = (now + self.ttl, entry[1])
+            self._entries.move_to_end(quiz_id)
+            return copy.deepcopy(entry[1])
+
+    def set(self, quiz_id, state):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[quiz_id] = (now + self.ttl, copy.deepcopy(state))
+            self._entries.move_to_end(quiz_id)
+            self._evict(now)
+
+    def update(self, quiz_id, apply):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is None or entry[0] <= now:
+                return None
+            state = apply(copy.deepcopy(entry[1]))
+            if state is not None:
+                self._entries[quiz_id] = (now + self.ttl, copy.deepcopy(state))
+                self._entries.move_to_end(quiz_id)
+            return state
+
+    def delete(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+
+class SQLiteQuizStore(QuizStateStore):
+    # File-backed store shared by all worker processes on one host
+    PURGE_INTERVAL = 100
+
+    def __init__(self, ttl, path):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS quiz_state ('
+                'quiz_id INTEGER PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, quiz_id):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT state FROM quiz_state WHERE quiz_id = ? AND expires_at > ?',
+            (quiz_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute('UPDATE quiz_state SET expires_at = ? WHERE quiz_id = ?',
+                         (now + self.ttl, quiz_id))
+        return json.loads(row[0])
+
+    def set(self, quiz_id, state):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO quiz_state (quiz_id, state, expires_at) VALUES (?, ?, ?)',
+                (quiz_id, json.dumps(state), now + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_INTERVAL == 0:
+                conn.execute('DELETE FROM quiz_state WHERE expires_at <= ?', (now,))
+
+    def update(self, quiz_id, apply):
+        # BEGIN IMMEDIATE takes the write lock before the read, so workers apply updates one at a time
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT state FROM quiz_state WHERE quiz_id = ? AND expires_at > ?',
+                (quiz_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+            state = apply(json.loads(row[0]))
+            if state is not None:
+                conn.execute('UPDATE quiz_state SET state = ?, expires_at = ? WHERE quiz_id = ?',
+                             (json.dumps(state), now + self.ttl, quiz_id))
+            return state
+
+    def delete(self, quiz_id):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM quiz_state WHERE quiz_id = ?', (quiz_id,))
+
+
+def mark_answered(question_id, is_correct):
+    # update() function that records an answer once; it returns None if the question was already answered
+    def apply(state):
+        if question_id in state['answered']:
+            return None
+        state['answered'].append(question_id)
+        if is_correct:
+            state['score'] += 1
+        return state
+    return apply
+
+
+def create_quiz_store(config):
+    ttl = config['PERMANENT_SESSION_LIFETIME'].total_seconds()
+    backend = config['QUIZ_STORE_BACKEND']
+
+    if backend == 'memory':
+        return MemoryQuizStore(ttl, config['QUIZ_STORE_MAX_ENTRIES'])
+    if backend == 'sqlite':
+        return SQLiteQuizStore(ttl, config['QUIZ_STORE_PATH'])
+    raise ValueError('Unknown QUIZ_STORE_BACKEND: %s' % backend)
@@ -0,0 +1,188 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Endpoints with a per-user token bucket; each reads its limit from RATE_LIMIT_<NAME>
+LIMITED_ENDPOINTS = ('start_quiz', 'submit_answer', 'finish_quiz')
+
+
+class RateLimited(Exception):
+    # A request refused by a rate or concurrency limit; retry_after is in whole seconds
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def parse_limit(value):
+    # 'count/seconds' -> (bucket capacity, tokens refilled per second); empty or a zero count disables
+    if not value:
+        return None
+    count, _, seconds = value.partition('/')
+    count, seconds = int(count), float(seconds or 1)
+    if count <= 0:
+        return None
+    return count, count / seconds
+
+
+def spend(tokens, elapsed, capacity, rate):
+    # Refill a bucket for the elapsed time and take a token: (tokens left, seconds to wait or 0)
+    tokens = min(capacity, tokens + elapsed * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryTokenBuckets:
+    # Buckets for this process, spread over several locks so concurrent users rarely contend
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, stripes=16):
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+        self._takes = [0] * stripes
+
+    def take(self, key, capacity, rate):
+        index = hash(key) % len(self._stripes)
+        buckets, lock = self._stripes[index]
+        now = time.monotonic()
+        with lock:
+            tokens, updated, _ = buckets.get(key, (capacity, now, now))
+            tokens, wait = spend(tokens, now - updated, capacity, rate)
+            # A bucket that has refilled is the same as no bucket, so it can be purged after full_at
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._takes[index] += 1
+            if self._takes[index] % self.PURGE_INTERVAL == 0:
+                for stale in [k for k, entry in buckets.items() if entry[2] <= now]:
+                    del buckets[stale]
+        return wait
+
+    def __len__(self):
+        return sum(len(buckets) for buckets, _ in self._stripes)
+
+
+class SQLiteTokenBuckets:
+    # File-backed buckets shared by all worker processes on one host
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit, so take() can hold the write lock across its read and update
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_limit WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row is not None else (capacity, now)
+            tokens, wait = spend(tokens, max(0, now - updated), capacity, rate)
+            conn.execute('INSERT OR REPLACE INTO rate_limit (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                         (key, tokens, now, now + (capacity - tokens) / rate))
+            self._takes += 1
+            if self._takes % self.PURGE_INTERVAL == 0:
+                conn.execute('DELETE FROM rate_limit WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM rate_limit').fetchone()[0]
+
+
+class RateLimiter:
+    # Per-user token buckets for named endpoints, and a cap on quiz requests in flight in this process
+    def __init__(self, buckets, limits, max_concurrent):
+        self.buckets = buckets
+        self.limits = limits  # endpoint name -> (capacity, refill per second)
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.shed = 0
+        self.allowed = defaultdict(int)
+        self.limited = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def check(self, name, user_id):
+        # Take a token from the user's bucket for this endpoint, or raise RateLimited
+        limit = self.limits.get(name)
+        if limit is None:
+            return
+        wait = self.buckets.take('%s:%s' % (name, user_id), *limit)
+        if wait:
+            self.limited[name] += 1
+            raise RateLimited(wait)
+        self.allowed[name] += 1
+
+    @contextmanager
+    def admit(self):
+        # Hold a concurrency slot for the block; raises RateLimited at once when none is free
+        if not self.max_concurrent:
+            yield
+            return
+        with self._lock:
+            if self.in_flight >= self.max_concurrent:
+                self.shed += 1
+                raise RateLimited(1)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def get_stats(self):
+        return {
+            'backend': type(self.buckets).__name__,
+            'limits': {name: {'burst': capacity, 'per_second': round(rate, 4)}
+                       for name, (capacity, rate) in self.limits.items()},
+            'buckets': len(self.buckets),
+            'allowed': dict(self.allowed),
+            'limited': dict(self.limited),
+            'max_concurrent': self.max_concurrent,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'shed': self.shed
+        }
+
+
+def create_rate_limiter(config):
+    backend = config['RATE_LIMIT_BACKEND']
+
+    if backend == 'memory':
+        buckets = MemoryTokenBuckets()
+    elif backend == 'sqlite':
+        buckets = SQLiteTokenBuckets(config['RATE_LIMIT_PATH'])
+    else:
+        raise ValueError('Unknown RATE_LIMIT_BACKEND: %s' % backend)
+
+    limits = {}
+    for name in LIMITED_ENDPOINTS:
+        limit = parse_limit(config['RATE_LIMIT_' + name.upper()])
+        if limit:
+            limits[name] = limit
+
+    max_concurrent = config['RATE_LIMIT_MAX_CONCURRENT']
+    if max_concurrent is None:
+        # More requests than the pool has connections would only queue for one
+        max_concurrent = config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW']
+    return RateLimiter(buckets, limits, max_concurrent)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, Sport, Category, CacheVersion
+from services import get_services
+
+VERSION_NAME = 'reference'
+
+
+class CachedSport:
+    __slots__ = ('id', 'name', 'description', 'categories')
+
+    def __init__(self, sport):
+        self.id = sport.id
+        self.name = sport.name
+        self.description = sport.description
+        self.categories = []
+
+
+class CachedCategory:
+    __slots__ = ('id', 'name', 'description', 'sport_id', 'sport')
+
+    def __init__(self, category, sport):
+        self.id = category.id
+        self.name = category.name
+        self.description = category.description
+        self.sport_id = category.sport_id
+        self.sport = sport
+
+
+class ReferenceCache:
+    # Read-through cache of sports and categories, reloaded when the DB version changes
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self.version = None
+        self.sports = []
+        self.categories = []
+        self._categories_by_id = {}
+        self._sports_by_id = {}
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _current_version(self, session):
+        return session.query(CacheVersion.version).filter_by(name=VERSION_NAME).scalar() or 0
+
+    def _load(self, session, version):
+        sports = {sport.id: CachedSport(sport) for sport in session.query(Sport).order_by(Sport.id).all()}
+        categories = []
+        for category in session.query(Category).order_by(Category.id).all():
+            sport = sports.get(category.sport_id)
+            cached = CachedCategory(category, sport)
+            categories.append(cached)
+            if sport:
+                sport.categories.append(cached)
+
+        self.sports = list(sports.values())
+        self.categories = categories
+        self._sports_by_id = sports
+        self._categories_by_id = {category.id: category for category in categories}
+        self.version = version
+
+    def is_stale(self):
+        return self.version is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def refresh(self, force=False, session=None):
+        if not force and not self.is_stale():
+            return
+
+        session = session or db.session
+        with self._lock:
+            now = time.monotonic()
+            version = self._current_version(session)
+            if force or version != self.version:
+                self._load(session, version)
+            self._checked_at = now
+
+    def invalidate(self):
+        self._checked_at = 0
+
+    def get_sports(self):
+        self.refresh()
+        return self.sports
+
+    def get_categories(self):
+        self.refresh()
+        return self.categories
+
+    def get_sport(self, sport_id):
+        self.refresh()
+        return self._sports_by_id.get(sport_id)
+
+    def get_category(self, category_id):
+        self.refresh()
+        return self._categories_by_id.get(category_id)
+
+    def get_categories_for_sport(self, sport_id):
+        sport = self.get_sport(sport_id)
+        return sport.categories if sport else []
+
+
+
+@event.listens_for(Session, 'before_flush')
+def bump_reference_version(session, flush_context, instances):
+    # Any change to a Sport or Category bumps the shared version in the same transaction
+    changed = any(isinstance(obj, (Sport, Category))
+                  for obj in list(session.new) + list(session.dirty) + list(session.deleted))
+    if not changed:
+        return
+
+    with session.no_autoflush:
+        row = session.get(CacheVersion, VERSION_NAME)
+    if row is None:
+        row = CacheVersion(name=VERSION_NAME, version=0)
+        session.add(row)
+    row.version = (row.version or 0) + 1
+    session.info['reference_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_reference_cache(session):
+    # The committing app's cache reloads now; other apps and processes notice the version within check_interval
+    if session.info.pop('reference_changed', False) and has_app_context():
+        get_services().reference_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_reference_change(session):
+    session.info.pop('reference_changed', None)
@@ -0,0 +1,196 @@
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+
+from archive import QUIZ_COLUMNS, ANSWER_COLUMNS, QUIZ_FIELDS, ANSWER_FIELDS, CATALOG
+from columnar import ColumnarWriter
+from migrations import AUTOINCREMENT_TABLES, sqlite_reuses_ids
+from models import db, Quiz, QuizAnswer, UserStats, QuestionStats
+
+STREAM_ROWS = 5000  # rows fetched per round trip while writing archive files
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(start, months):
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _chunks(values, size):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _delete_quizzes(quiz_ids, batch_size):
+    # Delete quizzes with their answers, one transaction per chunk so locks stay short
+    for chunk in _chunks(quiz_ids, batch_size):
+        QuizAnswer.query.filter(QuizAnswer.quiz_id.in_(chunk)).delete(synchronize_session=False)
+        Quiz.query.filter(Quiz.id.in_(chunk)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def purge_abandoned(older_than, batch_size=5000):
+    # Delete quizzes started before older_than and never finished (finishing sets time_taken);
+    # the stats they were counted in are rebuilt. Returns (quizzes, users)
+    abandoned = db.session.query(Quiz.id, Quiz.user_id)\
+                          .filter(Quiz.time_taken.is_(None), Quiz.completed_at < older_than).all()
+    if not abandoned:
+        return 0, 0
+    quiz_ids = [quiz_id for quiz_id, _ in abandoned]
+    question_ids = set()
+    for chunk in _chunks(quiz_ids, batch_size):
+        question_ids.update(question_id for (question_id,) in db.session.query(QuizAnswer.question_id)
+                            .filter(QuizAnswer.quiz_id.in_(chunk)).distinct())
+    _delete_quizzes(quiz_ids, batch_size)
+
+    users = sorted({user_id for _, user_id in abandoned})
+    for chunk in _chunks(users, batch_size):
+        for user_id in chunk:
+            UserStats.rebuild(user_id)
+        db.session.commit()
+    if question_ids:
+        QuestionStats.rebuild(list(question_ids))
+        db.session.commit()
+    return len(quiz_ids), len(users)
+
+
+def _stream(statement):
+    # Server-side cursor on its own primary connection, like the exports
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_ROWS).execute(statement)
+        for partition in result.partitions():
+            yield from partition
+
+
+def _merge(existing, new, key):
+    # Rows of an earlier archive file and the month's remaining live rows, both sorted by key;
+    # a row present in both (an interrupted run) is written once
+    last = None
+    for row in heapq.merge(existing, new, key=key):
+        row_key = key(row)
+        if row_key != last:
+            yield row
+            last = row_key
+
+
+def _write_catalog(directory, catalog):
+    path = os.path.join(directory, CATALOG)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'w') as f:
+        json.dump(catalog, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def archive_month(archive, start, batch_size=5000):
+    # Move one month of quizzes and their answers from the live tables into the archive:
+    # write new files (merged with any earlier ones for the month), publish them in the catalog,
+    # then delete the live rows. Returns the month's catalog entry, or None when no live rows were left
+    month = start.strftime('%Y-%m')
+    end = add_months(start, 1)
+    catalog = archive.read_catalog()
+    previous = catalog['months'].get(month)
+    generation = catalog['generation'] + 1
+
+    quiz_table, answer_table = Quiz.__table__, QuizAnswer.__table__
+    in_month = db.and_(quiz_table.c.completed_at >= start, quiz_table.c.completed_at < end)
+    quiz_ids = [quiz_id for (quiz_id,) in db.session.query(Quiz.id).filter(in_month).order_by(Quiz.id)]
+    db.session.commit()
+    if not quiz_ids:
+        return None
+
+    os.makedirs(archive.directory, exist_ok=True)
+    names = {kind: '%s-%s.%d.qzc' % (kind, month, generation) for kind in ('quizzes', 'answers')}
+    existing = {kind: archive.open_file(previous[kind]) if previous else None for kind in names}
+
+    quiz_rows = _stream(db.select(*[quiz_table.c[name] for name in QUIZ_FIELDS]).where(in_month)
+                        .order_by(quiz_table.c.user_id, quiz_table.c.completed_at, quiz_table.c.id))
+    if existing['quizzes']:
+        old = (row for rows in existing['quizzes'].iter_groups(QUIZ_FIELDS) for row in rows)
+        quiz_rows = _merge(old, quiz_rows, key=lambda row: (row[1], row[7], row[0]))
+    quiz_writer = ColumnarWriter(os.path.join(archive.directory, names['quizzes']), QUIZ_COLUMNS,
+                                 index=('user_id', 'id'))
+    min_id = max_id = None
+    try:
+        for row in quiz_rows:
+            quiz_writer.append(row)
+            min_id = row[0] if min_id is None else min(min_id, row[0])
+            max_id = row[0] if max_id is None else max(max_id, row[0])
+        quizzes_bytes = quiz_writer.close({'month': month})
+    except BaseException:
+        quiz_writer.abort()
+        raise
+
+    answer_rows = _stream(db.select(*[answer_table.c[name] for name in ANSWER_FIELDS])
+                          .join(quiz_table, answer_table.c.quiz_id == quiz_table.c.id).where(in_month)
+                          .order_by(answer_table.c.quiz_id, answer_table.c.id))
+    if existing['answers']:
+        old = (row for rows in existing['answers'].iter_groups(ANSWER_FIELDS) for row in rows)
+        answer_rows = _merge(old, answer_rows, key=lambda row: (row[1], row[0]))
+    answer_writer = ColumnarWriter(os.path.join(archive.directory, names['answers']), ANSWER_COLUMNS,
+                                   index=('quiz_id',))
+    # Per-question totals, so QuestionStats.rebuild need not read every archived answer
+    question_totals = {}
+    try:
+        for row in answer_rows:
+            answer_writer.append(row)
+            attempts, correct, total_time = question_totals.get(row[2], (0, 0, 0))
+            question_totals[row[2]] = (attempts + 1, correct + bool(row[4]), total_time + (row[5] or 0))
+        answers_bytes = answer_writer.close({'month': month, 'question_totals': question_totals})
+    except BaseException:
+        answer_writer.abort()
+        os.remove(os.path.join(archive.directory, names['quizzes']))
+        raise
+
+    entry = {
+        'quizzes': names['quizzes'],
+        'answers': names['answers'],
+        'quizzes_count': quiz_writer.rows,
+        'answers_count': answer_writer.rows,
+        'min_quiz_id': min_id,
+        'max_quiz_id': max_id,
+        'bytes': quizzes_bytes + answers_bytes,
+        'archived_at': datetime.utcnow().isoformat()
+    }
+    catalog['months'][month] = entry
+    catalog['generation'] = generation
+    _write_catalog(archive.directory, catalog)
+    archive.refresh(force=True)
+
+    # From here the archive serves the month; rows still live until deleted are shown once
+    _delete_quizzes(quiz_ids, batch_size)
+    if previous:
+        for kind in ('quizzes', 'answers'):
+            try:
+                os.remove(os.path.join(archive.directory, previous[kind]))
+            except FileNotFoundError:
+                pass
+    return entry
+
+
+def run_retention(archive, hot_months, abandoned_hours, batch_size=5000, now=None):
+    # Purge abandoned quizzes, then archive every month older than the newest hot_months
+    # (the current month counts as one). Returns a report of what changed
+    now = now or datetime.utcnow()
+    if hot_months < 1:
+        raise ValueError('RETENTION_HOT_MONTHS must be at least 1')
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            if any(sqlite_reuses_ids(conn, table_name) for table_name in AUTOINCREMENT_TABLES):
+                raise RuntimeError('Quiz tables would reuse archived IDs; run flask upgrade-db first')
+    purged, users = purge_abandoned(now - timedelta(hours=abandoned_hours), batch_size)
+
+    cutoff = add_months(month_start(now), 1 - hot_months)
+    oldest = db.session.query(db.func.min(Quiz.completed_at)).filter(Quiz.completed_at < cutoff).scalar()
+    db.session.commit()
+    months = {}
+    start = month_start(oldest) if oldest else cutoff
+    while start < cutoff:
+        entry = archive_month(archive, start, batch_size)
+        if entry:
+            months[start.strftime('%Y-%m')] = entry
+        start = add_months(start, 1)
+    return {'purged_quizzes': purged, 'rebuilt_users': users, 'cutoff': cutoff.isoformat(), 'archived': months}
@@ -0,0 +1,42 @@
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+
+class QuizServices:
+    # Per-app quiz state store, answer key and payload caches, answer buffer, instrumentation, rate limiter,
+    # question pool and selector, reference cache, quiz archive, password hasher, live rooms and static assets
+    def __init__(self, quiz_store, answer_keys, question_payloads, answer_buffer=None, instrumentation=None,
+                 rate_limiter=None):
+        self.quiz_store = quiz_store
+        self.answer_keys = answer_keys
+        self.question_payloads = question_payloads
+        self.answer_buffer = answer_buffer
+        self.instrumentation = instrumentation
+        self.rate_limiter = rate_limiter
+        self.question_pool = None
+        self.question_selector = None
+        self.reference_cache = None
+        self.quiz_archive = None
+        self.password_hasher = None
+        self.live_rooms = None
+        self.static_assets = None
+
+
+def get_services(app=None):
+    return (app or current_app).extensions['quiz']
+
+
+# Views use these like module globals; each resolves against the current app
+quiz_store = LocalProxy(lambda: get_services().quiz_store)
+answer_keys = LocalProxy(lambda: get_services().answer_keys)
+question_payloads = LocalProxy(lambda: get_services().question_payloads)
+answer_buffer = LocalProxy(lambda: get_services().answer_buffer)
+instrumentation = LocalProxy(lambda: get_services().instrumentation)
+rate_limiter = LocalProxy(lambda: get_services().rate_limiter)
+question_pool = LocalProxy(lambda: get_services().question_pool)
+question_selector = LocalProxy(lambda: get_services().question_selector)
+reference_cache = LocalProxy(lambda: get_services().reference_cache)
+quiz_archive = LocalProxy(lambda: get_services().quiz_archive)
+password_hasher = LocalProxy(lambda: get_services().password_hasher)
+live_rooms = LocalProxy(lambda: get_services().live_rooms)
+static_assets = LocalProxy(lambda: get_services().static_assets)
@@ -1,7 +1,10 @@
 // Cricket Quiz App JavaScript
 
 class QuizApp {
-    constructor() {
+    constructor(options = {}) {
+        // Prefetch mode loads every question of the quiz in one request
+        this.prefetch = options.prefetch !== false;
+        this.questions = null;
         this.currentQuestion = 0;
         this.score = 0;
         this.timeLeft = 60;
@@ -10,7 +13,30 @@ class QuizApp {
         this.startTime = Date.now();
     }
 
+    async prefetchQuestions() {
+        try {
+            const response = await fetch('/get_questions');
+            const data = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(data.error);
+            }
+            
+            this.questions = data.questions;
+        } catch (error) {
+            // Fall back to loading questions one at a time
+            console.error('Error prefetching questions:', error);
+            this.questions = null;
+        }
+    }
+
     async loadQuestion(questionNum) {
+        if (this.questions && this.questions[questionNum]) {
+            this.displayQuestion(this.questions[questionNum]);
+            this.startTimer();
+            return;
+        }
+        
         try {
             const response = await fetch(`/get_question/${questionNum}`);
             const question = await response.json();
@@ -27,6 +53,13 @@ class QuizApp {
         }
     }
 
+    async start() {
+        if (this.prefetch) {
+            await this.prefetchQuestions();
+        }
+        await this.loadQuestion(0);
+    }
+
     displayQuestion(question) {
         const container = document.getElementById('question-container');
         
@@ -277,6 +310,6 @@ function submitFillAnswer() {
 document.addEventListener('DOMContentLoaded', function() {
     if (document.getElementById('question-container')) {
         quizApp = new QuizApp();
-        quizApp.loadQuestion(0);
+        quizApp.start();
     }
 });
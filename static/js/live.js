@@ -0,0 +1,226 @@
+// Live quiz rooms: questions and leaderboards arrive over server-sent events
+
+class LiveQuiz {
+    constructor(roomId) {
+        this.roomId = roomId;
+        this.question = null;
+        this.answered = false;
+        this.myAnswer = null;
+        this.score = 0;
+        this.results = null;
+        this.timer = null;
+        this.clockOffset = 0;
+    }
+
+    async start() {
+        try {
+            const response = await fetch(`/live/${this.roomId}/join`, {method: 'POST'});
+            const data = await response.json();
+
+            if (!response.ok) {
+                throw new Error(data.error);
+            }
+
+            this.results = data.results;
+            this.connect(data.events);
+        } catch (error) {
+            console.error('Error joining room:', error);
+            this.setStatus(error.message || 'Could not join this room');
+        }
+    }
+
+    connect(url) {
+        // EventSource reconnects on its own; each connection starts with the room's current state
+        this.source = new EventSource(url);
+        this.source.addEventListener('room', event => this.onRoom(JSON.parse(event.data)));
+        this.source.addEventListener('question', event => this.onQuestion(JSON.parse(event.data)));
+        this.source.addEventListener('reveal', event => this.onReveal(JSON.parse(event.data)));
+        this.source.addEventListener('finished', event => this.onFinished(JSON.parse(event.data)));
+    }
+
+    onRoom(room) {
+        this.clockOffset = Date.now() / 1000 - room.now;
+        document.getElementById('live-players').textContent = `${room.players} players`;
+        if (room.phase === 'waiting') {
+            this.setStatus('Starting soon');
+            this.countdown(room.starts_at);
+        }
+    }
+
+    onQuestion(data) {
+        if (this.question && this.question.id === data.question.id) {
+            return;
+        }
+        this.question = data.question;
+        this.answered = false;
+        this.myAnswer = null;
+        this.setStatus(`Question ${data.question.number} of ${data.question.total}`);
+        this.displayQuestion(data.question);
+        this.countdown(data.ends_at);
+    }
+
+    onReveal(data) {
+        this.stopTimer();
+        if (this.question && this.question.id === data.question_id && this.myAnswer !== null) {
+            if (this.myAnswer.toLowerCase() === String(data.correct_answer).toLowerCase()) {
+                this.score++;
+            }
+        }
+        this.setStatus(`Your score: ${this.score}`);
+        this.disableOptions();
+        const container = document.getElementById('live-answer-options');
+        if (container) {
+            container.insertAdjacentHTML('beforeend', `
+                <div class="mt-6 p-4 rounded-lg bg-blue-50 border-l-4 border-blue-500">
+                    <p class="text-gray-700 mb-2"><strong>Correct answer:</strong> ${data.correct_answer}</p>
+                    ${data.explanation ? `<p class="text-gray-600"><strong>Explanation:</strong> ${data.explanation}</p>` : ''}
+                    <p class="text-sm text-gray-500 mt-2">${data.answered} of ${data.players} players answered</p>
+                </div>
+            `);
+        }
+        this.showLeaderboard(data.leaderboard, data.players);
+    }
+
+    onFinished(data) {
+        this.stopTimer();
+        this.source.close();
+        this.showLeaderboard(data.leaderboard, data.players);
+        this.setStatus('Finished');
+        document.getElementById('live-question').innerHTML = `
+            <div class="bg-white rounded-lg shadow-lg p-6 text-center">
+                <h3 class="text-2xl font-semibold text-gray-800 mb-4">Quiz over!</h3>
+                <a href="${this.results}" class="bg-green-600 text-white px-6 py-3 rounded-lg hover:bg-green-700 transition-colors">
+                    See your results
+                </a>
+            </div>
+        `;
+    }
+
+    displayQuestion(question) {
+        let html = `
+            <div class="question-card bg-white rounded-lg shadow-lg p-6 mb-6">
+                <h3 class="text-xl font-semibold text-gray-800 mb-6">${question.text}</h3>
+                <div id="live-answer-options" class="space-y-3">
+        `;
+
+        const options = question.type === 'mcq' ? question.options
+            : question.type === 'true_false' ? ['True', 'False'] : null;
+        if (options) {
+            options.forEach((option, index) => {
+                html += `
+                    <button class="option-button w-full text-left p-4 rounded-lg border-2 border-gray-200 hover:border-green-500 transition-all"
+                            data-answer="${String(option).replace(/"/g, '&quot;')}">
+                        <span class="font-medium">${String.fromCharCode(65 + index)}.</span> ${option}
+                    </button>
+                `;
+            });
+        } else {
+            html += `
+                <div class="space-y-4">
+                    <input type="text" id="live-fill-answer"
+                           class="w-full px-4 py-3 border-2 border-gray-300 rounded-lg focus:border-green-500 focus:outline-none"
+                           placeholder="Type your answer here...">
+                    <button id="live-fill-submit"
+                            class="bg-green-600 text-white px-6 py-3 rounded-lg hover:bg-green-700 transition-colors">
+                        Submit Answer
+                    </button>
+                </div>
+            `;
+        }
+
+        html += `
+                </div>
+            </div>
+        `;
+        document.getElementById('live-question').innerHTML = html;
+
+        document.querySelectorAll('#live-answer-options .option-button').forEach(button => {
+            button.addEventListener('click', () => {
+                button.classList.add('selected');
+                this.submitAnswer(button.dataset.answer);
+            });
+        });
+        const submit = document.getElementById('live-fill-submit');
+        if (submit) {
+            submit.addEventListener('click', () => {
+                const answer = document.getElementById('live-fill-answer').value.trim();
+                if (answer) {
+                    this.submitAnswer(answer);
+                }
+            });
+        }
+    }
+
+    async submitAnswer(answer) {
+        if (this.answered) {
+            return;
+        }
+        this.answered = true;
+        this.myAnswer = answer;
+        this.disableOptions();
+
+        try {
+            const response = await fetch(`/live/${this.roomId}/answer`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({question_id: this.question.id, answer: answer})
+            });
+            const result = await response.json();
+
+            if (!response.ok) {
+                this.myAnswer = null;
+                this.setStatus(result.error);
+            } else {
+                this.setStatus('Answer locked in');
+            }
+        } catch (error) {
+            console.error('Error submitting answer:', error);
+        }
+    }
+
+    disableOptions() {
+        document.querySelectorAll('#live-answer-options button, #live-answer-options input').forEach(el => {
+            el.disabled = true;
+            el.classList.remove('hover:border-green-500');
+        });
+    }
+
+    showLeaderboard(leaderboard, players) {
+        document.getElementById('live-players').textContent = `${players} players`;
+        document.getElementById('live-leaderboard').innerHTML = leaderboard.map((entry, index) => `
+            <li class="flex justify-between p-2 rounded ${index === 0 ? 'bg-yellow-100' : 'bg-gray-50'}">
+                <span>${index + 1}. ${entry.username}</span>
+                <span class="font-semibold">${entry.score}</span>
+            </li>
+        `).join('');
+    }
+
+    countdown(until) {
+        // Server times are converted with the offset measured on connect
+        this.stopTimer();
+        const timerEl = document.getElementById('live-timer');
+        const tick = () => {
+            const left = Math.max(0, Math.ceil(until + this.clockOffset - Date.now() / 1000));
+            timerEl.textContent = `${left}s`;
+            timerEl.classList.toggle('text-red-600', left <= 5);
+            if (left <= 0) {
+                this.stopTimer();
+            }
+        };
+        tick();
+        this.timer = setInterval(tick, 250);
+    }
+
+    stopTimer() {
+        if (this.timer) {
+            clearInterval(this.timer);
+            this.timer = null;
+        }
+    }
+
+    setStatus(text) {
+        document.getElementById('live-status').textContent = text;
+    }
+}
+
+let liveQuiz;
@@ -0,0 +1,302 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built
+    brotli = None
+
+BUILD_DIR = 'build'  # Under the static folder, so a front proxy can serve the same files
+MANIFEST = 'manifest.json'
+ASSET_TYPES = ('.css', '.js')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = ('br', 'gzip')  # In order of preference
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+_WORD = re.compile(r'[\w$]+')
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                   'yield', 'await', 'instanceof'}
+
+
+def minify_css(source):
+    # Drops comments and collapses whitespace; strings are kept as written
+    parts = []
+    for i, part in enumerate(_CSS_TOKENS.split(source)):
+        if i % 2:
+            if not part.startswith('/*'):
+                parts.append(part)
+            continue
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r' ?([{};,>]) ?', r'\1', part)
+        parts.append(part.replace(': ', ':'))
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def _is_word(char):
+    return char.isalnum() or char in '_$'
+
+
+def minify_js(source):
+    # Drops comments and indentation and collapses whitespace. Strings, template literals and
+    # regex literals are copied as written, and line breaks are kept so semicolon insertion is unchanged
+    out = []
+    pending = ''  # Whitespace since the last token: '', ' ' or '\n'
+    last = ''  # Last character emitted
+    last_word = ''
+    depth = 0  # Brace depth, to find the end of ${...} in template literals
+    templates = []  # Brace depth at which each open template expression started
+    i, n = 0, len(source)
+
+    def emit(token):
+        nonlocal pending, last
+        if pending and out:
+            if pending == '\n':
+                out.append('\n')
+            elif (_is_word(last) and _is_word(token[0])) or (last == token[0] and last in '+-/'):
+                out.append(' ')
+        pending = ''
+        out.append(token)
+        last = token[-1]
+
+    def template(start):
+        # Template text from start up to its closing backtick or the next ${
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+            elif source[j] == '`':
+                return j + 1, False
+            elif source.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        raise ValueError('Unterminated template literal')
+
+    while i < n:
+        char = source[i]
+        if char.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            if '\n' in source[i:j] or pending == '\n':
+                pending = '\n'
+            else:
+                pending = ' '
+            i = j
+        elif source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j < 0 else j
+        elif source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            if j < 0:
+                raise ValueError('Unterminated comment')
+            if '\n' in source[i:j] or pending == '\n':
+                pending = '\n'
+            elif not pending:
+                pending = ' '
+            i = j + 2
+        elif char in '\'"':
+            j = i + 1
+            while j < n and source[j] != char:
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            last_word = ''
+            i = j + 1
+        elif char == '`' or (char == '}' and templates and templates[-1] == depth):
+            if char == '}':
+                templates.pop()
+            j, opened = template(i + 1)
+            emit(source[i:j])
+            if opened:
+                templates.append(depth)
+            last_word = ''
+            i = j
+        elif char == '/' and (not last or last in _REGEX_AFTER or last_word in _REGEX_KEYWORDS):
+            j, in_class = i + 1, False
+            while j < n and (source[j] != '/' or in_class):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and source[j].isalpha():
+                j += 1
+            emit(source[i:j])
+            last_word = ''
+            i = j
+        elif _is_word(char):
+            match = _WORD.match(source, i)
+            emit(match.group())
+            last_word = match.group()
+            i = match.end()
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            emit(char)
+            last_word = ''
+            i += 1
+    return ''.join(out)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _sources(static_folder):
+    # Relative paths of the CSS and JS files to build, skipping earlier builds
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(os.path.join(static_folder, BUILD_DIR)):
+            dirs[:] = []
+            continue
+        for name in sorted(files):
+            if name.endswith(ASSET_TYPES):
+                yield os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/')
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _write(path, data):
+    # Atomic, so concurrently starting workers never serve a half-written file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder, write=True):
+    # Minify, fingerprint and precompress every CSS/JS file; returns the manifest and the built bytes
+    manifest = {}
+    built = {}
+    for filename in _sources(static_folder):
+        source_path = os.path.join(static_folder, filename)
+        with open(source_path, encoding='utf-8') as f:
+            text = f.read()
+        stem, ext = os.path.splitext(filename)
+        body = MINIFIERS[ext](text).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        hashed = '%s/%s.%s%s' % (BUILD_DIR, stem, digest, ext)
+
+        variants = {'identity': body}
+        compressed = {'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            # Tiny files can grow when compressed
+            if len(data) < len(body):
+                variants[encoding] = data
+
+        manifest[filename] = {
+            'path': hashed,
+            'source': _signature(source_path),
+            'sizes': {'original': len(text.encode('utf-8')),
+                      **{encoding: len(data) for encoding, data in variants.items()}}
+        }
+        built[hashed] = variants
+        if write:
+            for encoding, data in variants.items():
+                suffix = {'identity': '', 'gzip': '.gz', 'br': '.br'}[encoding]
+                _write(os.path.join(static_folder, hashed + suffix), data)
+
+    if write:
+        _write(os.path.join(static_folder, BUILD_DIR, MANIFEST), json.dumps(manifest, indent=2).encode())
+    return manifest, built
+
+
+class StaticAssets:
+    # Serves fingerprinted, precompressed CSS/JS; url_for('static', ...) emits the hashed names
+    def __init__(self, app):
+        self.app = app
+        self.static_folder = app.static_folder
+        self.manifest, self._built = self._load()
+        self._paths = {filename: entry['path'] for filename, entry in self.manifest.items()}
+        self._mimetypes = {hashed: mimetypes.guess_type(hashed)[0] for hashed in self._built}
+        self.served = dict.fromkeys(('identity',) + ENCODINGS, 0)
+        self.bytes_served = 0
+
+        self._send_static_file = app.view_functions['static']
+        app.view_functions['static'] = self.send
+        app.url_defaults(self._hashed_url)
+
+    def _load(self):
+        # The manifest from an earlier build, or a fresh build if any source has changed since
+        manifest_path = os.path.join(self.static_folder, BUILD_DIR, MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            fresh = sorted(manifest) == sorted(_sources(self.static_folder)) and all(
+                entry['source'] == _signature(os.path.join(self.static_folder, filename))
+                for filename, entry in manifest.items())
+            if fresh:
+                return manifest, self._read(manifest)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            return build_assets(self.static_folder)
+        except OSError:
+            # A read-only deploy still gets minified, hashed assets, served from memory
+            self.app.logger.warning('Could not write built static assets', exc_info=True)
+            return build_assets(self.static_folder, write=False)
+
+    def _read(self, manifest):
+        built = {}
+        for entry in manifest.values():
+            variants = built[entry['path']] = {}
+            for encoding, suffix in (('identity', ''), ('gzip', '.gz'), ('br', '.br')):
+                if encoding in entry['sizes']:
+                    with open(os.path.join(self.static_folder, entry['path'] + suffix), 'rb') as f:
+                        variants[encoding] = f.read()
+        return built
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static':
+            hashed = self._paths.get(values.get('filename'))
+            if hashed:
+                values['filename'] = hashed
+
+    def send(self, filename):
+        variants = self._built.get(filename)
+        if variants is None:
+            return self._send_static_file(filename=filename)
+
+        encoding = 'identity'
+        for candidate in ENCODINGS:
+            if candidate in variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        body = variants[encoding]
+
+        response = self.app.response_class(body, mimetype=self._mimetypes[filename])
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.headers['Vary'] = 'Accept-Encoding'
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag('%s-%s' % (filename.rsplit('.', 2)[-2], encoding))
+        response = response.make_conditional(request)
+        self.served[encoding] += 1
+        if response.status_code == 200:
+            self.bytes_served += len(body)
+        return response
+
+    def get_stats(self):
+        return {
+            'assets': {filename: dict(entry['sizes'], path=entry['path']) for filename, entry in self.manifest.items()},
+            'brotli': brotli is not None,
+            'served': dict(self.served),
+            'bytes_served': self.bytes_served
+        }
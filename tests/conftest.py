@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# config.py reads the environment when first imported, so the throwaway database is chosen before any app import
+TMP_DIR = tempfile.mkdtemp(prefix='quiz-tests-')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(TMP_DIR, 'quiz.db'),
+    'QUIZ_STORE_PATH': os.path.join(TMP_DIR, 'quiz_state.db'),
+    'ARCHIVE_DIR': os.path.join(TMP_DIR, 'archive'),
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'PASSWORD_HASH_WORKERS': '0',
+    'RATE_LIMIT_ENABLED': 'false',
+    'STATIC_ASSETS_ENABLED': 'false',
+    'QUESTION_PAYLOAD_WARM_BUCKETS': '0',
+})
+
+# Small enough to seed in a second; 20 questions per (category, difficulty) bucket keeps every bucket playable
+SEED_USERS = 3
+SEED_QUESTIONS = 360
+SEED_QUIZZES = 60
+
+
+@pytest.fixture(scope='session')
+def seeded_database():
+    from benchmarks.seed import seed
+    seed(SEED_USERS, SEED_QUESTIONS, SEED_QUIZZES, log=lambda message: None)
+    yield os.environ['DATABASE_URL']
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def app(seeded_database):
+    from factory import create_app
+    return create_app(TESTING=True)
+
+
+@pytest.fixture
+def database_copy(seeded_database, tmp_path):
+    # A private copy of the seeded database for tests that rewrite history
+    path = tmp_path / 'quiz.db'
+    shutil.copy(seeded_database[len('sqlite:///'):], path)
+    return 'sqlite:///{}'.format(path)
+
+
+@pytest.fixture
+def private_app(database_copy, tmp_path):
+    from factory import create_app
+    return create_app(TESTING=True, SQLALCHEMY_DATABASE_URI=database_copy, ARCHIVE_DIR=str(tmp_path / 'archive'),
+                      QUIZ_STORE_PATH=str(tmp_path / 'quiz_state.db'))
+
+
+def _login(client, app, username='bench_user_0'):
+    from models import User
+    with app.app_context():
+        user = User.query.filter_by(username=username).one()
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+        session['username'] = user.username
+    return user.id
+
+
+@pytest.fixture
+def login():
+    # login(client, app) signs a test client in as a seeded user and returns the user ID
+    return _login
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.user_id = _login(client, app)
+    return client
@@ -0,0 +1,91 @@
+import pytest
+
+from answer_buffer import AnswerBuffer
+from models import db, Quiz, QuizAnswer
+
+
+def queue_answers(buffer, quiz, question_ids):
+    due = False
+    for question_id in question_ids:
+        due = buffer.queue(quiz.id, quiz.user_id, question_id, 'Option A', True, 5, quiz.score + 1)
+    return due
+
+
+@pytest.fixture
+def buffer(private_app):
+    # Not started: flushes happen only when the test calls them
+    return AnswerBuffer(private_app, max_size=3, interval=60)
+
+
+def test_queue_reports_a_full_batch_without_writing(private_app, buffer):
+    with private_app.app_context():
+        quiz = Quiz.query.first()
+        stored = QuizAnswer.query.count()
+        assert not queue_answers(buffer, quiz, [1, 2])
+        assert queue_answers(buffer, quiz, [3])
+        assert QuizAnswer.query.count() == stored
+        assert buffer.get_stats()['queue_depth'] == 3
+
+        assert buffer.flush() == 3
+        assert QuizAnswer.query.count() == stored + 3
+
+
+def test_failed_flush_requeues_even_if_rollback_fails(private_app, buffer, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('connection lost')
+
+    with private_app.app_context():
+        quiz = Quiz.query.first()
+        queue_answers(buffer, quiz, [1, 2])
+        monkeypatch.setattr(buffer, '_write', fail)
+        monkeypatch.setattr(db.session, 'rollback', fail)
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        assert buffer.get_stats()['queue_depth'] == 2
+
+
+def test_rejected_answers_are_dead_lettered(private_app, buffer):
+    with private_app.app_context():
+        quiz = Quiz.query.first()
+        stored = QuizAnswer.query.count()
+        queue_answers(buffer, quiz, [1])
+        buffer.queue(None, quiz.user_id, 2, 'Option A', False, 5, quiz.score)  # violates NOT NULL
+        queue_answers(buffer, quiz, [3])
+        assert buffer.flush() == 2
+        assert QuizAnswer.query.count() == stored + 2
+
+        stats = buffer.get_stats()
+        assert stats['dropped'] == 1
+        assert stats['dead_letters'][0]['quiz_id'] is None
+        assert buffer.flush() == 0
+
+
+def test_answers_flushed_after_the_finish_reach_rollups_and_seen_set(private_app, buffer):
+    from models import ReportRollup, UserSeenQuestions, Question
+    from quiz_actions import complete_quiz
+
+    def rollups():
+        return sorted((row.dimension, row.key, row.quiz_count, row.score_sum, row.best_score)
+                      for row in ReportRollup.query.all())
+
+    with private_app.app_context():
+        user_id = Quiz.query.first().user_id
+        question_ids = [row.id for row in Question.query.filter_by(category_id=1, difficulty='easy').limit(2)]
+        quiz = Quiz(user_id=user_id, category_id=1, difficulty='easy', score=0, total_questions=10)
+        db.session.add(quiz)
+        db.session.commit()
+        quiz_id = quiz.id
+
+        # Still queued in another worker's buffer when this worker finishes the quiz
+        buffer.queue(quiz_id, user_id, question_ids[0], 'Option A', True, 5, 1)
+        buffer.queue(quiz_id, user_id, question_ids[1], 'Option A', False, 5, 1)
+        complete_quiz(db.session, quiz_id, 30)
+        db.session.commit()
+        assert buffer.flush() == 2
+
+        assert db.session.get(Quiz, quiz_id).score == 1
+        assert set(question_ids) <= set(UserSeenQuestions.ids_for(user_id))
+        live = rollups()
+        ReportRollup.rebuild()
+        db.session.commit()
+        assert rollups() == live
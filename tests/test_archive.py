@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from models import db, Category, Quiz
+from query_budget import count_queries
+from retention import archive_month
+from services import quiz_archive
+
+
+def test_profile_and_results_with_archived_only_category(private_app, login):
+    client = private_app.test_client()
+    user_id = login(client, private_app)
+    with private_app.app_context():
+        quiz = Quiz.query.filter_by(user_id=user_id).filter(Quiz.time_taken.isnot(None)).first()
+        quiz_id, category_id = quiz.id, quiz.category_id
+        category_name = db.session.get(Category, category_id).name
+        # Every quiz of the user in this category moves to an archived month
+        Quiz.query.filter_by(user_id=user_id, category_id=category_id)\
+                  .update({Quiz.completed_at: datetime(2020, 1, 15)})
+        db.session.commit()
+        assert archive_month(quiz_archive, datetime(2020, 1, 1))
+        assert not Quiz.query.filter_by(user_id=user_id, category_id=category_id).count()
+
+    response = client.get('/profile')
+    assert response.status_code == 200
+    assert category_name.encode() in response.data
+
+    with private_app.app_context(), count_queries() as counter:
+        response = client.get('/results/{}'.format(quiz_id))
+    assert response.status_code == 200
+    assert counter.count <= private_app.view_functions['quiz.results'].max_queries
+
+
+def test_history_with_archived_quiz_of_deleted_category(private_app, login):
+    client = private_app.test_client()
+    user_id = login(client, private_app)
+    with private_app.app_context():
+        quiz = Quiz.query.filter_by(user_id=user_id).filter(Quiz.time_taken.isnot(None)).first()
+        quiz_id = quiz.id
+        category = Category(name='Retired category', sport_id=quiz.category.sport_id)
+        db.session.add(category)
+        db.session.flush()
+        quiz.category_id = category.id
+        quiz.completed_at = datetime(2020, 1, 15)
+        db.session.commit()
+        assert archive_month(quiz_archive, datetime(2020, 1, 1))
+        # Only the archive still refers to the category once it is deleted
+        db.session.delete(category)
+        db.session.commit()
+
+    response = client.get('/quiz_history?limit=100')
+    assert response.status_code == 200
+    archived = [item for item in response.get_json()['quizzes'] if item['id'] == quiz_id]
+    assert archived and archived[0]['category'] is None
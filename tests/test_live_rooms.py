@@ -0,0 +1,68 @@
+import threading
+
+from models import db, Question, Quiz, UserStats
+from services import get_services
+
+
+def test_concurrent_joins_create_one_quiz(private_app, login):
+    clients = [private_app.test_client() for _ in range(6)]
+    user_id = [login(client, private_app) for client in clients][0]
+    with private_app.app_context():
+        question_ids = [row.id for row in Question.query.filter_by(category_id=1, difficulty='easy').limit(3)]
+        room = get_services(private_app).live_rooms.create(1, 'easy', question_ids, starts_in=3600)
+        quizzes = Quiz.query.filter_by(user_id=user_id).count()
+        started = db.session.get(UserStats, user_id).total_quizzes
+
+    barrier = threading.Barrier(len(clients))
+    responses = []
+
+    def join(client):
+        barrier.wait()
+        responses.append(client.post('/live/{}/join'.format(room.room_id)).get_json())
+
+    threads = [threading.Thread(target=join, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({response['quiz_id'] for response in responses}) == 1
+    with private_app.app_context():
+        assert Quiz.query.filter_by(user_id=user_id).count() == quizzes + 1
+        assert db.session.get(UserStats, user_id).total_quizzes == started + 1
+
+
+def test_admin_live_room_settings_are_validated(private_app):
+    client = private_app.test_client()
+    with client.session_transaction() as session:
+        session['admin'] = True
+
+    for settings in ({'questions': 'ten'}, {'questions': 0}, {'starts_in': -5}, {'question_seconds': 'soon'},
+                     {'reveal_seconds': 'nan'}, {'question_seconds': 3600}):
+        response = client.post('/admin/live_rooms', json=dict(settings, category_id=1, difficulty='easy'))
+        assert response.status_code == 400, settings
+
+    response = client.post('/admin/live_rooms', json={'category_id': 1, 'difficulty': 'easy', 'questions': '3',
+                                                      'starts_in': '30', 'question_seconds': 15})
+    assert response.status_code == 200
+    room = response.get_json()
+    assert len(get_services(private_app).live_rooms.get(room['room_id']).question_ids) == 3
+
+
+def test_answer_to_a_deleted_question_is_wrong(private_app, login):
+    client = private_app.test_client()
+    user_id = login(client, private_app)
+    live_rooms = get_services(private_app).live_rooms
+    with private_app.app_context():
+        question_ids = [row.id for row in Question.query.filter_by(category_id=1, difficulty='easy').limit(3)]
+        room = live_rooms.create(1, 'easy', question_ids, starts_in=3600)
+    assert client.post('/live/{}/join'.format(room.room_id)).status_code == 200
+
+    # The key is gone from the cache and the database, as after a delete in another worker
+    room.phase, room.current, room.question_started = 'question', 0, 0
+    live_rooms.answer_keys.invalidate()
+    with private_app.app_context():
+        db.session.execute(db.delete(Question).where(Question.id == question_ids[0]))
+        db.session.commit()
+        assert live_rooms.answer(room, user_id, question_ids[0], 'anything') is None
+    assert room.players[user_id]['score'] == 0
@@ -0,0 +1,33 @@
+from models import Quiz
+from query_budget import count_queries
+from services import get_services
+
+
+def count_request_queries(app, client, url, endpoint):
+    # Every statement of the request, checked against the budget the view itself declares
+    with app.app_context(), count_queries() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    budget = app.view_functions[endpoint].max_queries
+    assert counter.count <= budget, '{} issued {} queries (budget {}):\n{}'.format(
+        url, counter.count, budget, '\n'.join(counter.statements))
+    return counter.count
+
+
+def test_index_query_budget(app, client):
+    # Worst case: a fresh worker also loads sports and categories
+    get_services(app).reference_cache.version = None
+    cold = count_request_queries(app, client, '/', 'quiz.index')
+    warm = count_request_queries(app, client, '/', 'quiz.index')
+    assert warm < cold
+
+
+def test_profile_query_budget(app, client):
+    count_request_queries(app, client, '/profile', 'quiz.profile')
+
+
+def test_results_query_budget(app, client):
+    with app.app_context():
+        quiz = Quiz.query.filter_by(user_id=client.user_id).first()
+        assert quiz.total_questions > 1
+    count_request_queries(app, client, '/results/{}'.format(quiz.id), 'quiz.results')
@@ -0,0 +1,35 @@
+from sqlalchemy import text
+
+from models import db
+from query_plans import check_query_plans
+
+# Index each hot query shape must be planned through on the seeded database
+EXPECTED_INDEXES = {
+    'start_quiz question pool': 'ix_question_category_difficulty',
+    'index/profile quiz history': 'ix_quiz_user_completed',
+    'results answers': 'ix_quiz_answer_quiz',
+    'profile category stats': 'ix_quiz_user_completed',
+    'report quizzes per category': 'ix_quiz_category',
+}
+
+
+def test_hot_queries_use_their_indexes(app):
+    with app.app_context():
+        results = check_query_plans()
+
+    assert sorted(name for name, ok, details in results) == sorted(EXPECTED_INDEXES)
+    for name, ok, details in results:
+        assert ok, '{} scans: {}'.format(name, details)
+        assert any('INDEX {} '.format(EXPECTED_INDEXES[name]) in detail for detail in details), \
+            '{} planned without {}: {}'.format(name, EXPECTED_INDEXES[name], details)
+
+
+def test_missing_index_fails_the_check(private_app):
+    with private_app.app_context():
+        db.session.execute(text('DROP INDEX ix_quiz_answer_quiz'))
+        db.session.commit()
+        results = {name: (ok, details) for name, ok, details in check_query_plans()}
+
+    ok, details = results['results answers']
+    assert not ok
+    assert [detail for detail in details if detail.startswith('SCAN quiz_answer')]
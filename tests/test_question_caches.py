@@ -0,0 +1,82 @@
+from grading import regrade_answers
+from models import db, Question
+from services import get_services
+
+
+def test_question_edits_reach_every_worker(private_app, database_copy, tmp_path):
+    # Two apps on one database stand in for two worker processes
+    from factory import create_app
+    worker = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI=database_copy, QUESTION_CACHE_CHECK_INTERVAL=0,
+                        ARCHIVE_DIR=str(tmp_path / 'archive'), QUIZ_STORE_PATH=str(tmp_path / 'worker_state.db'))
+    services = get_services(worker)
+
+    with worker.app_context():
+        question_id = Question.query.filter_by(question_type='fill_blank').first().id
+        services.answer_keys.get(question_id)
+        services.question_payloads.get(question_id)
+
+    with private_app.app_context():
+        question = db.session.get(Question, question_id)
+        question.text = 'Edited question?'
+        question.correct_answer = 'Edited answer'
+        db.session.commit()
+
+    with worker.app_context():
+        assert services.answer_keys.get(question_id).correct_answer == 'Edited answer'
+        assert b'Edited question?' in services.question_payloads.get(question_id).tail
+
+    # Keys fixed with plain SQL reach the workers once the answers are regraded
+    with private_app.app_context():
+        db.session.execute(db.update(Question).where(Question.id == question_id).values(correct_answer='Fixed'))
+        db.session.commit()
+        regrade_answers([question_id])
+
+    with worker.app_context():
+        assert services.answer_keys.get(question_id).correct_answer == 'Fixed'
+
+
+def test_rebucketed_questions_reach_the_question_pool(private_app, database_copy, tmp_path):
+    from cache_versions import QUESTIONS_VERSION
+    from factory import create_app
+    from item_analysis import apply_rebucket
+    from models import CacheVersion
+    worker = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI=database_copy, QUESTION_CACHE_CHECK_INTERVAL=0,
+                        ARCHIVE_DIR=str(tmp_path / 'archive'), QUIZ_STORE_PATH=str(tmp_path / 'worker_state.db'))
+    question_pool = get_services(worker).question_pool
+
+    with worker.app_context():
+        easy = list(question_pool.get_ids(1, 'easy'))
+
+    # An ORM edit elsewhere is not invalidated locally; the pool notices the version bump
+    with private_app.app_context():
+        db.session.get(Question, easy[0]).difficulty = 'medium'
+        db.session.commit()
+    with worker.app_context():
+        assert easy[0] not in question_pool.get_ids(1, 'easy')
+        assert easy[0] in question_pool.get_ids(1, 'medium')
+
+    with private_app.app_context():
+        version = db.session.get(CacheVersion, QUESTIONS_VERSION).version
+        apply_rebucket([(easy[1], 'easy', 'hard')])
+        db.session.commit()
+        assert db.session.get(CacheVersion, QUESTIONS_VERSION).version == version + 1
+
+
+def test_imported_questions_reach_the_question_pool(private_app, database_copy, tmp_path):
+    from factory import create_app
+    from question_import import import_questions
+    worker = create_app(TESTING=True, SQLALCHEMY_DATABASE_URI=database_copy, QUESTION_CACHE_CHECK_INTERVAL=0,
+                        ARCHIVE_DIR=str(tmp_path / 'archive'), QUIZ_STORE_PATH=str(tmp_path / 'worker_state.db'))
+    question_pool = get_services(worker).question_pool
+
+    with worker.app_context():
+        easy = set(question_pool.get_ids(1, 'easy'))
+
+    with private_app.app_context():
+        report = import_questions([(1, {'text': 'Imported question?', 'type': 'true_false', 'difficulty': 'easy',
+                                        'correct_answer': 'True', 'category_id': '1'})])
+        assert report.imported == 1
+        question_id = Question.query.filter_by(text='Imported question?').one().id
+
+    with worker.app_context():
+        assert set(question_pool.get_ids(1, 'easy')) == easy | {question_id}
@@ -0,0 +1,53 @@
+from models import db, QuestionStats, UserSeenQuestions
+
+
+def stats_rows():
+    return sorted((row.question_id, row.attempts, row.correct, row.total_time) for row in QuestionStats.query.all())
+
+
+def seen_sets():
+    return {row.user_id: list(row.get_ids()) for row in UserSeenQuestions.query.all()}
+
+
+def test_incremental_question_stats_match_rebuild(private_app):
+    with private_app.app_context():
+        QuestionStats.rebuild()
+        db.session.commit()
+        expected = stats_rows()
+        QuestionStats.query.delete()
+
+        # The first batch inserts every row and the second adds to them
+        halves = ({}, {})
+        for question_id, attempts, correct, total_time in expected:
+            halves[0][question_id] = (1, min(correct, 1), 1)
+            halves[1][question_id] = (attempts - 1, correct - min(correct, 1), total_time - 1)
+        QuestionStats.record_answers(halves[0])
+        QuestionStats.record_answers(halves[1])
+        db.session.commit()
+
+        assert stats_rows() == expected
+
+
+def play(client, answers, finish=True):
+    response = client.post('/start_quiz', json={'category_id': 1, 'difficulty': 'easy'})
+    assert response.status_code == 200
+    question_ids = client.get('/get_questions').get_json()['questions']
+    for question in question_ids[:answers]:
+        assert client.post('/submit_answer', json={'question_id': question['id'], 'answer': 'x'}).status_code == 200
+    if finish:
+        assert client.post('/finish_quiz', json={'total_time': 30}).status_code == 200
+    return [question['id'] for question in question_ids[:answers]]
+
+
+def test_seen_sets_match_rebuild(private_app, login):
+    client = private_app.test_client()
+    user_id = login(client, private_app)
+    answered = play(client, answers=6)
+    play(client, answers=2, finish=False)
+
+    with private_app.app_context():
+        seen = seen_sets()
+        assert set(answered) <= set(seen[user_id])
+        UserSeenQuestions.rebuild()
+        db.session.commit()
+        assert seen_sets() == seen
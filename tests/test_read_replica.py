@@ -0,0 +1,30 @@
+import pytest
+
+from models import Quiz
+from query_budget import count_queries
+from services import get_services
+
+
+@pytest.fixture
+def replica_app(database_copy, tmp_path):
+    # The copy doubles as its own replica, so @read_replica views really route their reads
+    from factory import create_app
+    return create_app(TESTING=True, SQLALCHEMY_DATABASE_URI=database_copy, DATABASE_REPLICA_URL=database_copy,
+                      ARCHIVE_DIR=str(tmp_path / 'archive'), QUIZ_STORE_PATH=str(tmp_path / 'quiz_state.db'),
+                      ANSWER_BUFFER_ENABLED=True, ANSWER_BUFFER_INTERVAL=3600)
+
+
+def test_replica_views_only_read(replica_app, login):
+    client = replica_app.test_client()
+    user_id = login(client, replica_app)
+    with replica_app.app_context():
+        quiz = Quiz.query.filter_by(user_id=user_id).first()
+        # A pending buffered answer must not be flushed by a replica-routed view
+        get_services(replica_app).answer_buffer.queue(quiz.id, user_id, 1, 'Option A', True, 5, quiz.score + 1)
+
+    for url in ['/', '/profile', '/quiz_history', '/results/{}'.format(quiz.id)]:
+        with replica_app.app_context(), count_queries() as counter:
+            response = client.get(url)
+        assert response.status_code == 200
+        writes = [statement for statement in counter.statements if not statement.lstrip().upper().startswith('SELECT')]
+        assert not writes, '{} wrote: {}'.format(url, writes)
@@ -0,0 +1,50 @@
+from models import db, Quiz, ReportRollup
+
+
+def rollup_rows():
+    return sorted((row.dimension, row.key, row.quiz_count, row.score_sum, row.best_score)
+                  for row in ReportRollup.query.all())
+
+
+def test_incremental_rollups_match_rebuild(private_app):
+    with private_app.app_context():
+        ReportRollup.rebuild()
+        db.session.commit()
+        expected = rollup_rows()
+
+        # Every key is created by the first fold and added to by the later ones
+        ReportRollup.query.delete()
+        quizzes = Quiz.query.filter(Quiz.time_taken.isnot(None)).order_by(Quiz.id).all()
+        half = len(quizzes) // 2
+        ReportRollup.record_quizzes(quizzes[:half])
+        for quiz in quizzes[half:half + 5]:
+            ReportRollup.record_quiz(quiz, quiz.category.sport_id)
+        ReportRollup.record_quizzes(quizzes[half + 5:])
+        db.session.commit()
+
+        assert rollup_rows() == expected
+
+
+def test_regrade_updates_report_totals(private_app):
+    from grading import regrade_answers
+    from models import Question, QuizAnswer
+    with private_app.app_context():
+        ReportRollup.rebuild()
+        db.session.commit()
+        answer = QuizAnswer.query.join(Quiz).filter(
+            Quiz.time_taken.isnot(None), QuizAnswer.is_correct.is_(True)
+        ).first()
+        category_key = str(db.session.get(Quiz, answer.quiz_id).category_id)
+        before = db.session.get(ReportRollup, ('category', category_key)).score_sum
+
+        # A key fixed with plain SQL turns the stored correct answers wrong
+        db.session.execute(db.update(Question).where(Question.id == answer.question_id)
+                           .values(correct_answer='No such answer'))
+        db.session.commit()
+        regrade_answers([answer.question_id])
+
+        assert db.session.get(ReportRollup, ('category', category_key)).score_sum < before
+        expected = rollup_rows()
+        ReportRollup.rebuild()
+        db.session.commit()
+        assert rollup_rows() == expected
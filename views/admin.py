@@ -0,0 +1,337 @@
+from flask import Blueprint, current_app, render_template, request, jsonify, session, redirect, url_for, flash, Response, stream_with_context
+
+from models import db, Question, Quiz, User, ReportRollup
+from cache_versions import QUESTIONS_VERSION, bump_version
+from db_routing import read_replica, replica_health, pool_stats, read_engine, REPLICA_BIND
+from services import answer_keys, question_payloads, answer_buffer, instrumentation, live_rooms, rate_limiter, static_assets
+from services import question_pool, question_selector, reference_cache, quiz_archive, password_hasher
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Accepted live room settings: field -> (parser, minimum, maximum)
+LIVE_ROOM_FIELDS = {
+    'questions': (int, 1, 50),
+    'starts_in': (float, 0, 86400),
+    'question_seconds': (float, 1, 600),
+    'reveal_seconds': (float, 1, 600)
+}
+
+@bp.route('')
+def login():
+    if session.get('admin'):
+        return redirect(url_for('admin.dashboard'))
+    return render_template('admin/login.html')
+
+@bp.route('/login', methods=['POST'])
+def authenticate():
+    username = request.form.get('username')
+    password = request.form.get('password')
+    
+    # if username == current_app.config['ADMIN_USERNAME'] and check_password_hash(current_app.config['ADMIN_PASSWORD_HASH'], password):
+    if username == current_app.config['ADMIN_USERNAME'] and password == current_app.config['ADMIN_PASSWORD_HASH']:
+        session['admin'] = True
+        return redirect(url_for('admin.dashboard'))
+    
+    flash('Invalid credentials')
+    return redirect(url_for('admin.login'))
+
+@bp.route('/dashboard')
+def dashboard():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    categories = reference_cache.get_categories()
+    questions_count = Question.query.count()
+    quizzes_count = Quiz.query.count() + quiz_archive.quiz_count()
+    question_counts = dict(db.session.query(Question.category_id, db.func.count(Question.id))
+                                     .group_by(Question.category_id).all())
+    
+    return render_template('admin/dashboard.html', 
+                         categories=categories,
+                         question_counts=question_counts,
+                         questions_count=questions_count,
+                         quizzes_count=quizzes_count)
+
+@bp.route('/add_question')
+def add_question():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    categories = reference_cache.get_categories()
+    return render_template('admin/add_question.html', categories=categories)
+
+@bp.route('/save_question', methods=['POST'])
+def save_question():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    data = request.get_json()
+    
+    question = Question(
+        text=data['text'],
+        question_type=data['type'],
+        difficulty=data['difficulty'],
+        correct_answer=data['correct_answer'],
+        explanation=data.get('explanation', ''),
+        category_id=data['category_id']
+    )
+    
+    if data['type'] == 'mcq':
+        question.set_options(data['options'])
+    
+    if data['type'] == 'fill_blank' and data.get('accepted_answers'):
+        question.set_accepted_answers(data['accepted_answers'])
+    
+    db.session.add(question)
+    # Other workers' question pools only pick up the new question from the shared questions version
+    bump_version(db.session, QUESTIONS_VERSION)
+    db.session.commit()
+    question_pool.add(question)
+    answer_keys.put(question)
+    question_payloads.put(question)
+    
+    return jsonify({'success': True})
+
+@bp.route('/import_questions', methods=['POST'])
+def import_questions():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    fmt = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Unsupported format, use csv or jsonl'}), 400
+    
+    from question_import import import_file
+    report = import_file(upload.stream, fmt, current_app.config['IMPORT_CHUNK_SIZE'])
+    question_pool.invalidate()
+    
+    return jsonify(dict(report.to_dict(), success=True))
+
+@bp.route('/question_pool')
+def question_pool_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    return jsonify(dict(question_pool.get_stats(), selector=question_selector.get_stats(),
+                        payloads=question_payloads.get_stats()))
+
+@bp.route('/answer_buffer')
+def answer_buffer_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    if not answer_buffer:
+        return jsonify({'enabled': False})
+    return jsonify(dict(answer_buffer.get_stats(), enabled=True))
+
+@bp.route('/password_hasher')
+def password_hasher_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    return jsonify(password_hasher.get_stats())
+
+@bp.route('/rate_limits')
+def rate_limit_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    if not rate_limiter:
+        return jsonify({'enabled': False})
+    return jsonify(dict(rate_limiter.get_stats(), enabled=True))
+
+@bp.route('/static_assets')
+def static_asset_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    if not static_assets:
+        return jsonify({'enabled': False})
+    return jsonify(dict(static_assets.get_stats(), enabled=True))
+
+@bp.route('/retention')
+def retention_stats():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    live_quizzes, oldest = db.session.query(db.func.count(Quiz.id), db.func.min(Quiz.completed_at)).one()
+    return jsonify({
+        'hot_months': current_app.config['RETENTION_HOT_MONTHS'],
+        'live_quizzes': live_quizzes,
+        'oldest_live_quiz': oldest.isoformat() if oldest else None,
+        'archive': quiz_archive.get_stats()
+    })
+
+@bp.route('/analytics')
+def analytics():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    # Item statistics over every answer, live and archived; recomputed at most every ITEM_ANALYSIS_CACHE_SECONDS
+    from item_analysis import analysis_cache
+    config = current_app.config
+    analysis = analysis_cache.get(read_engine(db), config['ITEM_ANALYSIS_CACHE_SECONDS'],
+                                  refresh=bool(request.args.get('refresh')))
+    items = analysis.items(request.args.get('min_attempts', config['ITEM_ANALYSIS_MIN_ATTEMPTS'], type=int))
+    summary = analysis.summary(items)
+    flag = request.args.get('flag')
+    flagged = [item for item in items if item['flags'] and (not flag or flag in item['flags'])]
+    flagged.sort(key=lambda item: (-len(item['flags']), -item['attempts']))
+    if request.args.get('format') == 'json':
+        return jsonify({'summary': summary, 'items': flagged if request.args.get('flagged') else items})
+    
+    flagged = flagged[:200]
+    questions = {q.id: q for q in Question.query.filter(Question.id.in_([item['question_id'] for item in flagged]))}
+    return render_template('admin/analytics.html', summary=summary, flagged=flagged, questions=questions,
+                           difficulties=('easy', 'medium', 'hard'))
+
+@bp.route('/live_rooms', methods=['GET', 'POST'])
+def live_rooms_admin():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    if request.method == 'GET':
+        return jsonify(live_rooms.get_stats())
+    
+    data = request.get_json()
+    category_id = data.get('category_id')
+    difficulty = data.get('difficulty')
+    if not all([category_id, difficulty]):
+        return jsonify({'error': 'Missing required fields'}), 400
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid category'}), 400
+    
+    # Missing timings fall back to the configured defaults
+    settings = {'questions': 10, 'starts_in': 60}
+    for name, (parse, minimum, maximum) in LIVE_ROOM_FIELDS.items():
+        value = data.get(name, settings.get(name))
+        if value is None:
+            continue
+        try:
+            value = parse(value)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid {}'.format(name)}), 400
+        if not minimum <= value <= maximum:
+            return jsonify({'error': '{} must be between {} and {}'.format(name, minimum, maximum)}), 400
+        settings[name] = value
+    
+    question_ids = question_pool.sample(category_id, difficulty, settings['questions'])
+    if question_ids is None:
+        return jsonify({'error': 'Not enough questions for this category/difficulty'}), 400
+    
+    room = live_rooms.create(category_id, difficulty, question_ids, settings['starts_in'],
+                             settings.get('question_seconds'), settings.get('reveal_seconds'))
+    return jsonify(dict(room.to_dict(), url=url_for('live.room_page', room_id=room.room_id)))
+
+@bp.route('/export/<name>')
+def export(name):
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    from exports import EXPORTS, iter_export
+    fmt = request.args.get('format', 'csv')
+    if name not in EXPORTS or fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Unknown export'}), 404
+    
+    # Rows are streamed from a server-side cursor as they are read
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(iter_export(read_engine(db), name, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = 'attachment; filename={}.{}'.format(name, fmt)
+    return response
+
+@bp.route('/db_pool')
+def db_pool():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    engines = db.engines
+    stats = {'primary': pool_stats(engines[None])}
+    if REPLICA_BIND in engines:
+        stats['replica'] = dict(pool_stats(engines[REPLICA_BIND]),
+                                available=replica_health.available(), failures=replica_health.failures)
+    return jsonify(stats)
+
+@bp.route('/metrics')
+def metrics():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    if not instrumentation:
+        return jsonify({'enabled': False})
+    if request.args.get('format') == 'prometheus':
+        return current_app.response_class(instrumentation.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(dict(instrumentation.snapshot(), enabled=True))
+
+@bp.route('/logout')
+def logout():
+    session.pop('admin', None)
+    return redirect(url_for('quiz.index'))
+
+@bp.route('/reports')
+@read_replica
+def reports():
+    if not session.get('admin'):
+        return redirect(url_for('admin.login'))
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = 25
+    leaderboard_size = 10
+    
+    # Category and sport statistics from the precomputed rollups
+    rollups = {(r.dimension, r.key): r for r in ReportRollup.query.filter(
+        ReportRollup.dimension.in_(['category', 'sport'])
+    ).all()}
+    
+    category_stats = []
+    for category in sorted(reference_cache.get_categories(), key=lambda c: c.name):
+        rollup = rollups.get(('category', str(category.id)))
+        if rollup:
+            category_stats.append({
+                'name': category.name,
+                'sport_name': category.sport.name,
+                'quiz_count': rollup.quiz_count,
+                'avg_score': rollup.average_score
+            })
+    
+    sport_stats = []
+    for sport in sorted(reference_cache.get_sports(), key=lambda s: s.name):
+        rollup = rollups.get(('sport', str(sport.id)))
+        if rollup:
+            sport_stats.append({
+                'name': sport.name,
+                'quiz_count': rollup.quiz_count,
+                'avg_score': rollup.average_score,
+                'best_score': rollup.best_score
+            })
+    
+    daily_stats = ReportRollup.query.filter_by(dimension='day')\
+                                    .order_by(ReportRollup.key.desc())\
+                                    .limit(14).all()
+    
+    # Top-N leaderboard served from the (dimension, score_sum) index
+    top_rollups = ReportRollup.query.filter_by(dimension='user')\
+                                    .order_by(ReportRollup.score_sum.desc())\
+                                    .limit(leaderboard_size).all()
+    top_users = {u.id: u for u in User.query.filter(
+        User.id.in_([int(r.key) for r in top_rollups])
+    ).all()}
+    leaderboard = [(top_users[int(r.key)], r) for r in top_rollups if int(r.key) in top_users]
+    
+    # User activity, paginated
+    users = db.session.query(User, ReportRollup).outerjoin(ReportRollup, db.and_(
+        ReportRollup.dimension == 'user',
+        ReportRollup.key == db.cast(User.id, db.String)
+    )).order_by(User.id).paginate(page=page, per_page=per_page, error_out=False)
+    
+    return render_template('admin/reports.html',
+                         category_stats=category_stats,
+                         sport_stats=sport_stats,
+                         daily_stats=daily_stats,
+                         leaderboard=leaderboard,
+                         users=users)
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+
+from models import db, User
+from passwords import HashingBusy
+
+bp = Blueprint('auth', __name__)
+
+@bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    # Shed load during login storms instead of queueing behind the hashing pool
+    response = jsonify({'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        data = request.get_json()
+        
+        # Check if user already exists
+        if User.query.filter_by(username=data['username']).first():
+            return jsonify({'error': 'Username already exists'}), 400
+        
+        if User.query.filter_by(email=data['email']).first():
+            return jsonify({'error': 'Email already registered'}), 400
+        
+        # Create new user
+        user = User(
+            username=data['username'],
+            email=data['email'],
+            full_name=data['full_name']
+        )
+        user.set_password(data['password'])
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Registration successful'})
+    
+    return render_template('auth/register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        data = request.get_json()
+        username = data.get('username')
+        password = data.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        if user and user.check_password(password):
+            session['user_id'] = user.id
+            session['username'] = user.username
+            user.last_login = datetime.utcnow()
+            db.session.commit()
+            return jsonify({'success': True, 'redirect': url_for('quiz.index')})
+        else:
+            return jsonify({'error': 'Invalid username or password'}), 401
+    
+    # If user is already logged in, redirect to home
+    if 'user_id' in session:
+        return redirect(url_for('quiz.index'))
+    
+    return render_template('auth/login.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('auth.login'))
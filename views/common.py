@@ -0,0 +1,38 @@
+from functools import wraps
+
+from flask import session, redirect, url_for, jsonify
+
+from services import quiz_store, rate_limiter
+
+
+# Authentication decorator
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def rate_limited(name):
+    # Sheds the request with RateLimited before the view touches the database
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not rate_limiter:
+                return f(*args, **kwargs)
+            with rate_limiter.admit():
+                rate_limiter.check(name, session['user_id'])
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def get_quiz_state():
+    # Active quiz state for the current user, or an error response
+    quiz_id = session.get('quiz_id')
+    state = quiz_store.get(quiz_id) if quiz_id is not None else None
+    if state is None:
+        return None, (jsonify({'error': 'No active quiz'}), 400)
+    if state['user_id'] != session['user_id']:
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    return state, None
@@ -0,0 +1,90 @@
+import functools
+
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, flash, Response
+
+from models import db, Quiz, UserStats
+from services import live_rooms, reference_cache
+from views.common import login_required
+
+bp = Blueprint('live', __name__, url_prefix='/live')
+
+@bp.route('')
+@login_required
+def rooms():
+    categories = {category.id: category for category in reference_cache.get_categories()}
+    return render_template('live/rooms.html', rooms=live_rooms.list(), categories=categories)
+
+@bp.route('/<room_id>')
+@login_required
+def room_page(room_id):
+    room = live_rooms.get(room_id)
+    if room is None:
+        flash('That live quiz has ended.')
+        return redirect(url_for('live.rooms'))
+    return render_template('live/room.html', room=room)
+
+@bp.route('/<room_id>/join', methods=['POST'])
+@login_required
+def join(room_id):
+    room = live_rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'Room not found'}), 404
+    if room.phase == 'finished':
+        return jsonify({'error': 'Room has finished'}), 400
+
+    user_id = session['user_id']
+    player = live_rooms.join(room, user_id, session['username'], functools.partial(start_live_quiz, room, user_id))
+
+    return jsonify({
+        'quiz_id': player['quiz_id'],
+        'events': url_for('live.events', room_id=room_id),
+        'results': url_for('quiz.results', quiz_id=player['quiz_id'])
+    })
+
+def start_live_quiz(room, user_id):
+    # Live rooms are stored as ordinary quizzes, so results and stats work unchanged.
+    # Stats load before the quiz is added, or a first-time rebuild would count it twice
+    stats = UserStats.for_user(user_id)
+    quiz = Quiz(
+        user_id=user_id,
+        category_id=room.category_id,
+        difficulty=room.difficulty,
+        total_questions=len(room.question_ids)
+    )
+    db.session.add(quiz)
+    stats.record_quiz_started(room.category_id)
+    db.session.commit()
+    return quiz.id
+
+@bp.route('/<room_id>/answer', methods=['POST'])
+@login_required
+def answer(room_id):
+    room = live_rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'Room not found'}), 404
+
+    data = request.get_json()
+    error = live_rooms.answer(room, session['user_id'], data.get('question_id'), data.get('answer', '').strip())
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify({'accepted': True})
+
+@bp.route('/<room_id>/events')
+@login_required
+def events(room_id):
+    room = live_rooms.get(room_id)
+    if room is None:
+        return jsonify({'error': 'Room not found'}), 404
+
+    # Holds a worker thread per connection; serve large rooms through asgi.py
+    rooms = live_rooms._get_current_object()
+    subscriber = rooms.subscribe(room)
+
+    def stream():
+        try:
+            yield from subscriber.frames(rooms.heartbeat)
+        finally:
+            rooms.unsubscribe(room, subscriber)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
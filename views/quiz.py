@@ -0,0 +1,342 @@
+import functools
+import time
+
+from flask import Blueprint, abort, current_app, render_template, request, jsonify, session, redirect, url_for, flash
+
+from models import db, Category, Quiz, QuizAnswer, User, UserStats, UserSeenQuestions
+from db_routing import read_replica
+from grading import grade
+from pagination import paginate_quizzes
+from query_budget import query_budget
+from question_selection import estimate_skill
+from quiz_actions import record_answer, complete_quiz
+from quiz_store import mark_answered
+from rate_limit import RateLimited
+from services import quiz_store, answer_keys, question_payloads, answer_buffer, question_pool, question_selector, reference_cache, quiz_archive
+from views.common import login_required, rate_limited, get_quiz_state
+
+bp = Blueprint('quiz', __name__)
+
+@bp.errorhandler(RateLimited)
+def too_many_requests(e):
+    # Refused before any database work; well-behaved clients back off for Retry-After
+    response = jsonify({'error': 'Too many requests, please retry'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+@bp.route('/')
+@login_required
+@read_replica
+@query_budget(7)
+def index():
+    sports = reference_cache.get_sports()
+    categories = reference_cache.get_categories()
+    user = db.session.get(User, session['user_id'])
+    user_stats = user.get_stats()
+    recent_quizzes = Quiz.query.filter_by(user_id=user.id).order_by(Quiz.completed_at.desc()).limit(5).all()
+    return render_template('index.html', sports=sports, categories=categories, user=user, user_stats=user_stats, recent_quizzes=recent_quizzes)
+
+@bp.route('/profile')
+@login_required
+@read_replica
+@query_budget(5)
+def profile():
+    user = db.session.get(User, session['user_id'])
+    user_stats = user.get_stats()
+    
+    # Get quiz history with keyset pagination
+    try:
+        quiz_history = paginate_quizzes(
+            Quiz.query.filter_by(user_id=user.id).options(db.joinedload(Quiz.category)),
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            archived=functools.partial(quiz_archive.user_quizzes, user.id)
+        )
+    except ValueError:
+        return redirect(url_for('quiz.profile'))
+    
+    # Get category-wise performance, adding the user's archived months (quizzes, score sum, best score)
+    totals = {category_id: summary[:3] for category_id, summary in quiz_archive.user_summary(user.id).items()}
+    rows = db.session.query(
+        Category.id,
+        db.func.count(Quiz.id),
+        db.func.coalesce(db.func.sum(Quiz.score), 0),
+        db.func.coalesce(db.func.max(Quiz.score), 0)
+    ).join(Quiz).filter(Quiz.user_id == user.id)\
+     .group_by(Category.id).all()
+    for category_id, quiz_count, score_sum, best_score in rows:
+        archived = totals.get(category_id, [0, 0, 0])
+        totals[category_id] = [archived[0] + quiz_count, archived[1] + score_sum, max(archived[2], best_score)]
+    category_stats = []
+    for category_id, (quiz_count, score_sum, best_score) in totals.items():
+        category = reference_cache.get_category(category_id)
+        if category:
+            category_stats.append({'name': category.name, 'quiz_count': quiz_count,
+                                   'avg_score': score_sum / quiz_count, 'best_score': best_score})
+    category_stats.sort(key=lambda stat: stat['name'])
+    
+    return render_template('profile.html', 
+                         user=user, 
+                         user_stats=user_stats, 
+                         quiz_history=quiz_history,
+                         category_stats=category_stats)
+
+@bp.route('/quiz_history')
+@login_required
+@read_replica
+def quiz_history():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    try:
+        page = paginate_quizzes(
+            Quiz.query.filter_by(user_id=session['user_id']).options(db.joinedload(Quiz.category)),
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=limit,
+            archived=functools.partial(quiz_archive.user_quizzes, session['user_id'])
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'quizzes': [{
+            'id': quiz.id,
+            'category': quiz.category.name if quiz.category else None,
+            'difficulty': quiz.difficulty,
+            'score': quiz.score,
+            'total_questions': quiz.total_questions,
+            'time_taken': quiz.time_taken,
+            'completed_at': quiz.completed_at.isoformat()
+        } for quiz in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+@bp.route('/start_quiz', methods=['POST'])
+@login_required
+@rate_limited('start_quiz')
+def start_quiz():
+    data = request.get_json()
+    category_id = data.get('category_id')
+    difficulty = data.get('difficulty')
+    
+    if not all([category_id, difficulty]):
+        return jsonify({'error': 'Missing required fields'}), 400
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid category'}), 400
+    
+    stats = UserStats.for_user(session['user_id'])
+    
+    if current_app.config['ADAPTIVE_SELECTION']:
+        # Unseen questions weighted toward the user's correct rate (every quiz serves 10 questions);
+        # finishing the quiz adds the answered ones to the seen set
+        skill = estimate_skill(stats.total_score or 0, (stats.total_quizzes or 0) * 10)
+        selected_ids = question_selector.select(category_id, difficulty,
+                                                UserSeenQuestions.ids_for(session['user_id']), skill)
+    else:
+        # Get random question IDs from the in-memory pool
+        selected_ids = question_pool.sample(category_id, difficulty, 10)
+    
+    if selected_ids is None:
+        return jsonify({'error': 'Not enough questions for this category/difficulty'}), 400
+    
+    # Create quiz session
+    quiz = Quiz(
+        user_id=session['user_id'],
+        category_id=category_id,
+        difficulty=difficulty,
+        total_questions=10
+    )
+    db.session.add(quiz)
+    stats.record_quiz_started(category_id)
+    db.session.commit()
+    
+    # Store quiz state server-side; only the quiz ID goes in the cookie
+    quiz_store.set(quiz.id, {
+        'quiz_id': quiz.id,
+        'user_id': session['user_id'],
+        'question_ids': selected_ids,
+        'current_question': 0,
+        'answered': [],
+        'score': 0,
+        'start_time': time.time()
+    })
+    session['quiz_id'] = quiz.id
+    
+    return jsonify({'quiz_id': quiz.id, 'redirect': url_for('quiz.quiz_page')})
+
+@bp.route('/quiz')
+@login_required
+def quiz_page():
+    state, error = get_quiz_state()
+    if error:
+        return redirect(url_for('quiz.index'))
+    
+    quiz = db.session.get(Quiz, state['quiz_id'])
+    if not quiz:
+        return redirect(url_for('quiz.index'))
+    
+    return render_template('quiz.html', quiz=quiz)
+
+@bp.route('/get_question/<int:question_num>')
+@login_required
+@rate_limited('get_question')
+def get_question(question_num):
+    # Verify quiz belongs to current user
+    state, error = get_quiz_state()
+    if error:
+        return error
+    
+    if question_num >= len(state['question_ids']):
+        return jsonify({'error': 'Invalid question'}), 400
+    
+    question_id = state['question_ids'][question_num]
+    payload = question_payloads.get(question_id)
+    
+    if not payload:
+        return jsonify({'error': 'Question not found'}), 404
+    
+    quiz_store.update(state['quiz_id'], lambda stored: dict(stored, current_question=question_num))
+    
+    body = question_payloads.render(payload, question_num + 1, len(state['question_ids']))
+    
+    return current_app.response_class(body, mimetype='application/json')
+
+@bp.route('/get_questions')
+@login_required
+@rate_limited('get_questions')
+def get_questions():
+    # Verify quiz belongs to current user
+    state, error = get_quiz_state()
+    if error:
+        return error
+    
+    # Cached payloads; questions not cached yet are loaded with a single IN query
+    question_ids = state['question_ids']
+    payloads = question_payloads.get_many(question_ids, on_load=answer_keys.put)
+    
+    if len(payloads) != len(set(question_ids)):
+        return jsonify({'error': 'Question not found'}), 404
+    
+    # Compile answer keys now so submit_answer grades without a query
+    answer_keys.get_many(question_ids)
+    
+    body = question_payloads.render_quiz(state['quiz_id'], [payloads[question_id] for question_id in question_ids],
+                                         len(question_ids))
+    return current_app.response_class(body, mimetype='application/json')
+
+@bp.route('/submit_answer', methods=['POST'])
+@login_required
+@rate_limited('submit_answer')
+def submit_answer():
+    # Verify quiz belongs to current user
+    state, error = get_quiz_state()
+    if error:
+        return error
+    
+    data = request.get_json()
+    question_id = data.get('question_id')
+    user_answer = data.get('answer', '').strip()
+    time_taken = data.get('time_taken', 60)
+    
+    if question_id not in state['question_ids']:
+        return jsonify({'error': 'Invalid question'}), 400
+    
+    answer_key = answer_keys.get(question_id)
+    if not answer_key:
+        return jsonify({'error': 'Question not found'}), 404
+    
+    # Check if answer is correct
+    is_correct = grade(answer_key, user_answer)
+    
+    # Mark the question answered (and the score) in one atomic store update before anything is written,
+    # so a repeated or concurrent submit of the same question is refused
+    state = quiz_store.update(state['quiz_id'], mark_answered(question_id, is_correct))
+    if state is None:
+        return jsonify({'error': 'Question already answered'}), 400
+    question_selector.observe(question_id, is_correct)
+    
+    if answer_buffer:
+        # Write-behind: queue the answer and score delta for a bulk flush
+        answer_buffer.add(state['quiz_id'], state['user_id'], question_id, user_answer,
+                          is_correct, time_taken, state['score'])
+    else:
+        record_answer(db.session, state, question_id, user_answer, is_correct, time_taken)
+        db.session.commit()
+    
+    return jsonify({
+        'correct': is_correct,
+        'correct_answer': answer_key.correct_answer,
+        'explanation': answer_key.explanation
+    })
+
+@bp.route('/finish_quiz', methods=['POST'])
+@login_required
+@rate_limited('finish_quiz')
+def finish_quiz():
+    state, error = get_quiz_state()
+    if error:
+        return error
+    
+    # Persist this worker's buffered answers. Answers queued by other workers are written by their
+    # flushers within ANSWER_BUFFER_INTERVAL and then added to the finished quiz's rollups and seen set
+    if answer_buffer:
+        answer_buffer.flush()
+    
+    data = request.get_json()
+    total_time = data.get('total_time', 0)
+    
+    quiz = complete_quiz(db.session, state['quiz_id'], total_time)
+    if not quiz:
+        return jsonify({'error': 'Quiz not found'}), 404
+    db.session.commit()
+    
+    return jsonify({'redirect': url_for('quiz.results', quiz_id=quiz.id)})
+
+@bp.route('/results/<int:quiz_id>')
+@login_required
+@read_replica
+@query_budget(2)
+def results(quiz_id):
+    quiz = db.session.get(Quiz, quiz_id, options=[db.joinedload(Quiz.category)]) or quiz_archive.get_quiz(quiz_id)
+    if quiz is None:
+        abort(404)
+    
+    # Ensure user can only view their own results
+    if quiz.user_id != session['user_id']:
+        flash('You can only view your own quiz results.')
+        return redirect(url_for('quiz.index'))
+    
+    # No answer_buffer.flush() here: this view reads from the replica, and finish_quiz has already
+    # written this worker's buffered answers
+    if getattr(quiz, 'archived', False):
+        answers = quiz_archive.get_answers(quiz_id)
+    else:
+        answers = QuizAnswer.query.filter_by(quiz_id=quiz_id)\
+                                  .options(db.joinedload(QuizAnswer.question))\
+                                  .order_by(QuizAnswer.id).all()
+    
+    # Clear session and server-side quiz state
+    if session.get('quiz_id') == quiz_id:
+        quiz_store.delete(quiz_id)
+    session.pop('quiz_id', None)
+    
+    return render_template('results.html', quiz=quiz, answers=answers)
+
+@bp.route('/categories')
+@login_required
+@read_replica
+def get_categories():
+    sport_id = request.args.get('sport_id', type=int)
+    if not sport_id:
+        return jsonify([]), 400
+    
+    categories = reference_cache.get_categories_for_sport(sport_id)
+    response = jsonify([{'id': c.id, 'name': c.name} for c in categories])
+    
+    # Let browsers revalidate cheaply until the reference data changes
+    response.set_etag('{}-{}'.format(reference_cache.version, sport_id))
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['CATEGORIES_MAX_AGE']
+    return response.make_conditional(request)